@@ -0,0 +1,46 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+# First import of this module, i.e. the start of this function instance
+PROCESS_START = time.perf_counter()
+
+# service -> {phase name: seconds}, recorded only the first time each phase runs
+phases = {}
+logged = set()
+
+
+def record(service, name, seconds):
+    service_phases = phases.setdefault(service, {})
+    if name not in service_phases:
+        service_phases[name] = round(seconds, 6)
+
+
+@contextmanager
+def phase(service, name):
+    """Time the first run of a startup phase; later runs are not measured"""
+    if name in phases.get(service, {}):
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(service, name, time.perf_counter() - start)
+
+
+def report(service):
+    return {
+        "phases": dict(phases.get(service, {})),
+        "uptimeSeconds": round(time.perf_counter() - PROCESS_START, 6)
+    }
+
+
+def log_once(service):
+    """Print the breakdown to stderr once, after the first prediction"""
+    if service in logged:
+        return
+    logged.add(service)
+    print(json.dumps({"event": "cold_start", "service": service, **report(service)}), file=sys.stderr)
@@ -1,42 +1,190 @@
 from http.server import BaseHTTPRequestHandler
+import time
+import_start = time.perf_counter()
+
 import json
 import os
 import sys
-import joblib
-import pandas as pd
+import warnings
+from urllib.parse import parse_qs, urlsplit
 
 # Add the current directory to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
-# Import custom transformers
-try:
-    from diabetes_transformers import DiabetesPreprocessor, FeatureEngineer
-except ImportError:
-    # If transformers not available, we'll handle it gracefully
-    DiabetesPreprocessor = None
-    FeatureEngineer = None
+# numpy, pandas, sklearn and joblib are imported lazily by the POST path and the
+# model loaders, so GET/OPTIONS and the function's cold start stay cheap
+import cold_start
+import micro_batcher
+import prediction_cache
+import profiling
+import stage_metrics
+from micro_batcher import MicroBatcher
+from model_registry import registry
+from prediction_cache import PredictionCache, cached_scores
+from prediction_store import store_from_env
+from request_records import is_batch_request, numeric_row, parse_batch
+from stage_metrics import stage
+
+# (request key, model column) in the order the model was trained on
+FEATURES = [
+    ('pregnancies', 'Pregnancies'),
+    ('glucose', 'Glucose'),
+    ('bloodPressure', 'BloodPressure'),
+    ('skinThickness', 'SkinThickness'),
+    ('insulin', 'Insulin'),
+    ('bmi', 'BMI'),
+    ('diabetesPedigreeFunction', 'DiabetesPedigreeFunction'),
+    ('age', 'Age')
+]
+REQUEST_KEYS = [key for key, _ in FEATURES]
+MODEL_COLUMNS = [column for _, column in FEATURES]
+# Whole-number inputs: a fraction is invalid, so no path truncates it
+COUNT_KEYS = ('pregnancies', 'age')
+
+# 'pipeline' serves the pickled sklearn Pipeline, 'params' the NumPy engine
+# replaying diabetes_model_params.json (no pandas/sklearn work per request)
+MODEL_BACKEND = os.environ.get('DIABETES_MODEL_BACKEND', 'pipeline')
+MODEL_NAME = 'diabetes_params' if MODEL_BACKEND == 'params' else 'diabetes'
+
+def patient_row(record):
+    """Validate one patient record and return its feature values in model order"""
+    return numeric_row(record, REQUEST_KEYS, "Patient", COUNT_KEYS)
+
+def pipeline_proba(model, X):
+    """predict_proba for the pickled Pipeline on a float ndarray, through the array paths of its steps"""
+    steps = model.named_steps
+    with stage('diabetes', 'preprocessor'):
+        X = steps['preprocessor'].transform_array(X, MODEL_COLUMNS, copy=False)
+    with stage('diabetes', 'feature_engineer'):
+        X = steps['feature_engineer'].transform_array(X, MODEL_COLUMNS)
+
+    with stage('diabetes', 'scaler'), warnings.catch_warnings():
+        # The scaler gets the ndarray of the steps before it, on purpose; its columns are
+        # MODEL_COLUMNS plus the interaction, as in training, so the name check has nothing to add
+        warnings.filterwarnings('ignore', message='X does not have valid feature names', category=UserWarning)
+        X = steps['scaler'].transform(X)
+    with stage('diabetes', 'classifier'):
+        return steps['classifier'].predict_proba(X)
+
+def predict_batch(model, records):
+    """Score all valid records with a single pipeline call, keeping request order"""
+    results = [None] * len(records)
+    rows = []
+    positions = []
+
+    with stage('diabetes', 'validate'):
+        for i, record in enumerate(records):
+            try:
+                rows.append(patient_row(record))
+                positions.append(i)
+            except ValueError as e:
+                results[i] = {"index": i, "error": str(e)}
+
+    if rows:
+        import numpy as np
+
+        input_data = np.array(rows, dtype=np.float64)
+        with cold_start.phase('diabetes', 'firstPredict'):
+            if getattr(model, 'accepts_arrays', False):
+                with stage('diabetes', 'model'):
+                    probabilities = model.predict_proba(input_data)
+            else:
+                probabilities = pipeline_proba(model, input_data)
+        predictions = model.classes_[np.argmax(probabilities, axis=1)]
+
+        for i, prediction, proba in zip(positions, predictions.tolist(), probabilities.tolist()):
+            results[i] = {
+                "index": i,
+                "prediction": int(prediction),
+                "diabetesRisk": "High Risk" if prediction == 1 else "Low Risk",
+                "probabilityNoDiabetes": proba[0],
+                "probabilityDiabetes": proba[1]
+            }
+
+    return results
+
+# Opt-in: DIABETES_CACHE_SIZE > 0 keeps that many results, keyed on the rounded
+# feature vector and the model version, for DIABETES_CACHE_TTL seconds
+CACHE_SIZE, CACHE_TTL, CACHE_DECIMALS = prediction_cache.env_settings('DIABETES')
+cache = PredictionCache(CACHE_SIZE, CACHE_TTL) if CACHE_SIZE > 0 else None
+if cache is not None:
+    registry.on_reload(MODEL_NAME, cache.invalidate)
+
+# Opt-in: PREDICTION_STORE=<sqlite path> persists results and an audit log of
+# every served prediction; repeat inputs are answered from it without inference
+store = store_from_env()
+
+def canonical_patient(record):
+    """(rounded feature values, record rebuilt from them) used as the cache/store key"""
+    values = tuple(round(value, CACHE_DECIMALS) for value in patient_row(record))
+    return values, dict(zip(REQUEST_KEYS, values))
+
+def predict_cached(model, version, records):
+    """predict_batch behind the result cache and the prediction store; only misses reach the model"""
+    if cache is None and store is None:
+        return predict_batch(model, records)
+    return cached_scores(records, canonical_patient, lambda misses: predict_batch(model, misses),
+                         version, cache, store, 'diabetes')
+
+def predict_records(records):
+    """Score records against the current model; returns (result, model version) pairs"""
+    model, version = registry.get(MODEL_NAME)
+    return [(result, version) for result in predict_cached(model, version, records)]
+
+# Opt-in: DIABETES_MICRO_BATCH_MS > 0 coalesces concurrent single-row requests,
+# up to DIABETES_MICRO_BATCH_ROWS per vectorized call
+BATCH_WINDOW_MS, BATCH_MAX_ROWS = micro_batcher.env_settings('DIABETES')
+batcher = MicroBatcher(predict_records, BATCH_WINDOW_MS, BATCH_MAX_ROWS) if BATCH_WINDOW_MS > 0 else None
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
+        if parse_qs(urlsplit(self.path).query).get('format') == ['prometheus']:
+            self.send_text(200, stage_metrics.render(['diabetes']), stage_metrics.PROMETHEUS_CONTENT_TYPE)
+            return
 
         response = {
-            "message": "Diabetes prediction API is running (Python ML Model)"
+            "message": "Diabetes prediction API is running (Python ML Model)",
+            "model": registry.stats(MODEL_NAME),
+            "coldStart": cold_start.report('diabetes'),
+            "microBatching": batcher.stats() if batcher else None,
+            "cache": cache.stats() if cache else None,
+            "store": store.stats() if store else None,
+            "profiling": profiling.report()
         }
-        self.wfile.write(json.dumps(response).encode())
+        self.send_json(200, response)
 
+    @profiling.profiled('diabetes')
     def do_POST(self):
+        stage_metrics.begin_request()
         try:
             # Read request body
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
+            with stage('diabetes', 'parse'):
+                content_length = int(self.headers['Content-Length'])
+                post_data = self.rfile.read(content_length)
+                content_type = self.headers.get('Content-Type', '')
+
+                if is_batch_request(post_data, content_type):
+                    data = None
+                else:
+                    data = json.loads(post_data.decode('utf-8'))
 
-            # Extract input parameters with defaults
+            if data is None:
+                self.post_batch(post_data, content_type)
+                return
+
+            # Every single-row request is validated like a batch row, whichever path scores it
+            try:
+                row = patient_row(data)
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            values = dict(zip(MODEL_COLUMNS, row))
+            # Counts (whole numbers, validated) as ints, as the model was trained on
+            values['Pregnancies'] = int(values['Pregnancies'])
+            values['Age'] = int(values['Age'])
+
+            # Input parameters as sent, with defaults, echoed in the response
             pregnancies = data.get('pregnancies', 0)
             glucose = data.get('glucose', 0)
             blood_pressure = data.get('bloodPressure', 0)
@@ -46,30 +194,36 @@ class handler(BaseHTTPRequestHandler):
             diabetes_pedigree = data.get('diabetesPedigreeFunction', 0)
             age = data.get('age', 0)
 
-            # Load the model
-            parent_dir = os.path.dirname(current_dir)
-            model_path = os.path.join(parent_dir, 'diabetes_model.pkl')
-
-            if not os.path.exists(model_path):
-                raise FileNotFoundError(f"Model file not found at {model_path}")
+            if batcher is not None or cache is not None or store is not None:
+                record = {key: values[column] for key, column in FEATURES}
+                if batcher is not None:
+                    # Scored together with the other requests queued in this window
+                    with stage('diabetes', 'batched'):
+                        result, model_version = batcher.submit(record)
+                else:
+                    result, model_version = predict_records([record])[0]
+                if "error" in result:
+                    raise ValueError(result["error"])
+                prediction = result["prediction"]
+                probabilities = [result["probabilityNoDiabetes"], result["probabilityDiabetes"]]
+            else:
+                # Get the model (loaded once per process, reloaded if the file changes)
+                model, model_version = registry.get(MODEL_NAME)
+                model = stage_metrics.instrument(model, 'diabetes')
 
-            model = joblib.load(model_path)
+                # Plain array for the NumPy engine, otherwise a DataFrame with the exact column names expected by the model
+                if getattr(model, 'accepts_arrays', False):
+                    import numpy as np
+                    input_data = np.array([row])
+                else:
+                    import pandas as pd
+                    with stage('diabetes', 'dataframe'):
+                        input_data = pd.DataFrame({column: [value] for column, value in values.items()})
 
-            # Create DataFrame with the exact column names expected by the model
-            input_data = pd.DataFrame({
-                'Pregnancies': [int(pregnancies)],
-                'Glucose': [float(glucose)],
-                'BloodPressure': [float(blood_pressure)],
-                'SkinThickness': [float(skin_thickness)],
-                'Insulin': [float(insulin)],
-                'BMI': [float(bmi)],
-                'DiabetesPedigreeFunction': [float(diabetes_pedigree)],
-                'Age': [int(age)]
-            })
-
-            # Make prediction
-            prediction = model.predict(input_data)[0]
-            probabilities = model.predict_proba(input_data)[0]
+                # Make prediction; an instrumented Pipeline records each of its steps
+                with cold_start.phase('diabetes', 'firstPredict'):
+                    prediction = model.predict(input_data)[0]
+                    probabilities = model.predict_proba(input_data)[0]
 
             # Prepare response
             response = {
@@ -78,6 +232,7 @@ class handler(BaseHTTPRequestHandler):
                 "probabilityNoDiabetes": float(probabilities[0]),
                 "probabilityDiabetes": float(probabilities[1]),
                 "modelType": "Python ML Model (Logistic Regression)",
+                "modelVersion": model_version,
                 "inputData": {
                     "pregnancies": pregnancies,
                     "glucose": glucose,
@@ -91,27 +246,60 @@ class handler(BaseHTTPRequestHandler):
             }
 
             # Send response
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(200, response)
+            cold_start.log_once('diabetes')
 
         except Exception as e:
             # Send error response
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            self.send_json(500, {"error": str(e)})
 
-            error_response = {
-                "error": str(e)
-            }
-            self.wfile.write(json.dumps(error_response).encode())
+    def post_batch(self, post_data, content_type):
+        try:
+            records = parse_batch(post_data, content_type)
+            if not isinstance(records, list):
+                raise ValueError("Batch body must be a JSON array or NDJSON")
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        model, model_version = registry.get(MODEL_NAME)
+        results = predict_cached(model, model_version, records)
+        errors = sum(1 for result in results if "error" in result)
+
+        self.send_json(200, {
+            "results": results,
+            "count": len(results),
+            "errorCount": errors,
+            "modelType": "Python ML Model (Logistic Regression)",
+            "modelVersion": model_version
+        })
+        cold_start.log_once('diabetes')
+
+    def send_json(self, status, payload):
+        with stage('diabetes', 'serialize'):
+            body = json.dumps(payload).encode()
+        self.send_text(status, body, 'application/json')
+
+    def send_text(self, status, body, content_type):
+        if isinstance(body, str):
+            body = body.encode()
+        server_timing = stage_metrics.end_request('diabetes')
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if server_timing:
+            self.send_header('Server-Timing', server_timing)
+        self.end_headers()
+        self.wfile.write(body)
 
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
\ No newline at end of file
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+cold_start.record('diabetes', 'moduleImport', time.perf_counter() - import_start)
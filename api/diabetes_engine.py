@@ -0,0 +1,103 @@
+import json
+import numpy as np
+
+
+class DiabetesEngine:
+    """Replays the exported diabetes pipeline (diabetes_model_params.json) with NumPy only.
+
+    Chain: zero -> median/mean imputation, BloodPressure*Insulin interaction,
+    standard scaling and the logistic regression decision function.
+    """
+
+    # Lets callers hand over a float ndarray instead of building a DataFrame
+    accepts_arrays = True
+
+    def __init__(self, params):
+        self.input_features = list(params['input_features'])
+        self.feature_names = list(params['feature_names'])
+        self.classes_ = np.array(params.get('classes', [0, 1]))
+
+        index = {name: i for i, name in enumerate(self.input_features)}
+        medians = params.get('medians', {})
+        means = params.get('means', {})
+
+        # Imputation: zero means "missing" for these columns, filled with the fitted statistic
+        self.zero_idx = np.array([index[c] for c in params.get('zero_cols', []) if c in index], dtype=np.intp)
+        fill = np.full(len(self.input_features), np.nan)
+        for col, value in medians.items():
+            if col in index:
+                fill[index[col]] = value
+        for col, value in means.items():
+            if col in index:
+                fill[index[col]] = value
+        self.zero_fill = fill[self.zero_idx]
+
+        self.interactions = [
+            (index[item['columns'][0]], index[item['columns'][1]])
+            for item in params.get('interactions', [])
+        ]
+
+        n_features = len(self.input_features) + len(self.interactions)
+        scaler = params.get('scaler', {})
+        self.mean = np.array(scaler.get('mean', [0.0] * n_features), dtype=np.float64)
+        self.scale = np.array(scaler.get('scale', [1.0] * n_features), dtype=np.float64)
+
+        coefficients = params['coefficients']
+        if isinstance(coefficients, dict):
+            coefficients = [coefficients[name] for name in self.feature_names]
+        self.coef = np.array(coefficients, dtype=np.float64)
+        self.intercept = float(params['intercept'])
+
+        if len(self.coef) != n_features or len(self.mean) != n_features:
+            raise ValueError(f"Params describe {n_features} features but have {len(self.coef)} coefficients")
+
+    @classmethod
+    def from_json(cls, data):
+        """Build an engine from the bytes or text of diabetes_model_params.json"""
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return cls(json.loads(data))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_json(f.read())
+
+    def as_array(self, X):
+        """Accept a DataFrame with the input columns or an (n, 8) array in input order"""
+        if hasattr(X, 'columns'):
+            X = X[self.input_features].to_numpy(dtype=np.float64)
+        return np.array(X, dtype=np.float64, ndmin=2)
+
+    def transform(self, X):
+        """Impute, add interactions and scale; returns the classifier's input matrix"""
+        X = self.as_array(X)
+        n, d = X.shape
+
+        features = np.empty((n, d + len(self.interactions)), dtype=np.float64)
+        features[:, :d] = X
+
+        # Zero (or already missing) -> fitted median/mean, one masked select for the whole group
+        block = X[:, self.zero_idx]
+        features[:, self.zero_idx] = np.where((block == 0) | np.isnan(block), self.zero_fill, block)
+
+        for k, (a, b) in enumerate(self.interactions):
+            features[:, d + k] = features[:, a] * features[:, b]
+
+        features -= self.mean
+        features /= self.scale
+        return features
+
+    def decision_function(self, X):
+        return self.transform(X) @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        decision = self.decision_function(X)
+        proba = np.empty((len(decision), 2), dtype=np.float64)
+        with np.errstate(over='ignore'):
+            proba[:, 1] = 1.0 / (1.0 + np.exp(-decision))
+        proba[:, 0] = 1.0 - proba[:, 1]
+        return proba
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
@@ -1,42 +1,251 @@
 from http.server import BaseHTTPRequestHandler
+import time
+import_start = time.perf_counter()
+
 import json
 import os
 import sys
-import joblib
-import pandas as pd
+from urllib.parse import parse_qs, urlsplit
 
 # Add the current directory to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
-# Import custom transformers
-try:
-    from insurance_transformers import CustomLabelEncoder, FeatureSelector
-except ImportError:
-    # If transformers not available, we'll handle it gracefully
-    CustomLabelEncoder = None
-    FeatureSelector = None
+# numpy, pandas, sklearn and joblib are imported lazily by the POST path and the
+# model loaders, so GET/OPTIONS and the function's cold start stay cheap
+import cold_start
+import micro_batcher
+import prediction_cache
+import profiling
+import stage_metrics
+from micro_batcher import MicroBatcher
+from model_registry import registry
+from prediction_cache import PredictionCache, cached_scores
+from prediction_store import store_from_env
+from request_records import is_batch_request, numeric_row, parse_batch
+from stage_metrics import stage
+
+# Features used in training, in pipeline order
+NUMERIC_FEATURES = ['age', 'bmi', 'children']
+MODEL_COLUMNS = ['age', 'bmi', 'children', 'smoker']
+# Whole-number inputs: a fraction is invalid, so no path truncates it
+COUNT_FEATURES = ('age', 'children')
+
+# Rows per chunk when streaming batch results
+STREAM_CHUNK_ROWS = 1000
+
+# 'pipeline' serves the pickled sklearn Pipeline, 'params' the closed-form
+# scorer built from insurance_model_params.json (no DataFrame per request)
+MODEL_BACKEND = os.environ.get('INSURANCE_MODEL_BACKEND', 'pipeline')
+MODEL_NAME = 'insurance_params' if MODEL_BACKEND == 'params' else 'insurance'
+
+# Opt-in: INSURANCE_QUOTE_TABLE=1 precomputes per-(age, children, smoker) BMI
+# quadratics for the loaded model; a path to a table saved by
+# scripts/build_quote_table.py is memory-mapped instead when its version matches
+QUOTE_TABLE = os.environ.get('INSURANCE_QUOTE_TABLE', '')
+quote_tables = {}
+
+def client_row(record, smoker_classes):
+    """Validate one client record and return (numeric values, smoker label)"""
+    row = numeric_row(record, NUMERIC_FEATURES, "Client", COUNT_FEATURES)
+
+    smoker = record.get('smoker', 'no')
+    # An unhashable label (a list, an object) would raise TypeError in the lookup
+    if not isinstance(smoker, str) or smoker not in smoker_classes:
+        raise ValueError(f"'smoker' must be one of {sorted(smoker_classes)}")
+    return row, smoker
+
+def smoker_codes(model):
+    """Smoker label -> encoded value for either backend"""
+    if getattr(model, 'accepts_arrays', False):
+        return model.smoker_mapping
+    return model.named_steps['encoder'].lookup_tables()['smoker']
+
+def quote_table(model, version):
+    """The quote table for this model version, built or memory-mapped on first use"""
+    if not QUOTE_TABLE:
+        return None
+
+    table = quote_tables.get(version)
+    if table is None:
+        from insurance_quote_table import InsuranceQuoteTable
+
+        if QUOTE_TABLE not in ('1', 'build') and os.path.exists(QUOTE_TABLE):
+            table = InsuranceQuoteTable.load(QUOTE_TABLE)
+            if table.version != version:
+                print(f"Quote table {QUOTE_TABLE} is for model {table.version}, rebuilding for {version}", file=sys.stderr)
+                table = None
+        if table is None and getattr(model, 'accepts_arrays', False):
+            table = InsuranceQuoteTable.from_engine(model, version=version)
+        elif table is None:
+            table = InsuranceQuoteTable.from_pipeline(model, version=version)
+
+        # Only the current model's table is kept
+        quote_tables.clear()
+        quote_tables[version] = table
+    return table
+
+def quote_batch(model, records, table=None):
+    """Quote all valid records with one encoding pass and one polynomial expansion.
+
+    With a quote table, rows on its grid are looked up and only the rest reach the model.
+    """
+    import numpy as np
+
+    smoker_classes = smoker_codes(model)
+    if getattr(model, 'accepts_arrays', False):
+        columns = model.input_features
+        predict_encoded = model.predict_encoded
+
+        def encode(raw):
+            # The engine's own label mapping; numeric columns pass through
+            X = raw.copy()
+            smoker = columns.index('smoker')
+            X[:, smoker] = [smoker_classes[label] for label in X[:, smoker].tolist()]
+            return X.astype(np.float64)
+    else:
+        encoder = model.named_steps['encoder']
+        poly = model.named_steps['poly_features']
+        regressor = model.named_steps['regressor']
+
+        columns = list(getattr(poly, 'feature_names_in_', MODEL_COLUMNS))
+
+        def encode(raw):
+            return encoder.transform_array(raw, columns)
+
+        def predict_encoded(X):
+            # Degree-2 expansion in one shot: every output term is a product of input powers
+            X_poly = np.prod(X[:, None, :] ** poly.powers_[None, :, :], axis=2)
+            return regressor.predict(X_poly)
+
+    results = [None] * len(records)
+    rows = []
+    smokers = []
+    positions = []
+
+    with stage('insurance', 'validate'):
+        for i, record in enumerate(records):
+            try:
+                row, smoker = client_row(record, smoker_classes)
+            except ValueError as e:
+                results[i] = {"index": i, "error": str(e)}
+                continue
+            rows.append(row)
+            smokers.append(smoker)
+            positions.append(i)
+
+    if rows:
+        # Assemble the raw rows in pipeline column order, then encode them in one pass
+        with stage('insurance', 'encoder'):
+            numeric = dict(zip(NUMERIC_FEATURES, np.array(rows, dtype=np.float64).T))
+            raw = np.empty((len(rows), len(columns)), dtype=object)
+            for j, column in enumerate(columns):
+                raw[:, j] = smokers if column == 'smoker' else numeric[column]
+            X = encode(raw)
+        with cold_start.phase('insurance', 'firstPredict'):
+            if table is None:
+                with stage('insurance', 'model'):
+                    predicted = predict_encoded(X)
+            else:
+                with stage('insurance', 'quote_table'):
+                    predicted = table.quote_many(numeric['age'], numeric['bmi'], numeric['children'],
+                                                 [table.smoker_codes[label] for label in smokers])
+                off_grid = np.isnan(predicted)
+                if off_grid.any():
+                    with stage('insurance', 'model'):
+                        predicted[off_grid] = predict_encoded(X[off_grid])
+
+        for i, cost in zip(positions, predicted.tolist()):
+            results[i] = {"index": i, "predictedCost": round(cost, 2)}
+
+    return results
+
+# Opt-in: INSURANCE_CACHE_SIZE > 0 keeps that many quotes, keyed on the rounded
+# inputs, the smoker label and the model version, for INSURANCE_CACHE_TTL seconds
+CACHE_SIZE, CACHE_TTL, CACHE_DECIMALS = prediction_cache.env_settings('INSURANCE')
+cache = PredictionCache(CACHE_SIZE, CACHE_TTL) if CACHE_SIZE > 0 else None
+if cache is not None:
+    registry.on_reload(MODEL_NAME, cache.invalidate)
+
+# Opt-in: PREDICTION_STORE=<sqlite path> persists results and an audit log of
+# every served quote; repeat inputs are answered from it without inference
+store = store_from_env()
+
+def canonical_client(record, smoker_classes):
+    """(rounded numeric values + smoker label, record rebuilt from them) used as the cache/store key"""
+    row, smoker = client_row(record, smoker_classes)
+    values = tuple(round(value, CACHE_DECIMALS) for value in row)
+    return values + (smoker,), dict(zip(NUMERIC_FEATURES, values), smoker=smoker)
+
+def quote_cached(model, version, records):
+    """quote_batch behind the result cache and the prediction store; only misses reach the model"""
+    table = quote_table(model, version)
+    if cache is None and store is None:
+        return quote_batch(model, records, table)
+
+    smoker_classes = smoker_codes(model)
+    return cached_scores(records, lambda record: canonical_client(record, smoker_classes),
+                         lambda misses: quote_batch(model, misses, table), version, cache, store, 'insurance')
+
+def quote_records(records):
+    """Quote records against the current model; returns (result, model version) pairs"""
+    model, version = registry.get(MODEL_NAME)
+    return [(result, version) for result in quote_cached(model, version, records)]
+
+# Opt-in: INSURANCE_MICRO_BATCH_MS > 0 coalesces concurrent single-row requests,
+# up to INSURANCE_MICRO_BATCH_ROWS per vectorized call
+BATCH_WINDOW_MS, BATCH_MAX_ROWS = micro_batcher.env_settings('INSURANCE')
+batcher = MicroBatcher(quote_records, BATCH_WINDOW_MS, BATCH_MAX_ROWS) if BATCH_WINDOW_MS > 0 else None
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
+        if parse_qs(urlsplit(self.path).query).get('format') == ['prometheus']:
+            self.send_text(200, stage_metrics.render(['insurance']), stage_metrics.PROMETHEUS_CONTENT_TYPE)
+            return
 
         response = {
-            "message": "Insurance cost prediction API is running (Python ML Model)"
+            "message": "Insurance cost prediction API is running (Python ML Model)",
+            "model": registry.stats(MODEL_NAME),
+            "coldStart": cold_start.report('insurance'),
+            "microBatching": batcher.stats() if batcher else None,
+            "cache": cache.stats() if cache else None,
+            "store": store.stats() if store else None,
+            "profiling": profiling.report()
         }
-        self.wfile.write(json.dumps(response).encode())
+        self.send_json(200, response)
 
+    @profiling.profiled('insurance')
     def do_POST(self):
+        stage_metrics.begin_request()
         try:
             # Read request body
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
+            with stage('insurance', 'parse'):
+                content_length = int(self.headers['Content-Length'])
+                post_data = self.rfile.read(content_length)
+                content_type = self.headers.get('Content-Type', '')
+
+                if is_batch_request(post_data, content_type):
+                    data = None
+                else:
+                    data = json.loads(post_data.decode('utf-8'))
 
-            # Extract input parameters with defaults
+            if data is None:
+                self.post_batch(post_data, content_type)
+                return
+
+            # Every single-row request is validated like a batch row, whichever path quotes it
+            model, model_version = registry.get(MODEL_NAME)
+            try:
+                numbers, smoker_label = client_row(data, smoker_codes(model))
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            # Counts (whole numbers, validated) as ints, as the model was trained on
+            inputs = dict(zip(NUMERIC_FEATURES, numbers), smoker=smoker_label)
+            inputs['age'] = int(inputs['age'])
+            inputs['children'] = int(inputs['children'])
+
+            # Input parameters as sent, with defaults, echoed in the response
             age = data.get('age', 0)
             sex = data.get('sex', 'male')
             bmi = data.get('bmi', 0)
@@ -44,32 +253,50 @@ class handler(BaseHTTPRequestHandler):
             smoker = data.get('smoker', 'no')
             region = data.get('region', 'northeast')
 
-            # Load the model
-            parent_dir = os.path.dirname(current_dir)
-            model_path = os.path.join(parent_dir, 'insurance_cost_model.pkl')
+            if batcher is not None or cache is not None or store is not None:
+                record = inputs
+                if batcher is not None:
+                    # Quoted together with the other requests queued in this window
+                    with stage('insurance', 'batched'):
+                        result, model_version = batcher.submit(record)
+                else:
+                    result, model_version = quote_records([record])[0]
+                if "error" in result:
+                    raise ValueError(result["error"])
+                predicted_cost = result["predictedCost"]
+            else:
+                # Model loaded once per process, reloaded if the file changes; instrumented per step
+                model = stage_metrics.instrument(model, 'insurance')
 
-            if not os.path.exists(model_path):
-                raise FileNotFoundError(f"Model file not found at {model_path}")
+                table = quote_table(model, model_version)
+                predicted_cost = None
+                if table is not None:
+                    # Precomputed quote; None when the inputs are off the table's grid
+                    with stage('insurance', 'quote_table'):
+                        predicted_cost = table.quote(inputs['age'], inputs['bmi'], inputs['children'], smoker_label)
 
-            model = joblib.load(model_path)
+                if predicted_cost is None and getattr(model, 'accepts_arrays', False):
+                    # Closed-form scorer: evaluate the polynomial directly
+                    with cold_start.phase('insurance', 'firstPredict'), stage('insurance', 'model'):
+                        predicted_cost = model.quote(inputs['age'], inputs['bmi'], inputs['children'], smoker_label)
+                elif predicted_cost is None:
+                    import pandas as pd
 
-            # Create DataFrame with the features used in training
-            # Based on the model, only age, bmi, children, smoker were used
-            input_data = pd.DataFrame({
-                'age': [int(age)],
-                'bmi': [float(bmi)],
-                'children': [int(children)],
-                'smoker': [smoker]  # 'yes' or 'no'
-            })
+                    # Create DataFrame with the features used in training
+                    # Based on the model, only age, bmi, children, smoker were used
+                    with stage('insurance', 'dataframe'):
+                        input_data = pd.DataFrame({column: [value] for column, value in inputs.items()})
 
-            # Make prediction
-            predicted_cost = model.predict(input_data)[0]
+                    # Make prediction; an instrumented Pipeline records each of its steps
+                    with cold_start.phase('insurance', 'firstPredict'):
+                        predicted_cost = model.predict(input_data)[0]
 
             # Prepare response
             response = {
                 "predictedCost": round(float(predicted_cost), 2),
                 "currency": "USD",
                 "modelType": "Python ML Model (Polynomial Regression)",
+                "modelVersion": model_version,
                 "inputData": {
                     "age": age,
                     "sex": sex,
@@ -81,27 +308,94 @@ class handler(BaseHTTPRequestHandler):
             }
 
             # Send response
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.send_json(200, response)
+            cold_start.log_once('insurance')
 
         except Exception as e:
             # Send error response
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            self.send_json(500, {"error": str(e)})
 
-            error_response = {
-                "error": str(e)
-            }
-            self.wfile.write(json.dumps(error_response).encode())
+    def post_batch(self, post_data, content_type):
+        try:
+            records = parse_batch(post_data, content_type)
+            if not isinstance(records, list):
+                raise ValueError("Batch body must be a JSON array or NDJSON")
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        model, model_version = registry.get(MODEL_NAME)
+        results = quote_cached(model, model_version, records)
+        errors = sum(1 for result in results if "error" in result)
+
+        self.send_json_stream(200, {
+            "count": len(results),
+            "errorCount": errors,
+            "currency": "USD",
+            "modelType": "Python ML Model (Polynomial Regression)",
+            "modelVersion": model_version
+        }, 'results', results)
+        cold_start.log_once('insurance')
+
+    def send_json(self, status, payload):
+        with stage('insurance', 'serialize'):
+            body = json.dumps(payload).encode()
+        self.send_text(status, body, 'application/json')
+
+    def send_text(self, status, body, content_type):
+        if isinstance(body, str):
+            body = body.encode()
+        server_timing = stage_metrics.end_request('insurance')
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if server_timing:
+            self.send_header('Server-Timing', server_timing)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_stream(self, status, payload, key, items):
+        """Send payload with payload[key] = items, writing the array in chunks"""
+        chunked = self.request_version == 'HTTP/1.1' and self.protocol_version == 'HTTP/1.1'
+        # The streamed serialization happens after the headers, so it is only in the histograms
+        server_timing = stage_metrics.end_request('insurance')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if server_timing:
+            self.send_header('Server-Timing', server_timing)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+        self.end_headers()
+
+        def write(text):
+            data = text.encode()
+            if chunked:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        with stage('insurance', 'serialize'):
+            write(json.dumps(payload)[:-1] + f', "{key}": [')
+            for start in range(0, len(items), STREAM_CHUNK_ROWS):
+                chunk = json.dumps(items[start:start + STREAM_CHUNK_ROWS])[1:-1]
+                write(chunk if start == 0 else ', ' + chunk)
+            write(']}')
+
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
 
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
\ No newline at end of file
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+cold_start.record('insurance', 'moduleImport', time.perf_counter() - import_start)
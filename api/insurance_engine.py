@@ -0,0 +1,92 @@
+import json
+import numpy as np
+
+
+class InsuranceEngine:
+    """Evaluates the exported polynomial regression (insurance_model_params.json) directly.
+
+    cost = intercept + sum_k coef_k * prod_j x_j ** powers[k][j], over the
+    encoded inputs (age, bmi, children, smoker).
+    """
+
+    # Lets callers hand over encoded ndarrays instead of building a DataFrame
+    accepts_arrays = True
+
+    def __init__(self, params):
+        self.input_features = list(params['input_features'])
+        self.feature_names = list(params['feature_names'])
+        self.powers = np.array(params['powers'], dtype=np.int64)
+
+        coefficients = params['coefficients']
+        if isinstance(coefficients, dict):
+            coefficients = [coefficients[name] for name in self.feature_names]
+        self.coef = np.array(coefficients, dtype=np.float64)
+        self.intercept = float(params['intercept'])
+
+        if self.powers.shape != (len(self.coef), len(self.input_features)):
+            raise ValueError(f"powers has shape {self.powers.shape}, expected ({len(self.coef)}, {len(self.input_features)})")
+
+        # Label -> code for every encoded column (only smoker in the current model)
+        self.mappings = {
+            col: {str(label): code for label, code in encoder['mapping'].items()}
+            for col, encoder in params.get('encoders', {}).items()
+        }
+        self.smoker_mapping = self.mappings.get('smoker', {})
+
+        # Scalar fast path: each term as the list of input positions it multiplies
+        self.term_factors = [
+            [j for j, p in enumerate(row) for _ in range(p)]
+            for row in self.powers.tolist()
+        ]
+        self.coef_list = self.coef.tolist()
+
+    @classmethod
+    def from_json(cls, data):
+        """Build an engine from the bytes or text of insurance_model_params.json"""
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return cls(json.loads(data))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_json(f.read())
+
+    def encode(self, X):
+        """DataFrame with raw labels -> (n, d) float array in input order"""
+        columns = []
+        for col in self.input_features:
+            values = X[col]
+            if col in self.mappings:
+                mapping = self.mappings[col]
+                values = values.map(lambda label: mapping[str(label)])
+            columns.append(np.asarray(values, dtype=np.float64))
+        return np.column_stack(columns)
+
+    def expand(self, X):
+        """Polynomial terms for an encoded (n, d) array, in one vectorized product"""
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        return np.prod(X[:, None, :] ** self.powers[None, :, :], axis=2)
+
+    def predict_encoded(self, X):
+        return self.expand(X) @ self.coef + self.intercept
+
+    def predict(self, X):
+        """Accepts a DataFrame with raw labels or an already encoded array"""
+        if hasattr(X, 'columns'):
+            X = self.encode(X)
+        return self.predict_encoded(X)
+
+    def quote(self, age, bmi, children, smoker):
+        """Single quote with plain floats, no array allocation"""
+        if str(smoker) not in self.smoker_mapping:
+            raise ValueError(f"y contains previously unseen labels: {smoker!r}")
+        values = {'age': age, 'bmi': bmi, 'children': children, 'smoker': self.smoker_mapping[str(smoker)]}
+        x = [float(values[col]) for col in self.input_features]
+        total = 0.0
+        for coef, factors in zip(self.coef_list, self.term_factors):
+            term = coef
+            for j in factors:
+                term *= x[j]
+            total += term
+        return total + self.intercept
@@ -0,0 +1,127 @@
+import json
+import numpy as np
+
+
+class InsuranceQuoteTable:
+    """Precomputed insurance quotes over the discrete inputs.
+
+    For fixed (age, children, smoker) the degree-2 polynomial model is a
+    quadratic in BMI, so the table holds one row of BMI coefficients per cell:
+    coefficients[age - age_min, children, smoker_code] = [c0, c1, c2] and
+    cost = c0 + bmi * (c1 + bmi * c2). Inputs outside the grid (fractional
+    ages, more children than the table covers, unknown labels) are not in
+    the table and have to be quoted by the model.
+    """
+
+    def __init__(self, coefficients, age_min, children_max, smoker_labels, version=None):
+        self.coefficients = coefficients
+        self.age_min = int(age_min)
+        self.age_max = self.age_min + coefficients.shape[0] - 1
+        self.children_max = int(children_max)
+        self.smoker_labels = list(smoker_labels)
+        self.smoker_codes = {label: code for code, label in enumerate(self.smoker_labels)}
+        self.version = version
+
+        if coefficients.shape[1:3] != (self.children_max + 1, len(self.smoker_labels)):
+            raise ValueError(f"Quote table has shape {coefficients.shape}, expected "
+                             f"(ages, {self.children_max + 1}, {len(self.smoker_labels)}, degree + 1)")
+
+    @classmethod
+    def build(cls, input_features, powers, coef, intercept, smoker_mapping,
+              age_range=(18, 64), children_max=5, version=None):
+        """Collect the polynomial terms by BMI power for every (age, children, smoker) cell"""
+        index = {name: j for j, name in enumerate(input_features)}
+        powers = np.asarray(powers, dtype=np.int64)
+        coef = np.asarray(coef, dtype=np.float64)
+
+        labels = [label for label, _ in sorted(smoker_mapping.items(), key=lambda item: item[1])]
+        ages = np.arange(age_range[0], age_range[1] + 1, dtype=np.float64)[:, None, None]
+        children = np.arange(children_max + 1, dtype=np.float64)[None, :, None]
+        smokers = np.array([smoker_mapping[label] for label in labels], dtype=np.float64)[None, None, :]
+
+        degree = int(powers[:, index['bmi']].max())
+        table = np.zeros((len(ages.ravel()), children_max + 1, len(labels), degree + 1), dtype=np.float64)
+        table[..., 0] = intercept
+
+        for term_powers, term_coef in zip(powers, coef):
+            factor = (ages ** term_powers[index['age']]
+                      * children ** term_powers[index['children']]
+                      * smokers ** term_powers[index['smoker']])
+            table[..., term_powers[index['bmi']]] += term_coef * factor
+
+        return cls(table, age_range[0], children_max, labels, version)
+
+    @classmethod
+    def from_engine(cls, engine, **kwargs):
+        """Table for an InsuranceEngine built from insurance_model_params.json"""
+        return cls.build(engine.input_features, engine.powers, engine.coef, engine.intercept,
+                         engine.smoker_mapping, **kwargs)
+
+    @classmethod
+    def from_pipeline(cls, model, **kwargs):
+        """Table for the pickled encoder -> poly_features -> regressor Pipeline"""
+        poly = model.named_steps['poly_features']
+        regressor = model.named_steps['regressor']
+        smoker_mapping = model.named_steps['encoder'].lookup_tables()['smoker']
+        return cls.build(list(poly.feature_names_in_), poly.powers_, regressor.coef_, regressor.intercept_,
+                         smoker_mapping, **kwargs)
+
+    def save(self, path):
+        """Write <path> (.npy coefficients) and a .json sidecar with the grid description"""
+        np.save(path, self.coefficients)
+        with open(self.metadata_path(path), 'w') as f:
+            json.dump({
+                "age_min": self.age_min,
+                "children_max": self.children_max,
+                "smoker_labels": self.smoker_labels,
+                "version": self.version
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a saved table; with mmap the coefficients stay on disk and are paged in on use"""
+        with open(cls.metadata_path(path)) as f:
+            meta = json.load(f)
+        coefficients = np.load(path, mmap_mode='r' if mmap else None)
+        return cls(coefficients, meta['age_min'], meta['children_max'], meta['smoker_labels'], meta.get('version'))
+
+    @staticmethod
+    def metadata_path(path):
+        return (path[:-4] if path.endswith('.npy') else path) + '.json'
+
+    def quote(self, age, bmi, children, smoker):
+        """One quote from the table, or None when the inputs are outside the grid"""
+        if age != int(age) or children != int(children) or smoker not in self.smoker_codes:
+            return None
+        if not (self.age_min <= age <= self.age_max and 0 <= children <= self.children_max):
+            return None
+
+        cell = self.coefficients[int(age) - self.age_min, int(children), self.smoker_codes[smoker]]
+        total = float(cell[-1])
+        for c in cell[-2::-1]:
+            total = total * bmi + float(c)
+        return total
+
+    def quote_many(self, ages, bmis, children, smoker_codes):
+        """Vectorized quote over arrays; NaN where the inputs fall outside the grid"""
+        ages = np.asarray(ages, dtype=np.float64)
+        bmis = np.asarray(bmis, dtype=np.float64)
+        children = np.asarray(children, dtype=np.float64)
+        smoker_codes = np.asarray(smoker_codes, dtype=np.intp)
+
+        inside = ((ages == np.floor(ages)) & (ages >= self.age_min) & (ages <= self.age_max)
+                  & (children == np.floor(children)) & (children >= 0) & (children <= self.children_max))
+
+        out = np.full(len(ages), np.nan)
+        if not inside.any():
+            return out
+
+        cells = self.coefficients[(ages[inside] - self.age_min).astype(np.intp),
+                                  children[inside].astype(np.intp), smoker_codes[inside]]
+        bmi = bmis[inside]
+        total = cells[:, -1].copy()
+        for k in range(cells.shape[1] - 2, -1, -1):
+            total *= bmi
+            total += cells[:, k]
+        out[inside] = total
+        return out
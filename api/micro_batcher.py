@@ -0,0 +1,142 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+def env_settings(prefix):
+    """(window ms, max rows) from <PREFIX>_MICRO_BATCH_MS / <PREFIX>_MICRO_BATCH_ROWS; window 0 disables batching"""
+    window_ms = float(os.environ.get(f'{prefix}_MICRO_BATCH_MS', '0'))
+    max_rows = int(os.environ.get(f'{prefix}_MICRO_BATCH_ROWS', '64'))
+    return window_ms, max_rows
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one vectorized call.
+
+    Callers block in submit(); a background thread takes the first queued item,
+    keeps collecting until `window_ms` has passed since it arrived or `max_rows`
+    items are queued, then calls predict_many(items) once and hands each result
+    back. predict_many must return one result per item, in order.
+
+    The window adapts to load: while recent batches held a single row and
+    nothing else is queued, a request is dispatched at once instead of waiting
+    out the window. Rows that arrive while a batch runs still coalesce.
+    """
+
+    def __init__(self, predict_many, window_ms=2.0, max_rows=64, history=1024):
+        self.predict_many = predict_many
+        self.window = window_ms / 1000.0
+        self.max_rows = max(1, int(max_rows))
+
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+        # Exponential moving average of the batch size, drives the adaptive window
+        self.load = 1.0
+
+        self.batches = 0
+        self.rows = 0
+        self.largest = 0
+        self.size_counts = {}
+        self.delay_total = 0.0
+        self.delay_max = 0.0
+        self.recent_delays = deque(maxlen=history)
+
+    def submit(self, item, timeout=None):
+        """Queue one item and wait for its result; exceptions from predict_many are re-raised here"""
+        self.ensure_started()
+        future = Future()
+        self.queue.put((time.perf_counter(), item, future))
+        return future.result(timeout)
+
+    def ensure_started(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='micro-batcher', daemon=True)
+                self.thread.start()
+
+    def collect(self):
+        """Block for the first item, then gather more until the window closes or the batch is full"""
+        batch = [self.queue.get()]
+        deadline = batch[0][0] + self.window
+
+        if self.queue.empty() and self.load < 1.5:
+            return batch
+
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self.queue.get_nowait())
+                else:
+                    batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.collect()
+            started = time.perf_counter()
+
+            futures = [future for _, _, future in batch]
+            try:
+                results = self.predict_many([item for _, item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"predict_many returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+
+            self.observe(len(batch), [started - enqueued for enqueued, _, _ in batch])
+
+    def observe(self, size, delays):
+        with self.lock:
+            self.load = 0.8 * self.load + 0.2 * size
+            self.batches += 1
+            self.rows += size
+            self.largest = max(self.largest, size)
+
+            # Power-of-two buckets: 1, 2-3, 4-7, ...
+            low = 1 << (size.bit_length() - 1)
+            bucket = str(low) if low == 1 else f"{low}-{2 * low - 1}"
+            self.size_counts[bucket] = self.size_counts.get(bucket, 0) + 1
+
+            self.delay_total += sum(delays)
+            self.delay_max = max(self.delay_max, max(delays))
+            self.recent_delays.extend(delays)
+
+    def stats(self):
+        """Achieved batch sizes and the queueing delay added before each row's batch started"""
+        with self.lock:
+            recent = sorted(self.recent_delays)
+
+            def percentile(p):
+                if not recent:
+                    return 0.0
+                return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 4)
+
+            return {
+                "windowMs": self.window * 1000,
+                "maxRows": self.max_rows,
+                "batches": self.batches,
+                "rows": self.rows,
+                "meanBatchSize": round(self.rows / self.batches, 3) if self.batches else 0.0,
+                "maxBatchSize": self.largest,
+                "batchSizes": dict(sorted(self.size_counts.items(), key=lambda kv: int(kv[0].split('-')[0]))),
+                "queueDelayMs": {
+                    "mean": round(self.delay_total / self.rows * 1000, 4) if self.rows else 0.0,
+                    "p50": percentile(0.50),
+                    "p99": percentile(0.99),
+                    "max": round(self.delay_max * 1000, 4)
+                }
+            }
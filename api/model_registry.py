@@ -0,0 +1,184 @@
+import hashlib
+import io
+import os
+import threading
+import time
+
+import cold_start
+
+# Project root, where the trained .pkl files live
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def expose_to_main(*classes):
+    """Make custom transformers resolvable for pickles saved from a training __main__"""
+    import __main__
+    for cls in classes:
+        if cls is not None and not hasattr(__main__, cls.__name__):
+            setattr(__main__, cls.__name__, cls)
+
+
+def load_pickle(data):
+    """Unpickle a joblib model from raw file bytes"""
+    import joblib
+    return joblib.load(io.BytesIO(data))
+
+
+def load_diabetes_pipeline(data):
+    """Import the ML stack only when the pipeline is first needed, then unpickle it"""
+    with cold_start.phase('diabetes', 'mlImport'):
+        import joblib
+        from diabetes_transformers import DiabetesPreprocessor, FeatureEngineer
+
+    # The pickles were saved from a training script, so they reference __main__
+    expose_to_main(DiabetesPreprocessor, FeatureEngineer)
+
+    with cold_start.phase('diabetes', 'modelLoad'):
+        return load_pickle(data)
+
+
+def load_insurance_pipeline(data):
+    """Import the ML stack only when the pipeline is first needed, then unpickle it"""
+    with cold_start.phase('insurance', 'mlImport'):
+        import joblib
+        from insurance_transformers import CustomLabelEncoder, FeatureSelector
+
+    # The pickles were saved from a training script, so they reference __main__
+    expose_to_main(CustomLabelEncoder, FeatureSelector)
+
+    with cold_start.phase('insurance', 'modelLoad'):
+        return load_pickle(data)
+
+
+def load_diabetes_engine(data):
+    """Build the NumPy-only diabetes engine from diabetes_model_params.json"""
+    with cold_start.phase('diabetes', 'mlImport'):
+        from diabetes_engine import DiabetesEngine
+
+    with cold_start.phase('diabetes', 'modelLoad'):
+        return DiabetesEngine.from_json(data)
+
+
+def load_insurance_engine(data):
+    """Build the closed-form insurance scorer from insurance_model_params.json"""
+    with cold_start.phase('insurance', 'mlImport'):
+        from insurance_engine import InsuranceEngine
+
+    with cold_start.phase('insurance', 'modelLoad'):
+        return InsuranceEngine.from_json(data)
+
+
+class ModelEntry:
+    def __init__(self, name, path, loader):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        self.model = None
+        # (model, version) replaced in one assignment, so readers never pair
+        # a model with another load's version
+        self.current = (None, None)
+        self.mtime = None
+        self.size = None
+        self.sha256 = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.listeners = []
+
+    @property
+    def version(self):
+        return self.sha256[:12] if self.sha256 else None
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "path": os.path.basename(self.path),
+            "version": self.version,
+            "loaded": self.model is not None,
+            "loadedAt": self.loaded_at,
+            "loadSeconds": self.load_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads
+        }
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models, reloaded only when the file changes"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path, loader=load_pickle):
+        self._entries[name] = ModelEntry(name, path, loader)
+
+    def get(self, name):
+        """(model, version) of the current file, loading or reloading it if needed"""
+        entry = self._entries[name]
+
+        try:
+            st = os.stat(entry.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Model file not found at {entry.path}")
+
+        # Fast path: file untouched since the last load
+        if entry.model is not None and (st.st_mtime, st.st_size) == (entry.mtime, entry.size):
+            entry.hits += 1
+            return entry.current
+
+        with self._lock:
+            if entry.model is not None and (st.st_mtime, st.st_size) == (entry.mtime, entry.size):
+                entry.hits += 1
+                return entry.current
+
+            with open(entry.path, 'rb') as f:
+                data = f.read()
+            sha256 = hashlib.sha256(data).hexdigest()
+
+            # Touched but identical content: keep the loaded model
+            if entry.model is not None and sha256 == entry.sha256:
+                entry.mtime, entry.size = st.st_mtime, st.st_size
+                entry.hits += 1
+                return entry.current
+
+            start = time.perf_counter()
+            model = entry.loader(data)
+            entry.load_seconds = round(time.perf_counter() - start, 6)
+
+            reloaded = entry.model is not None
+            if reloaded:
+                entry.reloads += 1
+            entry.model = model
+            entry.sha256 = sha256
+            entry.current = (model, entry.version)
+            entry.mtime, entry.size = st.st_mtime, st.st_size
+            entry.loaded_at = time.time()
+            entry.misses += 1
+
+            if reloaded:
+                for listener in entry.listeners:
+                    listener(entry.version)
+            return entry.current
+
+    def on_reload(self, name, listener):
+        """Call listener(new_version) whenever the model is replaced by a changed file"""
+        self._entries[name].listeners.append(listener)
+
+    def version(self, name):
+        """Version of the last load, for reporting; serve with the pair from get()"""
+        return self._entries[name].version
+
+    def stats(self, name=None):
+        if name is not None:
+            return self._entries[name].stats()
+        return {key: entry.stats() for key, entry in self._entries.items()}
+
+
+registry = ModelRegistry()
+registry.register('diabetes', os.path.join(BASE_DIR, 'diabetes_model.pkl'), loader=load_diabetes_pipeline)
+registry.register('insurance', os.path.join(BASE_DIR, 'insurance_cost_model.pkl'), loader=load_insurance_pipeline)
+registry.register('diabetes_params', os.path.join(BASE_DIR, 'diabetes_model_params.json'), loader=load_diabetes_engine)
+registry.register('insurance_params', os.path.join(BASE_DIR, 'insurance_model_params.json'), loader=load_insurance_engine)
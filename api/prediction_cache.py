@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def env_settings(prefix):
+    """(max entries, ttl seconds, decimals) from <PREFIX>_CACHE_SIZE / _CACHE_TTL / _CACHE_DECIMALS; size 0 disables"""
+    size = int(os.environ.get(f'{prefix}_CACHE_SIZE', '0'))
+    ttl = float(os.environ.get(f'{prefix}_CACHE_TTL', '300'))
+    decimals = int(os.environ.get(f'{prefix}_CACHE_DECIMALS', '4'))
+    return size, ttl, decimals
+
+
+class PredictionCache:
+    """Bounded LRU of prediction results with a per-entry time to live.
+
+    Keys are built by the endpoints from canonicalized inputs plus the model
+    version; invalidate() drops everything when the model is reloaded.
+    """
+
+    def __init__(self, max_entries=10000, ttl=300.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            expires, value = item
+            if expires <= now:
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires = time.monotonic() + self.ttl
+        with self.lock:
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version=None):
+        """Drop every entry; registered as a model reload listener"""
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+
+def cached_scores(records, canonical, score, version, cache=None, store=None, service=None):
+    """Results for records from the cache, then the prediction store, then score() for the rest.
+
+    canonical(record) returns (values tuple, canonical record) or raises
+    ValueError; score(records) returns one result dict per record, like
+    predict_batch. Misses are scored on the canonical record, so a stored
+    result is exact for its key. Invalid records go straight to score(),
+    which reports their errors. Repeats within one call are scored once.
+    """
+    results = [None] * len(records)
+    misses = []
+    repeats = {}
+    origins = {}
+
+    for i, record in enumerate(records):
+        try:
+            values, canonical_record = canonical(record)
+        except ValueError:
+            misses.append((i, None, record))
+            continue
+
+        cached = cache.get((version, values)) if cache is not None else None
+        if cached is not None:
+            results[i] = dict(cached, index=i)
+            origins[i] = (values, 'cache')
+        elif values in repeats:
+            repeats[values].append(i)
+        else:
+            repeats[values] = []
+            misses.append((i, values, canonical_record))
+
+    def fill(i, values, result, source):
+        result["index"] = i
+        results[i] = result
+        if values is not None:
+            origins[i] = (values, source)
+            for j in repeats[values]:
+                results[j] = dict(result, index=j)
+                origins[j] = (values, source)
+
+    hashes = {}
+    if store is not None and misses:
+        from prediction_store import input_hash
+
+        hashes = {values: input_hash(values) for _, values, _ in misses if values is not None}
+        stored = store.lookup(service, version, list(hashes.values()))
+
+        remaining = []
+        for i, values, record in misses:
+            result = stored.get(hashes[values]) if values is not None else None
+            if result is None:
+                remaining.append((i, values, record))
+                continue
+            fill(i, values, dict(index=i, **result), 'store')
+            if cache is not None:
+                cache.put((version, values), result)
+        misses = remaining
+
+    new_results = []
+    if misses:
+        scored = score([record for _, _, record in misses])
+        for (i, values, record), result in zip(misses, scored):
+            fill(i, values, result, 'model')
+            if values is None or "error" in result:
+                continue
+            if cache is not None:
+                cache.put((version, values), result)
+            if store is not None:
+                stored_result = {key: value for key, value in result.items() if key != "index"}
+                # The canonical record, so exported rows carry their field names
+                new_results.append((hashes[values], record, stored_result))
+
+    if store is not None:
+        from prediction_store import input_hash
+
+        served = []
+        for i in sorted(origins):
+            values, source = origins[i]
+            key = hashes.get(values)
+            served.append((key if key is not None else input_hash(values), source))
+        store.record(service, version, new_results, served)
+
+    return results
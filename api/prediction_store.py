@@ -0,0 +1,240 @@
+import atexit
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    service TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (service, model_version, input_hash)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS served (
+    id INTEGER PRIMARY KEY,
+    service TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    source TEXT NOT NULL,
+    served_at REAL NOT NULL
+);
+"""
+
+# SQLite's default limit on bound parameters is 999
+LOOKUP_CHUNK = 500
+
+
+def input_hash(values):
+    """Stable hash of a canonical input vector"""
+    return hashlib.sha256(json.dumps(values, separators=(',', ':')).encode()).hexdigest()
+
+
+def store_from_env():
+    """PredictionStore at PREDICTION_STORE (a SQLite path), or None when unset"""
+    path = os.environ.get('PREDICTION_STORE', '')
+    return PredictionStore(path) if path else None
+
+
+class PredictionStore:
+    """SQLite-backed results and audit log, shared by every worker process.
+
+    Lookups run on per-thread read connections. Writes are queued and a
+    background thread commits them in batches, so the request path never
+    waits on the disk. WAL mode lets readers in other processes continue
+    while a batch commits.
+    """
+
+    def __init__(self, path, flush_interval=0.2, batch_size=1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self.queue = queue.Queue()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.writer = None
+        self.pid = None
+        # Once per store: forked workers inherit it and flush their own queue
+        atexit.register(self.flush)
+
+        self.lookups = 0
+        self.found = 0
+        self.written = 0
+        self.served = 0
+
+        conn = self.connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def reader(self):
+        """This thread's read connection; connections are not reused across a fork"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = self.connect()
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def lookup(self, service, version, hashes):
+        """{input hash: result} for the hashes already scored by this model version"""
+        found = {}
+        conn = self.reader()
+        for start in range(0, len(hashes), LOOKUP_CHUNK):
+            chunk = hashes[start:start + LOOKUP_CHUNK]
+            rows = conn.execute(
+                f"SELECT input_hash, result FROM predictions WHERE service = ? AND model_version = ? "
+                f"AND input_hash IN ({','.join('?' * len(chunk))})",
+                [service, version, *chunk])
+            for key, result in rows:
+                found[key] = json.loads(result)
+
+        with self.lock:
+            self.lookups += len(hashes)
+            self.found += len(found)
+        return found
+
+    def record(self, service, version, scored, served):
+        """Queue new results and the audit entries of a response.
+
+        scored: [(input hash, canonical record, result)] computed by the model
+        served: [(input hash, source)] for every prediction in the response
+        """
+        self.ensure_writer()
+        self.queue.put((service, version, scored, served, time.time()))
+
+    def ensure_writer(self):
+        if self.writer is not None and self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.writer is None or self.pid != os.getpid():
+                # A queue inherited through fork may hold a lock taken by a thread that no longer exists
+                if self.pid is not None:
+                    self.queue = queue.Queue()
+                self.pid = os.getpid()
+                self.writer = threading.Thread(target=self.write_loop, name='prediction-store', daemon=True)
+                self.writer.start()
+
+    def write_loop(self):
+        conn = None
+        while True:
+            batch = [self.queue.get()]
+            try:
+                deadline = time.monotonic() + self.flush_interval
+                rows = len(batch[0][3])
+                while rows < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                    rows += len(batch[-1][3])
+
+                if conn is None:
+                    conn = self.connect()
+                self.write(conn, batch)
+            except Exception as e:
+                # Keep serving; the rows of this batch are lost and the next batch reconnects
+                print(f"Prediction store write failed: {e!r}", file=sys.stderr)
+                if conn is not None:
+                    conn.close()
+                conn = None
+            finally:
+                # flush() waits on these, so they are marked done whatever happened
+                for _ in batch:
+                    self.queue.task_done()
+
+    def write(self, conn, batch):
+        predictions = []
+        served = []
+        for service, version, scored, served_items, timestamp in batch:
+            predictions.extend(
+                (service, version, key, json.dumps(inputs), json.dumps(result), timestamp)
+                for key, inputs, result in scored)
+            served.extend((service, version, key, source, timestamp) for key, source in served_items)
+
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO predictions VALUES (?, ?, ?, ?, ?, ?)", predictions)
+            conn.executemany(
+                "INSERT INTO served (service, model_version, input_hash, source, served_at) VALUES (?, ?, ?, ?, ?)",
+                served)
+
+        with self.lock:
+            self.written += len(predictions)
+            self.served += len(served)
+
+    def flush(self):
+        """Block until everything queued so far is committed"""
+        # Only this process's writer drains its queue; a parent's writer is not running after fork
+        if self.writer is not None and self.pid == os.getpid():
+            self.queue.join()
+
+    def export(self, out, service=None, version=None, include_served=False):
+        """Write stored predictions (or the audit log) to a text file object as NDJSON; returns the row count"""
+        conditions = []
+        params = []
+        if service is not None:
+            conditions.append("service = ?")
+            params.append(service)
+        if version is not None:
+            conditions.append("model_version = ?")
+            params.append(version)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = self.connect()
+        try:
+            if include_served:
+                cursor = conn.execute(
+                    f"SELECT id, service, model_version, input_hash, source, served_at FROM served{where} ORDER BY id",
+                    params)
+                columns = ['id', 'service', 'modelVersion', 'inputHash', 'source', 'servedAt']
+            else:
+                cursor = conn.execute(
+                    f"SELECT service, model_version, input_hash, inputs, result, created_at FROM predictions{where}",
+                    params)
+                columns = ['service', 'modelVersion', 'inputHash', 'inputs', 'result', 'createdAt']
+
+            count = 0
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                for row in rows:
+                    item = dict(zip(columns, row))
+                    if not include_served:
+                        item['inputs'] = json.loads(item['inputs'])
+                        item['result'] = json.loads(item['result'])
+                    out.write(json.dumps(item) + '\n')
+                count += len(rows)
+            return count
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "path": os.path.basename(self.path),
+                "lookups": self.lookups,
+                "found": self.found,
+                "written": self.written,
+                "served": self.served,
+                "pending": self.queue.qsize()
+            }
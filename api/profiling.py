@@ -0,0 +1,217 @@
+import atexit
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+
+# Opt-in: PROFILE_MODE=sample runs a stack sampler over the profiled requests
+# and writes collapsed stacks (flamegraph.pl / speedscope); PROFILE_MODE=cprofile
+# runs them under cProfile and writes pstats files. Unset, the hooks below
+# return the handlers unchanged.
+MODE = os.environ.get('PROFILE_MODE', '')
+# Profile one request in PROFILE_EVERY (0: only inside a window)
+EVERY = int(os.environ.get('PROFILE_EVERY', '100'))
+# Profile every request for this many seconds after start and after SIGUSR2
+WINDOW = float(os.environ.get('PROFILE_WINDOW', '0'))
+DIRECTORY = os.environ.get('PROFILE_DIR', 'profiles')
+INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000
+
+# Seconds between dumps of the aggregated profile; it is also written at exit
+DUMP_INTERVAL = 10.0
+
+
+# code object -> "function (file:line)" as written in the collapsed stacks
+frame_labels = {}
+
+
+def frame_label(code):
+    label = frame_labels.get(code)
+    if label is None:
+        label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        frame_labels[code] = label
+    return label
+
+
+class Profiler:
+    """Picks the requests to profile and aggregates their profiles per service.
+
+    Output goes to <directory>/<service>-<pid>.collapsed (sample) or
+    <service>-<pid>.prof (cprofile), rewritten with the running totals, so
+    each worker process has its own file. Only the thread handling the
+    request is profiled: work handed to the micro-batch thread is not in it.
+    """
+
+    def __init__(self, mode, every, window, directory, interval):
+        if mode not in ('sample', 'cprofile'):
+            raise ValueError(f"PROFILE_MODE must be 'sample' or 'cprofile', got {mode!r}")
+        self.mode = mode
+        self.every = every
+        self.window = window
+        self.directory = directory
+        self.interval = interval
+
+        self.counter = itertools.count()
+        self.window_end = time.monotonic() + window if window > 0 else 0.0
+        self.lock = threading.Lock()
+        self.profiled = {}
+        self.pid = None
+
+        # sample mode: thread id -> service of the requests being sampled,
+        # and (service, collapsed stack) -> samples, written only by the sampler thread
+        self.active = {}
+        self.samples = {}
+        self.sampler = None
+        self.wakeup = threading.Event()
+
+        # cprofile mode: one profile at a time, summed into pstats.Stats per service
+        self.cprofile_lock = threading.Lock()
+        self.stats = {}
+        self.dump_lock = threading.Lock()
+        self.last_dump = time.monotonic()
+
+        atexit.register(self.dump)
+
+    def open_window(self, *args):
+        """Profile every request for the next `window` seconds; usable as a signal handler"""
+        self.window_end = time.monotonic() + (self.window or 60.0)
+
+    def sampled(self):
+        if self.window_end and time.monotonic() < self.window_end:
+            return True
+        return self.every > 0 and next(self.counter) % self.every == 0
+
+    def start(self):
+        """(Re)start the per-process state; a forked worker starts from empty profiles"""
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.active = {}
+            self.samples = {}
+            self.stats = {}
+            self.profiled = {}
+            if self.mode == 'sample':
+                self.sampler = threading.Thread(target=self.sample_loop, name='profiler', daemon=True)
+                self.sampler.start()
+
+    def run(self, service, function, *args, **kwargs):
+        if self.pid != os.getpid():
+            self.start()
+        with self.lock:
+            self.profiled[service] = self.profiled.get(service, 0) + 1
+
+        if self.mode == 'sample':
+            ident = threading.get_ident()
+            self.active[ident] = service
+            self.wakeup.set()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.active.pop(ident, None)
+
+        # cProfile cannot run two profiles at once; a request sampled meanwhile runs unprofiled
+        if not self.cprofile_lock.acquire(blocking=False):
+            return function(*args, **kwargs)
+        import cProfile
+        import pstats
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profile.disable()
+        finally:
+            self.cprofile_lock.release()
+            with self.lock:
+                if service in self.stats:
+                    self.stats[service].add(profile)
+                else:
+                    self.stats[service] = pstats.Stats(profile)
+            if time.monotonic() - self.last_dump > DUMP_INTERVAL:
+                self.dump()
+
+    def sample_loop(self):
+        while True:
+            if not self.active:
+                # Idle until a sampled request starts
+                self.wakeup.clear()
+                if not self.active:
+                    self.wakeup.wait(DUMP_INTERVAL)
+            time.sleep(self.interval)
+            if self.samples and time.monotonic() - self.last_dump > DUMP_INTERVAL:
+                self.dump()
+            active = dict(self.active)
+            if not active:
+                continue
+
+            frames = sys._current_frames()
+            for ident, service in active.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    key = (service, ';'.join(reversed(stack)))
+                    self.samples[key] = self.samples.get(key, 0) + 1
+            del frames
+
+    def dump(self):
+        """Write the aggregated profiles of this process"""
+        if self.pid != os.getpid():
+            return
+        with self.dump_lock:
+            self.last_dump = time.monotonic()
+            os.makedirs(self.directory, exist_ok=True)
+
+            if self.mode == 'sample':
+                by_service = {}
+                for (service, stack), count in dict(self.samples).items():
+                    by_service.setdefault(service, []).append(f"{stack} {count}\n")
+                for service, lines in by_service.items():
+                    path = os.path.join(self.directory, f"{service}-{self.pid}.collapsed")
+                    with open(path + '.tmp', 'w') as f:
+                        f.writelines(sorted(lines))
+                    os.replace(path + '.tmp', path)
+            else:
+                with self.lock:
+                    for service, stats in self.stats.items():
+                        path = os.path.join(self.directory, f"{service}-{self.pid}.prof")
+                        stats.dump_stats(path + '.tmp')
+                        os.replace(path + '.tmp', path)
+
+    def report(self):
+        with self.lock:
+            return {
+                "mode": self.mode,
+                "every": self.every,
+                "windowOpen": bool(self.window_end and time.monotonic() < self.window_end),
+                "profiledRequests": dict(self.profiled),
+                "directory": self.directory
+            }
+
+
+profiler = Profiler(MODE, EVERY, WINDOW, DIRECTORY, INTERVAL) if MODE else None
+
+
+def profiled(service):
+    """Decorator profiling the sampled calls of a request handler; the identity when profiling is off"""
+    def decorate(function):
+        if profiler is None:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.sampled():
+                return function(*args, **kwargs)
+            return profiler.run(service, function, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def report():
+    return profiler.report() if profiler is not None else None
@@ -0,0 +1,56 @@
+import json
+import math
+
+
+def is_batch_request(body, content_type):
+    """A batch is a JSON array or an NDJSON body"""
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        return True
+    return body.lstrip()[:1] == b'['
+
+
+def parse_batch(body, content_type):
+    """Split a batch body into records; unparseable NDJSON lines become ValueErrors"""
+    text = body.decode('utf-8')
+    if text.lstrip()[:1] == '[':
+        return json.loads(text)
+
+    records = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            records.append(ValueError(f"Invalid JSON: {e}"))
+    return records
+
+
+def numeric_row(record, keys, kind, counts=()):
+    """Validate one record and return the values of `keys` as floats, missing keys as 0.
+
+    `kind` names the record in errors ("Patient", "Client"). The keys in
+    `counts` must hold whole numbers, so every path scores the value as sent.
+    A record that failed to parse (a ValueError from parse_batch) is raised
+    as is.
+    """
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError(f"{kind} must be a JSON object")
+
+    row = []
+    for key in keys:
+        value = record.get(key, 0)
+        if isinstance(value, bool):
+            raise ValueError(f"'{key}' must be a number")
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{key}' must be a number")
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f"'{key}' must be a finite, non-negative number")
+        if key in counts and not value.is_integer():
+            raise ValueError(f"'{key}' must be a whole number")
+        row.append(value)
+    return row
@@ -0,0 +1,200 @@
+import bisect
+import contextlib
+import copy
+import os
+import threading
+import time
+import weakref
+
+# Opt-in: API_METRICS=1 records per-stage latency histograms, served in the
+# Prometheus text format; API_SERVER_TIMING=1 also returns each request's
+# stages in a Server-Timing response header
+SERVER_TIMING = os.environ.get('API_SERVER_TIMING', '') not in ('', '0')
+ENABLED = SERVER_TIMING or os.environ.get('API_METRICS', '') not in ('', '0')
+
+# Histogram upper bounds in seconds; one more bucket counts everything above (+Inf)
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+NULL_STAGE = contextlib.nullcontext()
+
+# Loaded Pipeline -> its instrumented copy
+instrumented_models = weakref.WeakKeyDictionary()
+
+
+class Shard:
+    """The histograms written by one thread.
+
+    Only the owning thread writes to its shard, so recording needs no lock;
+    readers sum the shards. series maps (service, stage) to a list of bucket
+    counts, the +Inf count and, last, the sum of the observed seconds.
+    """
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.series = {}
+
+
+local = threading.local()
+shards = []
+# Histograms of threads that have exited, folded in when read or when a new thread records
+retired = {}
+shards_lock = threading.Lock()
+
+
+def own_shard():
+    shard = getattr(local, 'shard', None)
+    if shard is None:
+        shard = Shard(threading.current_thread())
+        local.shard = shard
+        with shards_lock:
+            # A thread per connection would otherwise grow the list until the next scrape
+            retire_dead_shards()
+            shards.append(shard)
+    return shard
+
+
+def retire_dead_shards():
+    """Fold the shards of exited threads into retired; call with shards_lock held"""
+    dead = [shard for shard in shards if not shard.thread.is_alive()]
+    for shard in dead:
+        shards.remove(shard)
+        merge(retired, shard.series)
+
+
+def observe(service, stage, seconds):
+    series = own_shard().series
+    counts = series.get((service, stage))
+    if counts is None:
+        counts = series[(service, stage)] = [0] * (len(BUCKETS) + 1) + [0.0]
+    counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+    counts[-1] += seconds
+
+    timings = getattr(local, 'timings', None)
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+class Stage:
+    __slots__ = ('service', 'name', 'start')
+
+    def __init__(self, service, name):
+        self.service = service
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.service, self.name, time.perf_counter() - self.start)
+        return False
+
+
+def stage(service, name):
+    """Context manager timing one stage; a shared no-op when metrics are off"""
+    return Stage(service, name) if ENABLED else NULL_STAGE
+
+
+def timed(method, service, name):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            observe(service, name, time.perf_counter() - start)
+    return wrapper
+
+
+def instrument(model, service):
+    """A copy of a fitted sklearn Pipeline that times each of its steps, named after the step.
+
+    The steps are shallow copies (fitted arrays are shared) whose methods are
+    wrapped, so Pipeline.predict and predict_proba record every step as they
+    run it while the registry's model stays untouched. The copy is kept for
+    as long as the model is alive. Anything that is not a Pipeline is
+    returned unchanged.
+    """
+    if not ENABLED or not hasattr(model, 'steps'):
+        return model
+
+    instrumented = instrumented_models.get(model)
+    if instrumented is None:
+        instrumented = copy.copy(model)
+        instrumented.steps = [(name, instrument_step(step, service, name)) for name, step in model.steps]
+        instrumented_models[model] = instrumented
+    return instrumented
+
+
+def instrument_step(step, service, name):
+    if step is None or step == 'passthrough':
+        return step
+    step = copy.copy(step)
+    for method in ('transform', 'predict', 'predict_proba'):
+        original = getattr(step, method, None)
+        if original is not None:
+            setattr(step, method, timed(original, service, name))
+    return step
+
+
+def begin_request():
+    """Start collecting this thread's stages for the request's total and Server-Timing header"""
+    if ENABLED:
+        local.timings = []
+        local.request_start = time.perf_counter()
+
+
+def end_request(service):
+    """Record the request total; returns the Server-Timing header value, or '' when it is off"""
+    timings = getattr(local, 'timings', None)
+    if timings is None:
+        return ''
+    local.timings = None
+
+    total = time.perf_counter() - local.request_start
+    observe(service, 'total', total)
+    if not SERVER_TIMING:
+        return ''
+    return ', '.join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings + [('total', total)])
+
+
+def merge(into, series):
+    for key, counts in list(series.items()):
+        total = into.get(key)
+        if total is None:
+            into[key] = list(counts)
+        else:
+            for i, value in enumerate(counts):
+                total[i] += value
+
+
+def snapshot():
+    """(service, stage) -> counts summed over every thread of this process"""
+    with shards_lock:
+        retire_dead_shards()
+
+        totals = {}
+        merge(totals, retired)
+        for shard in shards:
+            merge(totals, shard.series)
+    return totals
+
+
+def render(services=None):
+    """Prometheus text exposition of the stage histograms, optionally for some services only"""
+    lines = [
+        '# HELP prediction_stage_seconds Time spent in each stage of a prediction request.',
+        '# TYPE prediction_stage_seconds histogram'
+    ]
+    for (service, name), counts in sorted(snapshot().items()):
+        if services is not None and service not in services:
+            continue
+        labels = f'service="{service}",stage="{name}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), counts[:-1]):
+            cumulative += count
+            lines.append(f'prediction_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'prediction_stage_seconds_sum{{{labels}}} {counts[-1]!r}')
+        lines.append(f'prediction_stage_seconds_count{{{labels}}} {cumulative}')
+    return '\n'.join(lines) + '\n'
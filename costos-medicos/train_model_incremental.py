@@ -0,0 +1,214 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+import numpy as np
+from sklearn.preprocessing import LabelEncoder, PolynomialFeatures
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import Pipeline
+import joblib
+import warnings
+warnings.filterwarnings('ignore')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+# The serving copy of the encoder, so the saved pipeline unpickles in the API
+# as insurance_transformers.CustomLabelEncoder
+from insurance_transformers import CustomLabelEncoder
+
+# Model inputs in training order, and the target
+FEATURES = ['age', 'bmi', 'children', 'smoker']
+TARGET = 'charges'
+# LabelEncoder classes of the smoker column (sorted, as LabelEncoder orders them)
+SMOKER_CLASSES = ['no', 'yes']
+DEGREE = 2
+
+
+def polynomial_features():
+    """The pipeline's PolynomialFeatures step, fitted on the 4 named inputs like train_model.py's"""
+    return PolynomialFeatures(degree=DEGREE, include_bias=False).fit(pd.DataFrame(np.zeros((1, len(FEATURES))), columns=FEATURES))
+
+
+class SufficientStatistics:
+    """Everything the least-squares fit needs from the rows, in constant space.
+
+    For Z = [polynomial features, charges]: the row count, the column means and
+    the centered cross-products (Z - mean)ᵀ(Z - mean). Their top-left block
+    and last column are XᵀX and Xᵀy of the centered design, which is what
+    LinearRegression solves; centering keeps the sums of age⁴-sized terms from
+    cancelling. Statistics of disjoint rows combine exactly (Chan et al.), so
+    rows are added or removed in O(rows) and shards are summed in any order.
+    """
+
+    def __init__(self, n_columns):
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self.comoment = np.zeros((n_columns, n_columns))
+
+    @classmethod
+    def from_rows(cls, Z):
+        stats = cls(Z.shape[1])
+        if len(Z):
+            stats.count = len(Z)
+            stats.mean = Z.mean(axis=0)
+            centered = Z - stats.mean
+            stats.comoment = centered.T @ centered
+        return stats
+
+    def add(self, other):
+        if not other.count:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.comoment += other.comoment + np.outer(delta, delta) * (self.count * other.count / total)
+        self.mean += delta * (other.count / total)
+        self.count = total
+        return self
+
+    def subtract(self, other):
+        """Remove rows that were added before (e.g. claims leaving the training window)"""
+        if other.count > self.count:
+            raise ValueError(f"cannot remove {other.count} rows from statistics of {self.count}")
+        remaining = self.count - other.count
+        if not remaining:
+            self.__init__(len(self.mean))
+            return self
+        mean = (self.mean * self.count - other.mean * other.count) / remaining
+        delta = other.mean - mean
+        self.comoment -= other.comoment + np.outer(delta, delta) * (remaining * other.count / self.count)
+        self.mean = mean
+        self.count = remaining
+        return self
+
+    def solve(self):
+        """(coef, intercept, training r2, training rmse) of the least-squares fit"""
+        if self.count < 2:
+            raise ValueError("need at least 2 rows to fit")
+        Sxx = self.comoment[:-1, :-1]
+        Sxy = self.comoment[:-1, -1]
+        # Minimum-norm solution like LinearRegression: smoker² equals smoker, so Sxx is singular
+        coef = np.linalg.lstsq(Sxx, Sxy, rcond=None)[0]
+        intercept = self.mean[-1] - self.mean[:-1] @ coef
+
+        Syy = self.comoment[-1, -1]
+        sse = max(Syy - 2 * coef @ Sxy + coef @ Sxx @ coef, 0.0)
+        return coef, float(intercept), 1 - sse / Syy if Syy else np.nan, float(np.sqrt(sse / self.count))
+
+    def save(self, path):
+        # Written next to the target and renamed, so readers never see half a file
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, count=self.count, mean=self.mean, comoment=self.comoment, columns=np.array(columns()))
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if data['columns'].tolist() != columns():
+                raise ValueError(f"{path}: statistics of other columns {data['columns'].tolist()}")
+            stats = cls(len(data['mean']))
+            stats.count = int(data['count'])
+            stats.mean = data['mean'].copy()
+            stats.comoment = data['comoment'].copy()
+        return stats
+
+
+def columns():
+    """Names of the columns of Z: the polynomial features, then the target"""
+    return polynomial_features().get_feature_names_out(FEATURES).tolist() + [TARGET]
+
+
+def design_rows(df, poly):
+    """Z rows of a claims DataFrame: polynomial features of the encoded inputs, then charges"""
+    smoker = df['smoker'].astype(str)
+    unseen = sorted(set(smoker) - set(SMOKER_CLASSES))
+    if unseen:
+        raise ValueError(f"smoker contains previously unseen labels: {unseen}")
+    X = df[FEATURES[:-1]].to_numpy(dtype=np.float64)
+    X = np.column_stack([X, (smoker == 'yes').to_numpy(dtype=np.float64)])
+    X = pd.DataFrame(X, columns=FEATURES)
+    return np.column_stack([poly.transform(X), df[TARGET].to_numpy(dtype=np.float64)])
+
+
+def read_statistics(paths, chunk_rows=100000):
+    """SufficientStatistics of the rows of CSV files, read chunk by chunk"""
+    poly = polynomial_features()
+    stats = SufficientStatistics(len(columns()))
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=FEATURES + [TARGET], chunksize=chunk_rows):
+            stats.add(SufficientStatistics.from_rows(design_rows(chunk, poly)))
+    return stats
+
+
+def build_pipeline(stats):
+    """The Pipeline of train_model.py, with the regressor solved from the statistics"""
+    coef, intercept, _, _ = stats.solve()
+
+    encoder = CustomLabelEncoder()
+    encoder.encoders['smoker'] = LabelEncoder().fit(SMOKER_CLASSES)
+
+    regressor = LinearRegression()
+    regressor.coef_ = coef
+    regressor.intercept_ = intercept
+    regressor.n_features_in_ = len(coef)
+    regressor.rank_ = int(np.linalg.matrix_rank(stats.comoment[:-1, :-1]))
+
+    return Pipeline([
+        ('encoder', encoder),
+        ('poly_features', polynomial_features()),
+        ('regressor', regressor)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Maintain the insurance regression's sufficient statistics and re-solve it")
+    parser.add_argument('command', choices=['add', 'remove', 'merge', 'solve'],
+                        help="add/remove: fold CSV rows in or out; merge: sum statistics files; solve: only re-solve")
+    parser.add_argument('inputs', nargs='*', help="CSV files (add/remove) or statistics files (merge)")
+    parser.add_argument('--stats', default='insurance_stats.npz', help="statistics file, created if missing")
+    parser.add_argument('--output', help="also save the solved pipeline here (e.g. insurance_cost_model.pkl)")
+    parser.add_argument('--chunk-rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.command != 'solve' and not args.inputs:
+        parser.error(f"{args.command} needs input files")
+
+    if os.path.exists(args.stats):
+        stats = SufficientStatistics.load(args.stats)
+    else:
+        stats = SufficientStatistics(len(columns()))
+
+    start = time.perf_counter()
+    if args.command == 'add':
+        change = read_statistics(args.inputs, args.chunk_rows)
+        stats.add(change)
+    elif args.command == 'remove':
+        change = read_statistics(args.inputs, args.chunk_rows)
+        stats.subtract(change)
+    elif args.command == 'merge':
+        change = SufficientStatistics(len(columns()))
+        for path in args.inputs:
+            change.add(SufficientStatistics.load(path))
+        stats.add(change)
+    if args.command != 'solve':
+        print(f"{args.command}: {change.count} rows in {time.perf_counter() - start:.3f}s, now {stats.count} rows")
+        stats.save(args.stats)
+
+    if stats.count < 2:
+        print("Not enough rows to solve yet")
+        return
+
+    start = time.perf_counter()
+    coef, intercept, r2, rmse = stats.solve()
+    print(f"Solved in {(time.perf_counter() - start) * 1e6:.0f}µs: intercept {intercept:.2f}, "
+          f"training R² {r2:.4f}, RMSE ${rmse:.2f}")
+
+    if args.output:
+        joblib.dump(build_pipeline(stats), args.output)
+        print(f"Model saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
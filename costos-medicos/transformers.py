@@ -8,6 +8,9 @@ class CustomLabelEncoder(BaseEstimator, TransformerMixin):
         self.encoders = {}
 
     def fit(self, X, y=None):
+        # New classes, drop cached lookup tables
+        self.__dict__.pop('_lookup_tables', None)
+
         for col in X.select_dtypes(include=['object']).columns:
             self.encoders[col] = LabelEncoder()
             self.encoders[col].fit(X[col])
@@ -20,6 +23,38 @@ class CustomLabelEncoder(BaseEstimator, TransformerMixin):
                 X_encoded[col] = encoder.transform(X_encoded[col])
         return X_encoded
 
+    def lookup_tables(self):
+        """{column: {label: code}} from the fitted classes, built once"""
+        tables = self.__dict__.get('_lookup_tables')
+        if tables is None:
+            tables = {
+                col: {label: code for code, label in enumerate(encoder.classes_.tolist())}
+                for col, encoder in self.encoders.items()
+            }
+            self.__dict__['_lookup_tables'] = tables
+        return tables
+
+    def transform_array(self, X, columns):
+        """transform() for a 2-D array laid out as `columns`; dict lookups instead of a sorted search per value.
+
+        Returns a float64 array, ready for the polynomial step.
+        """
+        X = np.asarray(X, dtype=object)
+        out = np.empty(X.shape, dtype=np.float64)
+        tables = self.lookup_tables()
+
+        for j, col in enumerate(columns):
+            if col not in tables:
+                out[:, j] = X[:, j]
+                continue
+            table = tables[col]
+            try:
+                out[:, j] = [table[label] for label in X[:, j].tolist()]
+            except KeyError as e:
+                raise ValueError(f"y contains previously unseen labels: {e.args[0]!r}") from None
+
+        return out
+
 class FeatureSelector(BaseEstimator, TransformerMixin):
     def __init__(self, features_to_keep=None):
         self.features_to_keep = features_to_keep
@@ -2,6 +2,10 @@ import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 
+# Raw input columns, in the order the model was trained on
+DIABETES_COLUMNS = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+                    'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
+
 class DiabetesPreprocessor(BaseEstimator, TransformerMixin):
     def __init__(self):
         self.zero_cols = ['Glucose', 'Insulin', 'SkinThickness', 'BloodPressure', 'BMI']
@@ -11,21 +15,29 @@ class DiabetesPreprocessor(BaseEstimator, TransformerMixin):
         self.means_ = {}
 
     def fit(self, X, y=None):
-        # Replace 0 with NaN for medical impossibilities
-        X_processed = X.copy()
-        for col in self.zero_cols:
-            if col in X_processed.columns:
-                X_processed[col] = X_processed[col].replace(0, np.nan)
+        medians = {}
+        means = {}
+        # One column at a time, without copying the frame
+        for col in self.median_cols + self.mean_cols:
+            if col not in X.columns:
+                continue
+            values = X[col]
+            if col in self.zero_cols:
+                # Replace 0 with NaN for medical impossibilities
+                values = values.replace(0, np.nan)
+            if col in self.median_cols:
+                medians[col] = values.median()
+            if col in self.mean_cols:
+                means[col] = values.mean()
 
-        # Calculate medians and means for imputation
-        for col in self.median_cols:
-            if col in X_processed.columns:
-                self.medians_[col] = X_processed[col].median()
-
-        for col in self.mean_cols:
-            if col in X_processed.columns:
-                self.means_[col] = X_processed[col].mean()
+        return self.set_statistics(medians, means)
 
+    def set_statistics(self, medians, means):
+        """Impute with the given medians and means, e.g. computed over chunks by the incremental trainer"""
+        self.medians_ = dict(medians)
+        self.means_ = dict(means)
+        # Fitted statistics change, drop cached transform_array plans
+        self.__dict__.pop('_array_plans', None)
         return self
 
     def transform(self, X):
@@ -48,6 +60,60 @@ class DiabetesPreprocessor(BaseEstimator, TransformerMixin):
 
         return X_processed
 
+    def transform_array(self, X, columns=None, copy=True):
+        """Same result as transform() on a float64 ndarray, one masked fill per column group.
+
+        X has one column per name in `columns` (default DIABETES_COLUMNS). With
+        copy=False a float64 X is imputed in place and returned.
+        """
+        if copy or not isinstance(X, np.ndarray) or X.dtype != np.float64:
+            X = np.array(X, dtype=np.float64)
+
+        plan = self._array_plan(tuple(columns) if columns is not None else tuple(DIABETES_COLUMNS))
+        for idx, fill, zero_is_missing in plan:
+            # A slice gives a view that is filled in place; an index array needs a write-back
+            block = X[:, idx]
+            missing = np.isnan(block)
+            if zero_is_missing:
+                missing |= block == 0
+            np.copyto(block, fill, where=missing)
+            if not isinstance(idx, slice):
+                X[:, idx] = block
+
+        return X
+
+    def _array_plan(self, columns):
+        """Group column positions by how they are imputed; cached per column layout"""
+        plans = self.__dict__.setdefault('_array_plans', {})
+        if columns in plans:
+            return plans[columns]
+
+        # transform() fills medians first, so they win over means for the same column
+        fills = {col: self.means_[col] for col in self.mean_cols if col in self.means_}
+        fills.update({col: self.medians_[col] for col in self.median_cols if col in self.medians_})
+
+        groups = {}
+        for i, col in enumerate(columns):
+            zero_is_missing = col in self.zero_cols
+            if col in fills:
+                groups.setdefault((True, zero_is_missing), []).append((i, fills[col]))
+            elif zero_is_missing:
+                # Zero becomes NaN and there is no statistic to fill it with
+                groups.setdefault((False, True), []).append((i, np.nan))
+
+        plan = []
+        for (_, zero_is_missing), items in groups.items():
+            positions = [i for i, _ in items]
+            if positions == list(range(positions[0], positions[-1] + 1)):
+                idx = slice(positions[0], positions[-1] + 1)
+            else:
+                idx = np.array(positions, dtype=np.intp)
+            fill = np.array([value for _, value in items], dtype=np.float64)
+            plan.append((idx, fill, zero_is_missing))
+
+        plans[columns] = plan
+        return plan
+
 class FeatureEngineer(BaseEstimator, TransformerMixin):
     def fit(self, X, y=None):
         return self
@@ -59,4 +125,25 @@ class FeatureEngineer(BaseEstimator, TransformerMixin):
         if 'BloodPressure' in X.columns and 'Insulin' in X.columns:
             X_engineered['p_BloodPressure_Insulin'] = X_engineered['BloodPressure'] * X_engineered['Insulin']
 
-        return X_engineered
\ No newline at end of file
+        return X_engineered
+
+    def transform_array(self, X, columns=None, out=None):
+        """transform() for a float ndarray: the output is allocated once and the product column written in place.
+
+        `columns` names the input columns (default DIABETES_COLUMNS); pass `out`
+        to reuse an (n, d + 1) buffer.
+        """
+        columns = list(columns) if columns is not None else DIABETES_COLUMNS
+        X = np.asarray(X, dtype=np.float64)
+        n, d = X.shape
+
+        has_interaction = 'BloodPressure' in columns and 'Insulin' in columns
+        if out is None:
+            out = np.empty((n, d + 1 if has_interaction else d), dtype=np.float64)
+        out[:, :d] = X
+
+        # Feature interactions
+        if has_interaction:
+            np.multiply(X[:, columns.index('BloodPressure')], X[:, columns.index('Insulin')], out=out[:, d])
+
+        return out
\ No newline at end of file
@@ -0,0 +1,178 @@
+import copy
+
+import numpy as np
+
+from diabetes_transformers import DiabetesPreprocessor
+
+# Default rank error of the streaming medians, as a fraction of the rows
+QUANTILE_ERROR = 0.001
+# Up to this many values per column the medians are computed exactly
+EXACT_LIMIT = 100000
+# Compactor capacity per unit of 1 / rank error; measured to keep the median
+# within the bound in over 99% of random streams
+CAPACITY_FACTOR = 2.0
+# Values added to a sketch per compaction, which bounds the scratch memory of a large update
+SKETCH_BLOCK = 65536
+
+class QuantileSketch:
+    """Mergeable approximate quantiles of a stream of floats, KLL-style.
+
+    Values are kept as they are until there are more than exact_limit of
+    them, so small fits get the exact quantile. Past that, level h holds
+    values standing for 2**h rows each: a level longer than the capacity is
+    sorted and every other value, from a random start, moves up one level
+    with twice the weight. A compaction moves any rank by at most that
+    weight, in a random direction, which keeps the rank error of a quantile
+    near rank_error * n whatever n is. Memory is about capacity values per
+    level, with log2(n / capacity) levels. Sketches with the same
+    rank_error merge by pooling their levels, in any order.
+    """
+
+    def __init__(self, rank_error=QUANTILE_ERROR, exact_limit=EXACT_LIMIT, seed=0):
+        self.rank_error = rank_error
+        self.exact_limit = exact_limit
+        self.capacity = int(np.ceil(CAPACITY_FACTOR / rank_error))
+        # levels[h] is a list of float64 arrays, concatenated when compacted
+        self.levels = [[]]
+        self.count = 0
+        self.exact = True
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if self.exact and self.count + len(values) <= self.exact_limit:
+            if len(values):
+                self.levels[0].append(values)
+                self.count += len(values)
+            return
+
+        for start in range(0, len(values), SKETCH_BLOCK):
+            block = values[start:start + SKETCH_BLOCK]
+            self.levels[0].append(block)
+            self.count += len(block)
+            self._compact()
+
+    def merge(self, other):
+        for h, arrays in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append([])
+            self.levels[h].extend(arrays)
+        self.count += other.count
+        self.exact = self.exact and other.exact
+        self._compact()
+        return self
+
+    def _compact(self):
+        if self.exact and self.count <= self.exact_limit:
+            return
+        self.exact = False
+        h = 0
+        while h < len(self.levels):
+            level = np.concatenate(self.levels[h]) if self.levels[h] else np.empty(0)
+            if len(level) <= self.capacity:
+                self.levels[h] = [level]
+                h += 1
+                continue
+
+            # An odd value out stays at this level with its own weight
+            level.sort()
+            paired = len(level) - len(level) % 2
+            self.levels[h] = [level[paired:]]
+            if h + 1 == len(self.levels):
+                self.levels.append([])
+            self.levels[h + 1].append(level[self.rng.integers(2):paired:2])
+            h += 1
+
+    def quantile(self, q):
+        if not self.count:
+            return np.nan
+        if self.exact:
+            # Same as pandas: linear interpolation, the midpoint for an even median
+            return float(np.quantile(np.concatenate(self.levels[0]), q))
+
+        values = np.concatenate([np.concatenate(arrays) for arrays in self.levels if arrays])
+        weights = np.concatenate([np.full(sum(len(a) for a in arrays), 2.0 ** h)
+                                  for h, arrays in enumerate(self.levels) if arrays])
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = min(np.searchsorted(cumulative, q * self.count), len(values) - 1)
+        return float(values[order][position])
+
+class RunningMoments:
+    """Count, mean and sum of squared deviations of a stream; mergeable (Welford/Chan updates)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            mean = values.mean()
+            self._combine(len(values), float(mean), float(np.square(values - mean).sum()))
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2)
+        return self
+
+    def _combine(self, count, mean, m2):
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def value(self):
+        return self.mean if self.count else np.nan
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+class ImputationStatistics:
+    """The medians and means of DiabetesPreprocessor, computed one chunk at a time.
+
+    partial_fit() folds in a chunk of rows; statistics fitted on other rows,
+    for example in another process, are added with merge(). fitted() gives a
+    DiabetesPreprocessor imputing with the statistics of every row seen, which
+    pickles without the sketches.
+    """
+
+    def __init__(self, quantile_error=QUANTILE_ERROR, exact_limit=EXACT_LIMIT, preprocessor=None):
+        self.quantile_error = quantile_error
+        self.exact_limit = exact_limit
+        self.preprocessor = preprocessor if preprocessor is not None else DiabetesPreprocessor()
+        self.stats = {}
+
+    def partial_fit(self, X):
+        preprocessor = self.preprocessor
+        for col in preprocessor.median_cols + preprocessor.mean_cols:
+            if col not in X.columns:
+                continue
+            # One column at a time, without copying the frame
+            values = X[col].to_numpy(dtype=np.float64)
+            if col in preprocessor.zero_cols:
+                # Replace 0 with NaN for medical impossibilities
+                values = np.where(values == 0, np.nan, values)
+            if col in preprocessor.median_cols:
+                self.stats.setdefault(('median', col), QuantileSketch(self.quantile_error, self.exact_limit)).update(values)
+            if col in preprocessor.mean_cols:
+                self.stats.setdefault(('mean', col), RunningMoments()).update(values)
+        return self
+
+    def merge(self, other):
+        for key, statistic in other.stats.items():
+            if key in self.stats:
+                self.stats[key].merge(statistic)
+            else:
+                self.stats[key] = copy.deepcopy(statistic)
+        return self
+
+    def fitted(self):
+        medians = {col: statistic.quantile(0.5) for (kind, col), statistic in self.stats.items() if kind == 'median'}
+        means = {col: statistic.value() for (kind, col), statistic in self.stats.items() if kind == 'mean'}
+        return copy.copy(self.preprocessor).set_statistics(medians, means)
@@ -0,0 +1,223 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import Pipeline
+import joblib
+import warnings
+warnings.filterwarnings('ignore')
+
+# Same classes the API and scripts import, so the saved pipeline unpickles
+# there as diabetes_transformers.* without going through __main__
+from diabetes_transformers import DIABETES_COLUMNS, FeatureEngineer
+from streaming_stats import QUANTILE_ERROR, ImputationStatistics
+
+# Log-odds bins used for the streaming holdout ROC AUC, over [-AUC_LOGIT_RANGE, AUC_LOGIT_RANGE]
+AUC_BINS = 1000
+AUC_LOGIT_RANGE = 20.0
+
+
+class BinnedAUC:
+    """ROC AUC from per-class histograms of the predicted log-odds; ties within a bin count half.
+
+    AUC only depends on the ranking, and log-odds keep apart the confident
+    scores that probability bins would lump together near 0 and 1.
+    """
+
+    def __init__(self, bins=AUC_BINS):
+        self.positives = np.zeros(bins, dtype=np.int64)
+        self.negatives = np.zeros(bins, dtype=np.int64)
+
+    def update(self, proba, y):
+        logit = np.clip(np.log(proba) - np.log1p(-proba), -AUC_LOGIT_RANGE, AUC_LOGIT_RANGE)
+        position = (logit + AUC_LOGIT_RANGE) / (2 * AUC_LOGIT_RANGE) * len(self.positives)
+        index = np.minimum(position.astype(np.int64), len(self.positives) - 1)
+        self.positives += np.bincount(index[y == 1], minlength=len(self.positives))
+        self.negatives += np.bincount(index[y != 1], minlength=len(self.negatives))
+
+    def auc(self):
+        n_pos = self.positives.sum()
+        n_neg = self.negatives.sum()
+        if not n_pos or not n_neg:
+            return np.nan
+        negatives_below = np.cumsum(self.negatives) - self.negatives
+        pairs = (self.positives * negatives_below).sum() + 0.5 * (self.positives * self.negatives).sum()
+        return float(pairs / (n_pos * n_neg))
+
+
+def target_column(path, target):
+    """Name of the outcome column: `target`, or Outcome/outcome in any case"""
+    if target:
+        return target
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        columns = pq.ParquetFile(path).schema_arrow.names
+    else:
+        columns = pd.read_csv(path, nrows=0).columns
+    for column in columns:
+        if column.lower() == 'outcome':
+            return column
+    raise ValueError(f"{path}: no outcome column, pass --target")
+
+
+def read_chunks(paths, target, chunk_rows):
+    """(features DataFrame, target ndarray) chunks of at most chunk_rows rows from CSV or Parquet files"""
+    for path in paths:
+        columns = DIABETES_COLUMNS + [target_column(path, target)]
+        if path.lower().endswith('.parquet'):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("Reading Parquet needs pyarrow: pip install pyarrow")
+            batches = (batch.to_pandas() for batch in
+                       pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns))
+        else:
+            batches = pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+        for chunk in batches:
+            X = chunk[DIABETES_COLUMNS].astype(np.float64)
+            yield X, chunk[columns[-1]].to_numpy(dtype=np.int64)
+
+
+def split_masks(paths, target, chunk_rows, holdout, seed, first_file=0):
+    """(X, y, holdout mask) chunks; a mask is seeded by file and chunk number, so every pass gets the same one"""
+    for file_number, path in enumerate(paths, first_file):
+        for number, (X, y) in enumerate(read_chunks([path], target, chunk_rows)):
+            held_out = np.random.default_rng([seed, file_number, number]).random(len(X)) < holdout
+            yield X, y, held_out
+
+
+def training_chunks(paths, target, chunk_rows, holdout, seed, first_file=0):
+    for X, y, held_out in split_masks(paths, target, chunk_rows, holdout, seed, first_file):
+        yield X[~held_out], y[~held_out]
+
+
+def fit_statistics(paths, target, chunk_rows, holdout, seed, quantile_error, first_file=0):
+    """(ImputationStatistics over the training rows of paths, row count)"""
+    statistics = ImputationStatistics(quantile_error)
+    rows = 0
+    for X, _ in training_chunks(paths, target, chunk_rows, holdout, seed, first_file):
+        statistics.partial_fit(X)
+        rows += len(X)
+    return statistics, rows
+
+
+def fit_statistics_file(args):
+    # Pool task: the statistics of one file, merged by the parent
+    return fit_statistics(*args)
+
+
+def train_diabetes_incremental(paths, output='diabetes_model.pkl', target=None, chunk_rows=100000,
+                               epochs=5, holdout=0.2, alpha=1e-3, quantile_error=QUANTILE_ERROR, jobs=1, seed=42):
+    """Train the diabetes pipeline over files larger than memory, one chunk at a time.
+
+    Every step reads the files again, so memory is bounded by chunk_rows:
+    one pass for the imputation statistics (ImputationStatistics.partial_fit;
+    with jobs > 1 one process per file, merged), one for StandardScaler.partial_fit
+    on the engineered features, then `epochs` passes of
+    SGDClassifier(loss='log_loss').partial_fit with the rows of each chunk
+    shuffled. A fixed random `holdout` share of rows, the same on every pass,
+    is left out of all fitting and scored at the end. The saved Pipeline has
+    the steps of train_diabetes_model.py, so the serving code loads it as is.
+    """
+    start = time.perf_counter()
+
+    print("Pass 1: imputation statistics...")
+    if jobs > 1 and len(paths) > 1:
+        tasks = [([path], target, chunk_rows, holdout, seed, quantile_error, i) for i, path in enumerate(paths)]
+        with multiprocessing.Pool(min(jobs, len(paths))) as pool:
+            shards = pool.map(fit_statistics_file, tasks)
+        statistics, rows = shards[0]
+        for shard, shard_rows in shards[1:]:
+            statistics.merge(shard)
+            rows += shard_rows
+    else:
+        statistics, rows = fit_statistics(paths, target, chunk_rows, holdout, seed, quantile_error)
+    # Only the fitted medians and means are needed from here on, and in the artifact
+    preprocessor = statistics.fitted()
+    print(f"  {rows} training rows, medians {preprocessor.medians_}, means {preprocessor.means_}")
+
+    feature_engineer = FeatureEngineer()
+
+    def features(X):
+        return feature_engineer.transform(preprocessor.transform(X))
+
+    print("Pass 2: scaler statistics...")
+    scaler = StandardScaler()
+    for X, _ in training_chunks(paths, target, chunk_rows, holdout, seed):
+        if len(X):
+            scaler.partial_fit(features(X))
+
+    classifier = SGDClassifier(loss='log_loss', alpha=alpha, average=True, random_state=seed)
+    classes = np.array([0, 1])
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        print(f"Pass {epoch + 3}: SGD epoch {epoch + 1}/{epochs}...")
+        for X, y in training_chunks(paths, target, chunk_rows, holdout, seed):
+            if not len(X):
+                continue
+            order = rng.permutation(len(X))
+            classifier.partial_fit(scaler.transform(features(X.iloc[order])), y[order], classes=classes)
+
+    pipeline = Pipeline([
+        ('preprocessor', preprocessor),
+        ('feature_engineer', feature_engineer),
+        ('scaler', scaler),
+        ('classifier', classifier)
+    ])
+
+    print("Scoring the holdout rows...")
+    auc = BinnedAUC()
+    held_out_rows = 0
+    correct = 0
+    log_loss = 0.0
+    for X, y, held_out in split_masks(paths, target, chunk_rows, holdout, seed):
+        if not held_out.any():
+            continue
+        X, y = X[held_out], y[held_out]
+        proba = np.clip(pipeline.predict_proba(X)[:, 1], 1e-15, 1 - 1e-15)
+        auc.update(proba, y)
+        held_out_rows += len(y)
+        correct += int(((proba >= 0.5) == (y == 1)).sum())
+        log_loss -= float(np.where(y == 1, np.log(proba), np.log(1 - proba)).sum())
+
+    print("\n=== Model Performance ===")
+    if held_out_rows:
+        print(f"Holdout rows: {held_out_rows}")
+        print(f"Holdout AUC-ROC: {auc.auc():.4f}")
+        print(f"Holdout Accuracy: {correct / held_out_rows:.4f}")
+        print(f"Holdout log loss: {log_loss / held_out_rows:.4f}")
+    print(f"Training time: {time.perf_counter() - start:.2f}s, "
+          f"peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    joblib.dump(pipeline, output)
+    print(f"\nModel saved to: {output}")
+
+    return pipeline
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the diabetes pipeline on CSV/Parquet files larger than memory")
+    parser.add_argument('paths', nargs='+', help="CSV or .parquet files with the 8 model columns and the outcome")
+    parser.add_argument('--output', default='diabetes_model.pkl')
+    parser.add_argument('--target', help="outcome column (default: Outcome, any case)")
+    parser.add_argument('--chunk-rows', type=int, default=100000, help="rows held in memory at a time")
+    parser.add_argument('--epochs', type=int, default=5, help="SGD passes over the training rows")
+    parser.add_argument('--holdout', type=float, default=0.2, help="share of rows left out for evaluation")
+    parser.add_argument('--alpha', type=float, default=1e-3, help="SGDClassifier L2 regularization")
+    parser.add_argument('--quantile-error', type=float, default=QUANTILE_ERROR,
+                        help="rank error of the streaming medians, as a fraction of the rows")
+    parser.add_argument('--jobs', type=int, default=1, help="processes computing the statistics, one file each")
+    args = parser.parse_args()
+
+    missing = [path for path in args.paths if not os.path.exists(path)]
+    if missing:
+        parser.error(f"no such file: {', '.join(missing)}")
+
+    model = train_diabetes_incremental(args.paths, args.output, args.target, args.chunk_rows, args.epochs,
+                                       args.holdout, args.alpha, args.quantile_error, args.jobs)
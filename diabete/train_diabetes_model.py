@@ -1,76 +1,55 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import train_test_split, GridSearchCV, HalvingGridSearchCV
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
-from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
 import joblib
+from joblib import Memory
 import warnings
 warnings.filterwarnings('ignore')
 
-# Custom Transformers
-class DiabetesPreprocessor(BaseEstimator, TransformerMixin):
-    def __init__(self):
-        self.zero_cols = ['Glucose', 'Insulin', 'SkinThickness', 'BloodPressure', 'BMI']
-        self.median_cols = ['Glucose', 'Insulin', 'SkinThickness']
-        self.mean_cols = ['BMI', 'BloodPressure']
-        self.medians_ = {}
-        self.means_ = {}
-
-    def fit(self, X, y=None):
-        # Replace 0 with NaN for medical impossibilities
-        X_processed = X.copy()
-        for col in self.zero_cols:
-            if col in X_processed.columns:
-                X_processed[col] = X_processed[col].replace(0, np.nan)
-
-        # Calculate medians and means for imputation
-        for col in self.median_cols:
-            if col in X_processed.columns:
-                self.medians_[col] = X_processed[col].median()
-
-        for col in self.mean_cols:
-            if col in X_processed.columns:
-                self.means_[col] = X_processed[col].mean()
-
-        return self
-
-    def transform(self, X):
-        X_processed = X.copy()
-
-        # Replace 0 with NaN for medical impossibilities
-        for col in self.zero_cols:
-            if col in X_processed.columns:
-                X_processed[col] = X_processed[col].replace(0, np.nan)
-
-        # Fill with fitted medians
-        for col in self.median_cols:
-            if col in X_processed.columns and col in self.medians_:
-                X_processed[col] = X_processed[col].fillna(self.medians_[col])
-
-        # Fill with fitted means
-        for col in self.mean_cols:
-            if col in X_processed.columns and col in self.means_:
-                X_processed[col] = X_processed[col].fillna(self.means_[col])
-
-        return X_processed
-
-class FeatureEngineer(BaseEstimator, TransformerMixin):
-    def fit(self, X, y=None):
-        return self
-
-    def transform(self, X):
-        X_engineered = X.copy()
-
-        # Feature interactions
-        if 'BloodPressure' in X.columns and 'Insulin' in X.columns:
-            X_engineered['p_BloodPressure_Insulin'] = X_engineered['BloodPressure'] * X_engineered['Insulin']
-
-        return X_engineered
-
-def train_diabetes_model():
+# Same classes the API and scripts import, so the saved pipeline unpickles
+# there as diabetes_transformers.* and parallel search workers can load them
+from diabetes_transformers import DiabetesPreprocessor, FeatureEngineer
+
+def round_seconds(search):
+    """Fit and score seconds of each round of a fitted search, summed over its candidates and folds.
+
+    Exhaustive search has one round; successive halving has one per
+    resource level, numbered in cv_results_['iter'].
+    """
+    results = search.cv_results_
+    rounds = np.asarray(results.get('iter', np.zeros(len(results['params']), dtype=int)))
+    seconds = (np.asarray(results['mean_fit_time']) + np.asarray(results['mean_score_time'])) * search.n_splits_
+    return rounds, np.array([seconds[rounds == i].sum() for i in range(rounds.max() + 1)])
+
+def time_to_best(search):
+    """Fit and score seconds spent up to the end of the first round led by the finally chosen parameters"""
+    results = search.cv_results_
+    best = results['params'][search.best_index_]
+    rounds, seconds = round_seconds(search)
+    spent = np.cumsum(seconds)
+    for i in range(len(seconds)):
+        in_round = np.flatnonzero(rounds == i)
+        if np.isnan(results['mean_test_score'][in_round]).all():
+            continue
+        leader = in_round[np.nanargmax(results['mean_test_score'][in_round])]
+        if results['params'][leader] == best:
+            return float(spent[i])
+    return float(spent[-1])
+
+def train_diabetes_model(cache_dir=None, compare_cache=False, search_mode='grid', n_jobs=-1,
+                         model_path='diabetes_model.pkl'):
     # Load diabetes dataset (using a simple dataset for demo)
     # In a real scenario, you would load your actual diabetes dataset
     print("Loading diabetes dataset...")
@@ -115,30 +94,87 @@ def train_diabetes_model():
         X, y, test_size=0.2, random_state=42, stratify=y
     )
 
+    # Fitted transformer outputs are cached per fold on disk, so each extra
+    # candidate only refits the classifier on already-transformed data, in
+    # whichever worker process it runs; --cache-dir keeps them for later runs
+    temp_dir = None if cache_dir else tempfile.mkdtemp(prefix='diabetes_search_')
+    memory = Memory(cache_dir or temp_dir, verbose=0)
+
     # Create pipeline
     pipeline = Pipeline([
         ('preprocessor', DiabetesPreprocessor()),
         ('feature_engineer', FeatureEngineer()),
         ('scaler', StandardScaler()),
         ('classifier', LogisticRegression(random_state=42))
-    ])
+    ], memory=memory)
 
     # Hyperparameter tuning
-    param_grid = {
-        'classifier__C': [0.1, 1, 10],
-        'classifier__penalty': ['l1', 'l2'],
-        'classifier__solver': ['liblinear']
-    }
+    if search_mode == 'halving':
+        # Wider space: log-spaced C, elastic net mixing (0 is l2, 1 is l1) and
+        # class weighting. Successive halving scores every candidate on a small
+        # subset of the training rows, keeps the best third and triples the
+        # rows, until the survivors are scored on all of them
+        param_grid = {
+            'classifier__C': np.logspace(-3, 2, 11),
+            'classifier__penalty': ['elasticnet'],
+            'classifier__l1_ratio': [0.0, 0.25, 0.5, 0.75, 1.0],
+            'classifier__class_weight': [None, 'balanced'],
+            'classifier__solver': ['saga'],
+            'classifier__max_iter': [1000]
+        }
+    else:
+        param_grid = {
+            'classifier__C': [0.1, 1, 10],
+            'classifier__penalty': ['l1', 'l2'],
+            'classifier__solver': ['liblinear']
+        }
+    n_candidates = int(np.prod([len(values) for values in param_grid.values()]))
+
+    def run_search(estimator):
+        if search_mode == 'halving':
+            # Like min_resources='exhaust' (the last round uses every row), but
+            # with at least 60 rows so each of the 5 test folds holds both
+            # classes and ROC AUC is defined in the first round
+            factor = 3
+            n_rounds = int(np.ceil(np.log(n_candidates) / np.log(factor)))
+            min_resources = max(60, len(X_train) // factor ** (n_rounds - 1))
+            search = HalvingGridSearchCV(
+                estimator, param_grid, cv=5, scoring='roc_auc', n_jobs=n_jobs,
+                factor=factor, min_resources=min_resources, random_state=42
+            )
+        else:
+            search = GridSearchCV(
+                estimator, param_grid, cv=5, scoring='roc_auc', n_jobs=n_jobs
+            )
+        start = time.perf_counter()
+        search.fit(X_train, y_train)
+        return search, time.perf_counter() - start
 
     print("Training model with hyperparameter tuning...")
-    grid_search = GridSearchCV(
-        pipeline, param_grid, cv=5, scoring='roc_auc', n_jobs=-1
-    )
-
-    grid_search.fit(X_train, y_train)
-
-    # Best model
+    try:
+        grid_search, cached_seconds = run_search(pipeline)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    if search_mode == 'halving':
+        rounds = ", ".join(f"{candidates} on {resources} rows"
+                           for candidates, resources in zip(grid_search.n_candidates_, grid_search.n_resources_))
+        print(f"Successive halving: {n_candidates} candidates x 5 folds in {cached_seconds:.2f}s ({rounds})")
+    else:
+        print(f"Grid search: {n_candidates} candidates x 5 folds in {cached_seconds:.2f}s")
+    # From cv_results_: fit and score time of every fold, so across workers it can exceed the wall clock
+    fit_seconds = float(round_seconds(grid_search)[1].sum())
+    best_seconds = time_to_best(grid_search)
+    print(f"Time to best score: {best_seconds:.2f}s of {fit_seconds:.2f}s fitting and scoring")
+
+    if compare_cache:
+        _, uncached_seconds = run_search(clone(pipeline).set_params(memory=None))
+        print(f"Same search without the transformer cache: {uncached_seconds:.2f}s "
+              f"(cache saved {uncached_seconds - cached_seconds:.2f}s)")
+
+    # Best model; the saved pipeline must not reference the cache directory
     best_pipeline = grid_search.best_estimator_
+    best_pipeline.set_params(memory=None)
 
     # Evaluate
     y_pred = best_pipeline.predict(X_test)
@@ -157,11 +193,35 @@ def train_diabetes_model():
     print(confusion_matrix(y_test, y_pred))
 
     # Save the model
-    model_path = 'diabetes_model.pkl'
     joblib.dump(best_pipeline, model_path)
     print(f"\nModel saved to: {model_path}")
 
+    # The chosen parameters and how long the search took to find them, next to the model
+    search_path = os.path.splitext(model_path)[0] + '_search.json'
+    with open(search_path, 'w') as f:
+        json.dump({
+            "search": search_mode,
+            "candidates": n_candidates,
+            "bestParams": {name: value for name, value in grid_search.best_params_.items()},
+            "bestScore": grid_search.best_score_,
+            "searchSeconds": round(cached_seconds, 3),
+            "fitSeconds": round(fit_seconds, 3),
+            "timeToBestSeconds": round(best_seconds, 3)
+        }, f, indent=2)
+    print(f"Search summary saved to: {search_path}")
+
     return best_pipeline
 
 if __name__ == "__main__":
-    model = train_diabetes_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the diabetes risk pipeline")
+    parser.add_argument('--cache-dir', help="keep the per-fold transformer cache here across runs (default: a temporary directory, this run only)")
+    parser.add_argument('--compare-cache', action='store_true',
+                        help="also run the search without the cache and report the wall-clock difference")
+    parser.add_argument('--search', choices=['grid', 'halving'], default='grid',
+                        help="exhaustive grid, or successive halving over a wider space (C, l1_ratio, class_weight)")
+    parser.add_argument('--jobs', type=int, default=-1, help="parallel search workers (default: -1, every core)")
+    parser.add_argument('--output', default='diabetes_model.pkl',
+                        help="model path; the search summary is written next to it as <name>_search.json")
+    args = parser.parse_args()
+
+    model = train_diabetes_model(args.cache_dir, args.compare_cache, args.search, args.jobs, args.output)
\ No newline at end of file
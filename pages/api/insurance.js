@@ -1,5 +1,5 @@
-import { spawn } from 'child_process';
 import path from 'path';
+import { getWorkerPool } from '../../src/infrastructure/python/PythonWorkerPool';
 
 export default function handler(req, res) {
   // Handle CORS
@@ -37,31 +37,10 @@ export default function handler(req, res) {
 
       console.log('Running insurance prediction with data:', inputData);
 
-      // Run Python script
-      const python = spawn('python', [scriptPath, modelPath, inputData]);
-
-      let pythonOutput = '';
-      let pythonError = '';
-
-      python.stdout.on('data', (data) => {
-        pythonOutput += data.toString();
-      });
-
-      python.stderr.on('data', (data) => {
-        pythonError += data.toString();
-      });
-
-      python.on('close', (code) => {
-        if (code !== 0) {
-          console.error('Python script error:', pythonError);
-          res.status(500).json({ error: `Python script failed: ${pythonError}` });
-          return;
-        }
-
-        try {
-          console.log('Python output:', pythonOutput);
-          const result = JSON.parse(pythonOutput.trim());
-
+      // Run the prediction on a warm Python worker (model stays loaded between requests)
+      getWorkerPool('insurance', scriptPath, modelPath)
+        .predict(inputData)
+        .then((result) => {
           const response = {
             predictedCost: Math.round(result.predicted_cost * 100) / 100,
             currency: 'USD',
@@ -78,12 +57,11 @@ export default function handler(req, res) {
 
           console.log('Sending response:', response);
           res.status(200).json(response);
-        } catch (parseError) {
-          console.error('JSON parse error:', parseError);
-          console.error('Raw output:', pythonOutput);
-          res.status(500).json({ error: 'Failed to parse Python output' });
-        }
-      });
+        })
+        .catch((error) => {
+          console.error('Python worker error:', error);
+          res.status(500).json({ error: `Python worker failed: ${error.message}` });
+        });
 
     } catch (error) {
       console.error('Request error:', error);
@@ -0,0 +1,349 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+import warnings
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from diabetes_transformers import DiabetesPreprocessor, FeatureEngineer
+from insurance_transformers import CustomLabelEncoder, FeatureSelector
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(BASE_DIR, 'api')
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(API_DIR)
+
+from diabetes_engine import DiabetesEngine
+from insurance_engine import InsuranceEngine
+from model_registry import expose_to_main
+
+import joblib
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings('ignore')
+
+# The pickles reference __main__, which may not be this module
+expose_to_main(DiabetesPreprocessor, FeatureEngineer, CustomLabelEncoder, FeatureSelector)
+
+MODELS = {
+    'diabetes': {
+        'pkl': os.path.join(BASE_DIR, 'diabetes_model.pkl'),
+        'params': os.path.join(BASE_DIR, 'diabetes_model_params.json'),
+        'script': os.path.join(SCRIPTS_DIR, 'predict_diabetes.py'),
+        'csv': os.path.join(BASE_DIR, 'diabete', 'diabetes.csv'),
+        'columns': ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+                    'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'],
+        'api_keys': ['pregnancies', 'glucose', 'bloodPressure', 'skinThickness',
+                     'insulin', 'bmi', 'diabetesPedigreeFunction', 'age'],
+        'integer': ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'Age'],
+        'categorical': []
+    },
+    'insurance': {
+        'pkl': os.path.join(BASE_DIR, 'insurance_cost_model.pkl'),
+        'params': os.path.join(BASE_DIR, 'insurance_model_params.json'),
+        'script': os.path.join(SCRIPTS_DIR, 'predict_insurance.py'),
+        'csv': os.path.join(BASE_DIR, 'costos-medicos', 'insurance.csv'),
+        'columns': ['age', 'bmi', 'children', 'smoker'],
+        'api_keys': ['age', 'bmi', 'children', 'smoker'],
+        'integer': ['age', 'children'],
+        'categorical': ['smoker']
+    }
+}
+
+PATHS = ['http', 'spawn', 'worker', 'pipeline', 'params']
+DEFAULT_SIZES = [1, 100, 10000, 1000000]
+
+
+def synthetic_rows(model_name, n, rng):
+    """Bootstrap n rows from the training CSV, jittering the numeric columns by up to 5%"""
+    spec = MODELS[model_name]
+    source = pd.read_csv(spec['csv'])[spec['columns']]
+    df = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+
+    for col in spec['columns']:
+        if col in spec['categorical']:
+            continue
+        values = df[col].to_numpy(dtype=np.float64)
+        values = np.clip(values * rng.uniform(0.95, 1.05, n), 0, None)
+        if col in spec['integer']:
+            values = np.round(values)
+        df[col] = values
+    return df
+
+
+def api_records(model_name, df):
+    spec = MODELS[model_name]
+    records = df.rename(columns=dict(zip(spec['columns'], spec['api_keys']))).to_dict('records')
+    return records
+
+
+def cli_inputs(model_name, df):
+    """Rows in the comma-separated format the JS routes pass to predict_*.py"""
+    integer = set(MODELS[model_name]['integer'])
+    lines = []
+    for row in df.itertuples(index=False):
+        parts = []
+        for col, value in zip(df.columns, row):
+            parts.append(str(int(value)) if col in integer else str(value))
+        lines.append(','.join(parts))
+    return lines
+
+
+def serve_handler(model_name, port, ready):
+    """Child process: run the api/<model>.py handler on a local threaded HTTP server"""
+    from http.server import ThreadingHTTPServer
+    import importlib
+
+    warnings.filterwarnings('ignore')
+    module = importlib.import_module(model_name)
+
+    class QuietHandler(module.handler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), QuietHandler)
+    ready.set()
+    server.serve_forever()
+
+
+class HttpPath:
+    """POST to the api/*.py handler; batches use the JSON-array batch mode"""
+
+    def __init__(self, model_name, port):
+        self.model_name = model_name
+        self.port = port
+        ready = multiprocessing.Event()
+        self.process = multiprocessing.Process(target=serve_handler, args=(model_name, port, ready), daemon=True)
+        self.process.start()
+        ready.wait(30)
+
+    def prepare(self, df):
+        records = api_records(self.model_name, df)
+        return json.dumps(records[0] if len(records) == 1 else records).encode()
+
+    def run(self, body):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=600)
+        conn.request('POST', '/', body, {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        conn.close()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+
+    def close(self):
+        self.process.terminate()
+        self.process.join()
+
+
+class SpawnPath:
+    """One `python scripts/predict_*.py <model> <row>` process per row, as the JS routes used to"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.env = dict(os.environ, PYTHONWARNINGS='ignore')
+
+    def prepare(self, df):
+        return cli_inputs(self.model_name, df)
+
+    def run(self, lines):
+        spec = MODELS[self.model_name]
+        for line in lines:
+            subprocess.run([sys.executable, spec['script'], spec['pkl'], line],
+                           check=True, capture_output=True, env=self.env)
+
+    def close(self):
+        pass
+
+
+class WorkerPath:
+    """NDJSON requests to one warm `predict_*.py --worker` process, as the JS worker pool does"""
+
+    def __init__(self, model_name):
+        spec = MODELS[model_name]
+        self.model_name = model_name
+        self.process = subprocess.Popen(
+            [sys.executable, spec['script'], '--worker', spec['pkl']],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            env=dict(os.environ, PYTHONWARNINGS='ignore'))
+        self.process.stdout.readline()  # ready event
+
+    def prepare(self, df):
+        lines = cli_inputs(self.model_name, df)
+        return ''.join(json.dumps({"id": i, "input": line}) + '\n' for i, line in enumerate(lines)), len(lines)
+
+    def run(self, payload):
+        text, count = payload
+
+        # Write from a thread so a large batch cannot deadlock on full pipes
+        def write():
+            self.process.stdin.write(text)
+            self.process.stdin.flush()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        for _ in range(count):
+            response = json.loads(self.process.stdout.readline())
+            if 'error' in response:
+                raise RuntimeError(response['error'])
+        writer.join()
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class PipelinePath:
+    """The pickled sklearn Pipeline on a DataFrame"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.model = joblib.load(MODELS[model_name]['pkl'])
+
+    def prepare(self, df):
+        return df
+
+    def run(self, df):
+        if self.model_name == 'diabetes':
+            self.model.predict_proba(df)
+        else:
+            self.model.predict(df)
+
+    def close(self):
+        pass
+
+
+class ParamsPath:
+    """The NumPy engines built from the exported *_model_params.json"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        if model_name == 'diabetes':
+            self.engine = DiabetesEngine.from_file(MODELS[model_name]['params'])
+        else:
+            self.engine = InsuranceEngine.from_file(MODELS[model_name]['params'])
+
+    def prepare(self, df):
+        if self.model_name == 'diabetes':
+            return df.to_numpy(dtype=np.float64)
+        return self.engine.encode(df)
+
+    def run(self, X):
+        if self.model_name == 'diabetes':
+            self.engine.predict_proba(X)
+        else:
+            self.engine.predict_encoded(X)
+
+    def close(self):
+        pass
+
+
+def measure(path, payload, repeats, budget):
+    """Run at least 3 and at most `repeats` iterations, stopping once `budget` seconds are spent"""
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < repeats:
+        t0 = time.perf_counter()
+        path.run(payload)
+        latencies.append(time.perf_counter() - t0)
+        if len(latencies) >= 3 and time.perf_counter() - start > budget:
+            break
+    return np.array(latencies)
+
+
+def summarize(model_name, path_name, size, latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "model": model_name,
+        "path": path_name,
+        "batch_size": size,
+        "iterations": len(latencies),
+        "p50_ms": round(p50 * 1000, 4),
+        "p95_ms": round(p95 * 1000, 4),
+        "p99_ms": round(p99 * 1000, 4),
+        "mean_ms": round(latencies.mean() * 1000, 4),
+        "rows_per_sec": round(size / p50, 3)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_path(path_name, model_name, port):
+    if path_name == 'http':
+        return HttpPath(model_name, port)
+    if path_name == 'spawn':
+        return SpawnPath(model_name)
+    if path_name == 'worker':
+        return WorkerPath(model_name)
+    if path_name == 'pipeline':
+        return PipelinePath(model_name)
+    return ParamsPath(model_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmark for every prediction serving path")
+    parser.add_argument('--models', default='diabetes,insurance')
+    parser.add_argument('--paths', default=','.join(PATHS), help=f"comma-separated subset of {PATHS}")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument('--repeats', type=int, default=100, help="max iterations per (path, size)")
+    parser.add_argument('--budget', type=float, default=10.0, help="seconds per (path, size) before stopping early")
+    parser.add_argument('--spawn-max-rows', type=int, default=1, help="skip larger batches on the spawn path")
+    parser.add_argument('--worker-max-rows', type=int, default=100, help="skip larger batches on the worker path")
+    parser.add_argument('--port', type=int, default=8765, help="first local port for the http path")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="append JSON lines here instead of stdout")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    limits = {'spawn': args.spawn_max_rows, 'worker': args.worker_max_rows}
+    rng = np.random.default_rng(args.seed)
+    run_info = {"timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'), "commit": git_commit()}
+
+    out = open(args.output, 'a') if args.output else sys.stdout
+    port = args.port
+
+    try:
+        for model_name in args.models.split(','):
+            data = {size: synthetic_rows(model_name, size, rng) for size in sizes}
+
+            for path_name in args.paths.split(','):
+                path = make_path(path_name, model_name, port)
+                port += 1
+                try:
+                    for size in sizes:
+                        if size > limits.get(path_name, size):
+                            result = {"model": model_name, "path": path_name, "batch_size": size, "skipped": True}
+                        else:
+                            payload = path.prepare(data[size])
+                            path.run(payload)  # warm-up
+                            result = summarize(model_name, path_name, size,
+                                               measure(path, payload, args.repeats, args.budget))
+
+                        out.write(json.dumps({**run_info, **result}) + '\n')
+                        out.flush()
+                        if not result.get('skipped'):
+                            print(f"{model_name:<10} {path_name:<9} {size:>8} rows  p50 {result['p50_ms']:>10.3f} ms  "
+                                  f"p99 {result['p99_ms']:>10.3f} ms  {result['rows_per_sec']:>12.0f} rows/s",
+                                  file=sys.stderr)
+                finally:
+                    path.close()
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+from insurance_quote_table import InsuranceQuoteTable
+from model_registry import registry
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the insurance quote table for the current model")
+    parser.add_argument('--backend', choices=['pipeline', 'params'], default='pipeline',
+                        help="model the table is built from; must match INSURANCE_MODEL_BACKEND")
+    parser.add_argument('--age-min', type=int, default=18)
+    parser.add_argument('--age-max', type=int, default=64)
+    parser.add_argument('--children-max', type=int, default=5)
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, 'insurance_quote_table.npy'))
+    args = parser.parse_args()
+
+    name = 'insurance_params' if args.backend == 'params' else 'insurance'
+    model, version = registry.get(name)
+    options = {
+        'age_range': (args.age_min, args.age_max),
+        'children_max': args.children_max,
+        'version': version
+    }
+
+    if args.backend == 'params':
+        table = InsuranceQuoteTable.from_engine(model, **options)
+    else:
+        table = InsuranceQuoteTable.from_pipeline(model, **options)
+
+    table.save(args.output)
+    print(f"SUCCESS: {table.coefficients.shape} quote table for model {table.version} "
+          f"saved to {os.path.basename(args.output)} ({table.coefficients.nbytes} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+from prediction_store import PredictionStore
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk export of the SQLite prediction store as NDJSON")
+    parser.add_argument('store', nargs='?', default=os.environ.get('PREDICTION_STORE'),
+                        help="SQLite file (default: $PREDICTION_STORE)")
+    parser.add_argument('--service', choices=['diabetes', 'insurance'])
+    parser.add_argument('--model-version')
+    parser.add_argument('--audit', action='store_true', help="export the served-predictions log instead of results")
+    parser.add_argument('--output', help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    if not args.store or not os.path.exists(args.store):
+        parser.error("no prediction store found; pass its path or set PREDICTION_STORE")
+
+    store = PredictionStore(args.store)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        count = store.export(out, service=args.service, version=args.model_version, include_served=args.audit)
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {count} rows", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,19 @@ import sys
 import os
 import pickle
 
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+# The pickles reference the custom transformers, import them before loading
+from diabetes_transformers import DiabetesPreprocessor, FeatureEngineer
+from insurance_transformers import CustomLabelEncoder, FeatureSelector
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 def extract_diabetes_model():
     """Extract parameters from diabetes model"""
     try:
-        model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'diabetes_model.pkl')
+        model_path = os.path.join(BASE_DIR, 'diabetes_model.pkl')
         model = joblib.load(model_path)
 
         # Get the actual trained model (it might be in a pipeline)
@@ -31,23 +40,35 @@ def extract_diabetes_model():
         intercept = float(classifier.intercept_[0]) if hasattr(classifier.intercept_, '__len__') else float(classifier.intercept_)
 
         # Get feature names (assuming standard diabetes dataset order)
-        feature_names = [
+        input_features = [
             'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
             'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
         ]
+        feature_names = list(input_features)
 
         # Check if there are additional engineered features
         if len(coef) > len(feature_names):
             # Add interaction features
             feature_names.append('p_BloodPressure_Insulin')
 
+        # Prefer the names the pipeline actually saw at fit time
+        if hasattr(model, 'named_steps'):
+            for step_name, step in model.named_steps.items():
+                if step is not classifier and hasattr(step, 'feature_names_in_') and len(step.feature_names_in_) == len(coef):
+                    feature_names = [str(name) for name in step.feature_names_in_]
+
         params = {
             'intercept': intercept,
             'coefficients': {name: float(coef[i]) for i, name in enumerate(feature_names[:len(coef)])},
             'model_type': str(type(classifier).__name__),
-            'n_features': len(coef)
+            'n_features': len(coef),
+            'input_features': input_features,
+            'feature_names': feature_names[:len(coef)]
         }
 
+        if hasattr(classifier, 'classes_'):
+            params['classes'] = [int(c) for c in classifier.classes_]
+
         # Try to get preprocessing parameters if available
         preprocessor = None
         if hasattr(model, 'named_steps'):
@@ -61,6 +82,32 @@ def extract_diabetes_model():
                 params['medians'] = {k: float(v) for k, v in preprocessor.medians_.items()}
             if hasattr(preprocessor, 'means_'):
                 params['means'] = {k: float(v) for k, v in preprocessor.means_.items()}
+            params['zero_cols'] = list(getattr(preprocessor, 'zero_cols', []))
+
+        # Remaining steps of the chain, in pipeline order, so it can be replayed with NumPy only
+        if hasattr(model, 'named_steps'):
+            params['pipeline_steps'] = []
+            for step_name, step in model.named_steps.items():
+                if isinstance(step, DiabetesPreprocessor):
+                    params['pipeline_steps'].append({'name': step_name, 'type': 'DiabetesPreprocessor'})
+                elif isinstance(step, FeatureEngineer):
+                    params['pipeline_steps'].append({'name': step_name, 'type': 'FeatureEngineer'})
+                    params['interactions'] = [
+                        {'name': 'p_BloodPressure_Insulin', 'columns': ['BloodPressure', 'Insulin']}
+                    ]
+                elif hasattr(step, 'mean_') and hasattr(step, 'n_features_in_'):
+                    params['pipeline_steps'].append({'name': step_name, 'type': type(step).__name__})
+                    n = step.n_features_in_
+                    with_mean = getattr(step, 'with_mean', True)
+                    with_std = getattr(step, 'with_std', True)
+                    params['scaler'] = {
+                        'mean': [float(v) for v in step.mean_] if with_mean else [0.0] * n,
+                        'scale': [float(v) for v in step.scale_] if with_std else [1.0] * n
+                    }
+                elif step is classifier:
+                    params['pipeline_steps'].append({'name': step_name, 'type': type(step).__name__})
+                else:
+                    raise ValueError(f"Don't know how to export pipeline step {step_name}: {type(step).__name__}")
 
         return params
 
@@ -68,10 +115,11 @@ def extract_diabetes_model():
         print(f"Error extracting diabetes model: {e}")
         return None
 
-def extract_insurance_model():
-    """Extract parameters from insurance model"""
+def extract_insurance_model(model_path=None):
+    """Extract parameters from insurance model (default: insurance_cost_model.pkl in the project root)"""
     try:
-        model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'insurance_cost_model.pkl')
+        if model_path is None:
+            model_path = os.path.join(BASE_DIR, 'insurance_cost_model.pkl')
         model = joblib.load(model_path)
 
         # Get the actual trained model (it might be in a pipeline)
@@ -93,27 +141,44 @@ def extract_insurance_model():
         coef = regressor.coef_
         intercept = float(regressor.intercept_)
 
-        # Get feature names (based on polynomial features)
-        # This will depend on how the model was trained
-        feature_names = []
-        if len(coef) == 4:
-            # Simple linear features: age, bmi, children, smoker
-            feature_names = ['age', 'bmi', 'children', 'smoker']
-        elif len(coef) > 4:
-            # Polynomial features - we need to map them
-            # Common polynomial features for this type of model:
-            feature_names = ['age', 'bmi', 'children', 'smoker']
-            # Add polynomial terms if they exist
-            if len(coef) > 4:
-                feature_names.extend(['age_squared', 'bmi_squared', 'age_bmi'])
+        # Input features in pipeline order (only age, bmi, children, smoker were used)
+        input_features = ['age', 'bmi', 'children', 'smoker']
+
+        # Each polynomial term is prod(x_j ** powers[j]); record the exact layout
+        poly = None
+        if hasattr(model, 'named_steps'):
+            for step_name, step in model.named_steps.items():
+                if hasattr(step, 'powers_'):
+                    poly = step
+                    break
+
+        if poly is not None:
+            if hasattr(poly, 'feature_names_in_'):
+                input_features = [str(name) for name in poly.feature_names_in_]
+            feature_names = [str(name) for name in poly.get_feature_names_out(input_features)]
+            powers = poly.powers_.tolist()
+        else:
+            # Plain linear model: one term per input
+            feature_names = list(input_features)
+            powers = np.eye(len(input_features), dtype=int).tolist()
+
+        if len(feature_names) != len(coef):
+            raise ValueError(f"{len(feature_names)} polynomial terms but {len(coef)} coefficients")
 
         params = {
             'intercept': intercept,
-            'coefficients': {name: float(coef[i]) for i, name in enumerate(feature_names[:len(coef)])},
+            'coefficients': {name: float(coef[i]) for i, name in enumerate(feature_names)},
             'model_type': str(type(regressor).__name__),
-            'n_features': len(coef)
+            'n_features': len(coef),
+            'input_features': input_features,
+            'feature_names': feature_names,
+            'powers': powers
         }
 
+        if poly is not None:
+            params['degree'] = poly.degree
+            params['include_bias'] = poly.include_bias
+
         # Try to get label encoder mappings if available
         encoder = None
         if hasattr(model, 'named_steps'):
@@ -128,7 +193,7 @@ def extract_insurance_model():
                 if hasattr(enc, 'classes_'):
                     params['encoders'][col] = {
                         'classes': enc.classes_.tolist(),
-                        'mapping': {cls: i for i, cls in enumerate(enc.classes_)}
+                        'mapping': {str(cls): i for i, cls in enumerate(enc.classes_)}
                     }
 
         return params
@@ -143,7 +208,7 @@ def main():
     # Extract diabetes model parameters
     diabetes_params = extract_diabetes_model()
     if diabetes_params:
-        with open('diabetes_model_params.json', 'w') as f:
+        with open(os.path.join(BASE_DIR, 'diabetes_model_params.json'), 'w') as f:
             json.dump(diabetes_params, f, indent=2)
         print("SUCCESS: Diabetes model parameters saved to diabetes_model_params.json")
     else:
@@ -152,7 +217,7 @@ def main():
     # Extract insurance model parameters
     insurance_params = extract_insurance_model()
     if insurance_params:
-        with open('insurance_model_params.json', 'w') as f:
+        with open(os.path.join(BASE_DIR, 'insurance_model_params.json'), 'w') as f:
             json.dump(insurance_params, f, indent=2)
         print("SUCCESS: Insurance model parameters saved to insurance_model_params.json")
     else:
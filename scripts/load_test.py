@@ -0,0 +1,389 @@
+import argparse
+import csv
+import http.client
+import json
+import math
+import os
+import queue
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (CSV column, request key, integer) per service, in request order; 'inputs' is the
+# key order of the positional input lists older prediction stores exported
+SERVICES = {
+    'diabetes': {
+        'path': '/api/diabetes',
+        'csv': os.path.join(BASE_DIR, 'diabete', 'diabetes.csv'),
+        'fields': [('Pregnancies', 'pregnancies', True), ('Glucose', 'glucose', True),
+                   ('BloodPressure', 'bloodPressure', True), ('SkinThickness', 'skinThickness', True),
+                   ('Insulin', 'insulin', True), ('BMI', 'bmi', False),
+                   ('DiabetesPedigreeFunction', 'diabetesPedigreeFunction', False), ('Age', 'age', True)],
+        'inputs': ['pregnancies', 'glucose', 'bloodPressure', 'skinThickness', 'insulin', 'bmi',
+                   'diabetesPedigreeFunction', 'age']
+    },
+    'insurance': {
+        'path': '/api/insurance',
+        'csv': os.path.join(BASE_DIR, 'costos-medicos', 'insurance.csv'),
+        'fields': [('age', 'age', True), ('sex', 'sex', None), ('bmi', 'bmi', False),
+                   ('children', 'children', True), ('smoker', 'smoker', None), ('region', 'region', None)],
+        'inputs': ['age', 'bmi', 'children', 'smoker']
+    }
+}
+
+PERCENTILES = [50, 90, 99, 99.9]
+
+
+def generated_payloads(service, count, rng):
+    """Bootstrap request bodies from the training CSV, jittering numeric fields by up to 5%"""
+    spec = SERVICES[service]
+    with open(spec['csv'], newline='') as f:
+        rows = list(csv.DictReader(f))
+
+    payloads = []
+    for _ in range(count):
+        row = rng.choice(rows)
+        body = {}
+        for column, key, integer in spec['fields']:
+            if integer is None:
+                body[key] = row[column]
+                continue
+            value = max(0.0, float(row[column]) * rng.uniform(0.95, 1.05))
+            body[key] = int(round(value)) if integer else round(value, 3)
+        payloads.append((spec['path'], json.dumps(body).encode()))
+    return payloads
+
+
+def replayed_payloads(path, default_service):
+    """Request bodies from an NDJSON log.
+
+    A line is either the request body itself (sent to the default service),
+    {"service": ..., "body": {...}}, or a row of
+    `scripts/export_predictions.py` ({"service": ..., "inputs": {...}}).
+    Exports of older stores hold the inputs as a list in the service's
+    'inputs' order; it is turned back into a request body.
+    """
+    payloads = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            service = default_service
+            body = item
+            if isinstance(item, dict) and ('body' in item or 'inputs' in item):
+                service = item.get('service', default_service)
+                body = item['body'] if 'body' in item else item['inputs']
+            if service not in SERVICES:
+                raise ValueError(f"{path}:{number}: unknown service {service!r}")
+            if isinstance(item, dict) and isinstance(body, list):
+                # A JSON array body would be scored as a batch
+                keys = SERVICES[service]['inputs']
+                if len(body) != len(keys):
+                    raise ValueError(f"{path}:{number}: {len(body)} inputs, expected {len(keys)} for {service}")
+                body = dict(zip(keys, body))
+            payloads.append((SERVICES[service]['path'], json.dumps(body).encode()))
+    if not payloads:
+        raise ValueError(f"{path} has no requests")
+    return payloads
+
+
+class Client:
+    """One keep-alive connection; reconnects after errors or a server-side close"""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+
+    def post(self, path, body):
+        """Returns (HTTP status, failed); status 0 when the request failed at the connection level.
+
+        A 2xx batch response that reports rows with errors counts as failed.
+        """
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request('POST', path, body, {'Content-Type': 'application/json'})
+                response = self.conn.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.close()
+                failed = not 200 <= response.status < 300
+                if not failed and b'"errorCount"' in data:
+                    failed = json.loads(data).get('errorCount', 0) > 0
+                return response.status, failed
+            except (OSError, http.client.HTTPException, ValueError):
+                self.close()
+                # A kept-alive connection closed by the server is retried once on a new one
+                if attempt == 1:
+                    return 0, True
+        return 0, True
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def run_open_loop(args, host, port, payloads, rng):
+    """Send at a fixed arrival rate, whether or not earlier requests have finished.
+
+    Latency is measured from each request's intended send time, so time spent
+    queued behind a slow server (or a saturated client) is counted instead of
+    omitted.
+    """
+    pending = queue.Queue()
+    results = []
+
+    def worker():
+        client = Client(host, port, args.timeout)
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            intended, (path, body) = item
+            started = time.perf_counter()
+            status, failed = client.post(path, body)
+            results.append((intended, started, time.perf_counter(), status, failed))
+        client.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.connections)]
+    for thread in threads:
+        thread.start()
+
+    start = time.perf_counter() + 0.05
+    end = start + args.duration
+    intended = start
+    max_backlog = 0
+    i = 0
+    while intended < end:
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pending.put((intended, payloads[i % len(payloads)]))
+        max_backlog = max(max_backlog, pending.qsize())
+        i += 1
+        interval = rng.expovariate(args.rate) if args.arrival == 'poisson' else 1.0 / args.rate
+        intended += interval
+
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    return start, results, {"maxClientBacklog": max_backlog}
+
+
+def run_closed_loop(args, host, port, payloads, rng):
+    """Each connection sends its next request as soon as the previous one returns"""
+    results = []
+    counter = iter(range(sys.maxsize))
+    start = time.perf_counter()
+    end = start + args.duration
+
+    def worker():
+        client = Client(host, port, args.timeout)
+        while True:
+            started = time.perf_counter()
+            if started >= end:
+                break
+            path, body = payloads[next(counter) % len(payloads)]
+            status, failed = client.post(path, body)
+            results.append((started, started, time.perf_counter(), status, failed))
+        client.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return start, results, {}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    rank = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+def corrected_latencies(latencies, interval):
+    """Add the samples a closed-loop client never sent while it was stuck (HdrHistogram-style).
+
+    A request that took L > interval stalled the requests that would have
+    been sent every `interval` meanwhile; they would have seen L - interval,
+    L - 2 * interval, ...
+    """
+    corrected = list(latencies)
+    if interval > 0:
+        for latency in latencies:
+            missed = latency - interval
+            while missed > 0:
+                corrected.append(missed)
+                missed -= interval
+    return corrected
+
+
+def summarize(args, start, results, extra):
+    measured_from = start + args.warmup
+    results = [r for r in results if r[0] >= measured_from]
+    if not results:
+        raise RuntimeError("No requests completed after the warm-up")
+
+    statuses = {}
+    for _, _, _, status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    # Non-2xx statuses, connection errors and 2xx batches with failed rows
+    errors = sum(1 for *_, failed in results if failed)
+
+    service = sorted(finished - started for _, started, finished, _, _ in results)
+    if args.mode == 'open':
+        corrected = sorted(finished - intended for intended, _, finished, _, _ in results)
+        interval = 1.0 / args.rate
+    else:
+        # Without an expected pacing, take the median as the interval a healthy server would give
+        interval = args.expected_interval_ms / 1000 if args.expected_interval_ms else percentile(service, 50)
+        corrected = sorted(corrected_latencies(service, interval))
+
+    elapsed = max(finished for _, _, finished, _, _ in results) - measured_from
+    return {
+        "mode": args.mode,
+        "requests": len(results),
+        "errors": errors,
+        "errorRate": round(errors / len(results), 6),
+        "statusCounts": {str(status): count for status, count in sorted(statuses.items())},
+        "throughputPerSecond": round(len(results) / elapsed, 2),
+        "correctionIntervalMs": round(interval * 1000, 3),
+        "latencyMs": {
+            "corrected": {f"p{p:g}": round(percentile(corrected, p) * 1000, 3) for p in PERCENTILES},
+            "service": {f"p{p:g}": round(percentile(service, p) * 1000, 3) for p in PERCENTILES}
+        },
+        "maxLatencyMs": {
+            "corrected": round(corrected[-1] * 1000, 3),
+            "service": round(service[-1] * 1000, 3)
+        },
+        **extra
+    }
+
+
+def print_report(report, args):
+    if args.mode == 'open':
+        print(f"Open loop: {args.rate:g} req/s ({args.arrival}) over {args.connections} connections, {args.duration:g}s")
+    else:
+        print(f"Closed loop: {args.concurrency} connections, {args.duration:g}s")
+    statuses = ', '.join(f"{status}: {count}" for status, count in report['statusCounts'].items())
+    print(f"Requests:   {report['requests']} ({statuses}; 0 = connection error)")
+    print(f"Errors:     {report['errors']} ({report['errorRate'] * 100:.2f}%, including 2xx batches with failed rows)")
+    print(f"Throughput: {report['throughputPerSecond']:.1f} req/s")
+    if 'maxClientBacklog' in report:
+        print(f"Client backlog (max queued sends): {report['maxClientBacklog']}")
+
+    header = ''.join(f"{name:>10}" for name in list(report['latencyMs']['service']) + ['max'])
+    print(f"\nLatency (ms){header}")
+    for kind in ('corrected', 'service'):
+        values = list(report['latencyMs'][kind].values()) + [report['maxLatencyMs'][kind]]
+        print(f"  {kind:<10}" + ''.join(f"{value:>10.2f}" for value in values))
+    if args.mode == 'open':
+        print("\ncorrected: from each request's intended send time; service: from the actual send")
+    else:
+        print(f"\ncorrected: plus the requests a stalled connection would have sent every "
+              f"{report['correctionIntervalMs']:g}ms; service: as measured")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers):
+    """Start scripts/serve_api.py on a free local port and wait until both routes answer"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, 'serve_api.py'), '--host', '127.0.0.1',
+         '--port', str(port), '--workers', str(workers), '--no-access-log'],
+        env=dict(os.environ, PYTHONWARNINGS='ignore'), stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve_api.py exited with status {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/diabetes')
+            conn.getresponse().read()
+            conn.close()
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("serve_api.py did not start within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test / replay tool for /api/diabetes and /api/insurance")
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="server base URL")
+    parser.add_argument('--serve', type=int, metavar='WORKERS', default=None,
+                        help="start scripts/serve_api.py locally with this many workers and test it")
+    parser.add_argument('--service', choices=['diabetes', 'insurance', 'both'], default='diabetes')
+    parser.add_argument('--replay', help="NDJSON request log to replay instead of generated payloads")
+    parser.add_argument('--mode', choices=['open', 'closed'], default='open')
+    parser.add_argument('--rate', type=float, default=100.0, help="open loop: requests per second")
+    parser.add_argument('--arrival', choices=['constant', 'poisson'], default='poisson')
+    parser.add_argument('--connections', type=int, default=32, help="open loop: concurrent connections")
+    parser.add_argument('--concurrency', type=int, default=8, help="closed loop: concurrent connections")
+    parser.add_argument('--expected-interval-ms', type=float, default=None,
+                        help="closed loop: pacing for the coordinated-omission correction (default: median latency)")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="seconds excluded from the statistics")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--payloads', type=int, default=10000, help="distinct generated bodies")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    default_service = 'diabetes' if args.service == 'both' else args.service
+    if args.replay:
+        payloads = replayed_payloads(args.replay, default_service)
+    elif args.service == 'both':
+        payloads = generated_payloads('diabetes', args.payloads, rng) + generated_payloads('insurance', args.payloads, rng)
+        rng.shuffle(payloads)
+    else:
+        payloads = generated_payloads(args.service, args.payloads, rng)
+
+    server = None
+    if args.serve is not None:
+        server, port = start_server(args.serve)
+        host = '127.0.0.1'
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+
+    try:
+        run = run_open_loop if args.mode == 'open' else run_closed_loop
+        start, results, extra = run(args, host, port, payloads, rng)
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+
+    report = summarize(args, start, results, extra)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args)
+
+
+if __name__ == "__main__":
+    main()
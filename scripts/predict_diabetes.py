@@ -1,14 +1,99 @@
 import sys
 import os
 import joblib
+import numpy as np
 import pandas as pd
 import json
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(__file__))
 from diabetes_transformers import DiabetesPreprocessor, FeatureEngineer
+from prediction_worker import run_worker
+from stream_scoring import run_stream
+
+# (model column, API key); bulk input may use either as the column name
+FEATURES = [
+    ('Pregnancies', 'pregnancies'),
+    ('Glucose', 'glucose'),
+    ('BloodPressure', 'bloodPressure'),
+    ('SkinThickness', 'skinThickness'),
+    ('Insulin', 'insulin'),
+    ('BMI', 'bmi'),
+    ('DiabetesPedigreeFunction', 'diabetesPedigreeFunction'),
+    ('Age', 'age')
+]
+
+def load_model(model_path):
+    return joblib.load(model_path)
+
+def predict(model, input_data_str):
+    # Parse input data
+    data_parts = input_data_str.split(',')
+
+    # Create DataFrame with the exact column names expected by the model
+    input_data = pd.DataFrame({
+        'Pregnancies': [int(data_parts[0])],
+        'Glucose': [float(data_parts[1])],
+        'BloodPressure': [float(data_parts[2])],
+        'SkinThickness': [float(data_parts[3])],
+        'Insulin': [float(data_parts[4])],
+        'BMI': [float(data_parts[5])],
+        'DiabetesPedigreeFunction': [float(data_parts[6])],
+        'Age': [int(data_parts[7])]
+    })
+
+    # Make prediction
+    prediction = model.predict(input_data)[0]
+    probabilities = model.predict_proba(input_data)[0]
+
+    return {
+        "prediction": int(prediction),
+        "probabilities": [float(probabilities[0]), float(probabilities[1])]
+    }
+
+def score_frame(model, frame):
+    """Vectorized prediction for one chunk of rows; rows with a missing or invalid value get an error instead"""
+    X = pd.DataFrame(index=frame.index)
+    error = pd.Series(None, index=frame.index, dtype=object)
+    for column, key in FEATURES:
+        name = column if column in frame else key if key in frame else None
+        if name is None:
+            # A chunk without the column (e.g. NDJSON records lacking the key) fails its rows, not the job
+            error = error.mask(error.isna(), f"Input has no '{column}' or '{key}' column")
+            X[column] = np.nan
+            continue
+        values = pd.to_numeric(frame[name], errors='coerce').astype(np.float64)
+        bad = ~np.isfinite(values) | (values < 0)
+        error = error.mask(bad & error.isna(), f"'{name}' must be a finite, non-negative number")
+        X[column] = values
+
+    valid = error.isna().to_numpy()
+    results = pd.DataFrame({
+        'prediction': pd.Series(pd.NA, index=frame.index, dtype='Int64'),
+        'probabilityDiabetes': np.nan,
+        'error': error
+    })
+    if valid.any():
+        probabilities = model.predict_proba(X[valid])
+        results.loc[valid, 'prediction'] = model.classes_[probabilities.argmax(axis=1)]
+        results.loc[valid, 'probabilityDiabetes'] = probabilities[:, 1]
+    return results
 
 def main():
+    # Long-lived mode: keep the model warm and answer NDJSON requests
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        run_worker(sys.argv, load_model, predict)
+        return
+
+    # Bulk mode: score a CSV/NDJSON file or stdin in chunks
+    if len(sys.argv) > 1 and sys.argv[1] == '--stream':
+        try:
+            run_stream(sys.argv, load_model, score_frame)
+        except Exception as e:
+            print(json.dumps({"error": str(e)}), file=sys.stderr)
+            sys.exit(1)
+        return
+
     if len(sys.argv) != 3:
         print(json.dumps({"error": "Usage: python predict_diabetes.py <model_path> <input_data>"}))
         sys.exit(1)
@@ -18,32 +103,10 @@ def main():
 
     try:
         # Load the model
-        model = joblib.load(model_path)
-
-        # Parse input data
-        data_parts = input_data_str.split(',')
-
-        # Create DataFrame with the exact column names expected by the model
-        input_data = pd.DataFrame({
-            'Pregnancies': [int(data_parts[0])],
-            'Glucose': [float(data_parts[1])],
-            'BloodPressure': [float(data_parts[2])],
-            'SkinThickness': [float(data_parts[3])],
-            'Insulin': [float(data_parts[4])],
-            'BMI': [float(data_parts[5])],
-            'DiabetesPedigreeFunction': [float(data_parts[6])],
-            'Age': [int(data_parts[7])]
-        })
-
-        # Make prediction
-        prediction = model.predict(input_data)[0]
-        probabilities = model.predict_proba(input_data)[0]
+        model = load_model(model_path)
 
         # Return result as JSON
-        result = {
-            "prediction": int(prediction),
-            "probabilities": [float(probabilities[0]), float(probabilities[1])]
-        }
+        result = predict(model, input_data_str)
 
         print(json.dumps(result))
 
@@ -1,14 +1,83 @@
 import sys
 import os
 import joblib
+import numpy as np
 import pandas as pd
 import json
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(__file__))
 from insurance_transformers import CustomLabelEncoder, FeatureSelector
+from prediction_worker import run_worker
+from stream_scoring import run_stream
+
+NUMERIC_FEATURES = ['age', 'bmi', 'children']
+
+def load_model(model_path):
+    return joblib.load(model_path)
+
+def predict(model, input_data_str):
+    # Parse input data (age, bmi, children, smoker)
+    data_parts = input_data_str.split(',')
+
+    # Create DataFrame with the exact column names expected by the model
+    # Based on training: only age, bmi, children, smoker were used
+    input_data = pd.DataFrame({
+        'age': [int(data_parts[0])],
+        'bmi': [float(data_parts[1])],
+        'children': [int(data_parts[2])],
+        'smoker': [data_parts[3]]  # 'yes' or 'no'
+    })
+
+    # Make prediction
+    predicted_cost = model.predict(input_data)[0]
+
+    return {
+        "predicted_cost": float(predicted_cost)
+    }
+
+def score_frame(model, frame):
+    """Vectorized prediction for one chunk of rows; rows with a missing or invalid value get an error instead"""
+    X = pd.DataFrame(index=frame.index)
+    error = pd.Series(None, index=frame.index, dtype=object)
+    # A chunk without a column (e.g. NDJSON records lacking the key) fails its rows, not the job
+    for column in NUMERIC_FEATURES + ['smoker']:
+        if column not in frame:
+            error = error.mask(error.isna(), f"Input has no '{column}' column")
+            frame = frame.assign(**{column: np.nan if column != 'smoker' else ''})
+
+    for column in NUMERIC_FEATURES:
+        values = pd.to_numeric(frame[column], errors='coerce').astype(np.float64)
+        bad = ~np.isfinite(values) | (values < 0)
+        error = error.mask(bad & error.isna(), f"'{column}' must be a finite, non-negative number")
+        X[column] = values
+
+    smoker_classes = model.named_steps['encoder'].lookup_tables()['smoker']
+    X['smoker'] = frame['smoker'].astype(str)
+    error = error.mask(~X['smoker'].isin(list(smoker_classes)) & error.isna(),
+                       f"'smoker' must be one of {sorted(smoker_classes)}")
+
+    valid = error.isna().to_numpy()
+    results = pd.DataFrame({'predicted_cost': np.nan, 'error': error}, index=frame.index)
+    if valid.any():
+        results.loc[valid, 'predicted_cost'] = np.round(model.predict(X[valid]), 2)
+    return results
 
 def main():
+    # Long-lived mode: keep the model warm and answer NDJSON requests
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        run_worker(sys.argv, load_model, predict)
+        return
+
+    # Bulk mode: score a CSV/NDJSON file or stdin in chunks
+    if len(sys.argv) > 1 and sys.argv[1] == '--stream':
+        try:
+            run_stream(sys.argv, load_model, score_frame)
+        except Exception as e:
+            print(json.dumps({"error": str(e)}), file=sys.stderr)
+            sys.exit(1)
+        return
+
     if len(sys.argv) != 3:
         print(json.dumps({"error": "Usage: python predict_insurance.py <model_path> <input_data>"}))
         sys.exit(1)
@@ -18,27 +87,10 @@ def main():
 
     try:
         # Load the model
-        model = joblib.load(model_path)
-
-        # Parse input data (age, bmi, children, smoker)
-        data_parts = input_data_str.split(',')
-
-        # Create DataFrame with the exact column names expected by the model
-        # Based on training: only age, bmi, children, smoker were used
-        input_data = pd.DataFrame({
-            'age': [int(data_parts[0])],
-            'bmi': [float(data_parts[1])],
-            'children': [int(data_parts[2])],
-            'smoker': [data_parts[3]]  # 'yes' or 'no'
-        })
-
-        # Make prediction
-        predicted_cost = model.predict(input_data)[0]
+        model = load_model(model_path)
 
         # Return result as JSON
-        result = {
-            "predicted_cost": float(predicted_cost)
-        }
+        result = predict(model, input_data_str)
 
         print(json.dumps(result))
 
@@ -0,0 +1,93 @@
+import json
+import os
+import signal
+import socketserver
+import sys
+
+# The profiling hook is shared with the api/ handlers
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+
+import profiling
+
+
+def handle_line(line, predict):
+    """Run one NDJSON request and return the response dict (None for blank lines)"""
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return {"id": None, "error": f"Invalid JSON: {e}"}
+
+    request_id = request.get('id') if isinstance(request, dict) else None
+    try:
+        if not isinstance(request, dict) or 'input' not in request:
+            raise ValueError("Request must be an object with 'id' and 'input'")
+        return {"id": request_id, "result": predict(request['input'])}
+    except Exception as e:
+        return {"id": request_id, "error": str(e)}
+
+
+def serve_stdin(predict):
+    """Answer newline-delimited JSON requests from stdin until EOF"""
+    out = sys.stdout
+    out.write(json.dumps({"event": "ready", "pid": os.getpid()}) + "\n")
+    out.flush()
+
+    for line in sys.stdin:
+        response = handle_line(line, predict)
+        if response is not None:
+            out.write(json.dumps(response) + "\n")
+            out.flush()
+
+
+def serve_socket(path, predict):
+    """Answer newline-delimited JSON requests on a Unix socket, one thread per connection"""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                response = handle_line(line.decode('utf-8'), predict)
+                if response is not None:
+                    self.wfile.write((json.dumps(response) + "\n").encode())
+                    self.wfile.flush()
+
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    print(json.dumps({"event": "ready", "pid": os.getpid(), "socket": path}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def run_worker(argv, load_model, predict):
+    """Entry point for `<script> --worker <model_path> [--socket <path>]`"""
+    if len(argv) not in (3, 5) or (len(argv) == 5 and argv[3] != '--socket'):
+        print(json.dumps({"error": f"Usage: python {os.path.basename(argv[0])} --worker <model_path> [--socket <path>]"}))
+        sys.exit(1)
+
+    # Load once; every request reuses the warm model
+    model = load_model(argv[2])
+
+    # Opt-in sampling profiler (PROFILE_MODE), keyed by script name, e.g. predict_diabetes
+    @profiling.profiled(os.path.splitext(os.path.basename(argv[0]))[0])
+    def predict_input(input_data_str):
+        return predict(model, input_data_str)
+
+    if profiling.profiler is not None and hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2, profiling.profiler.open_window)
+
+    if len(argv) == 5:
+        serve_socket(argv[4], predict_input)
+    else:
+        serve_stdin(predict_input)
@@ -0,0 +1,260 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# The Vercel handlers and their shared modules live in api/
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+import diabetes
+import insurance
+import profiling
+import stage_metrics
+from model_registry import registry
+
+class MountedRoute:
+    """Builds an api/ handler from a request that was already parsed, instead of from a socket.
+
+    The Vercel handlers are BaseHTTPRequestHandler subclasses whose __init__
+    reads one request off a connection. Mounted with mount(), a handler is
+    constructed per request on the buffers of the server that read it.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, command, path, version, headers, rfile, wfile, client_address=('', 0), access_log=True):
+        self.command = command
+        self.path = path
+        self.request_version = version
+        self.requestline = f"{command} {path} {version}"
+        self.headers = headers
+        self.rfile = rfile
+        self.wfile = wfile
+        self.client_address = client_address
+        self.access_log = access_log
+        self.close_connection = False
+
+    def handle_request(self):
+        """Run the do_<command> method; returns whether the handler asked to close the connection"""
+        getattr(self, 'do_' + self.command)()
+        return self.close_connection
+
+    def log_request(self, *args):
+        if self.access_log:
+            super().log_request(*args)
+
+
+def mount(route):
+    """Subclass of an api/ handler class that MountedRoute constructs"""
+    return type(route.__name__, (MountedRoute, route), {'__module__': route.__module__})
+
+
+# Same paths as the Next.js routes
+ROUTES = {
+    '/api/diabetes': mount(diabetes.handler),
+    '/api/insurance': mount(insurance.handler)
+}
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """Routes each request on a keep-alive connection to the api/ handler mounted at its path"""
+
+    protocol_version = 'HTTP/1.1'
+
+    # Idle keep-alive connections are closed after this many seconds
+    timeout = 5
+    access_log = True
+
+    def dispatch(self, method):
+        path = urlsplit(self.path).path.rstrip('/')
+        if path == '/metrics' and method == 'do_GET':
+            # Stage histograms of this worker process only
+            self.send_body(200, stage_metrics.render().encode(), stage_metrics.PROMETHEUS_CONTENT_TYPE)
+            return
+
+        route = ROUTES.get(path)
+        if route is None:
+            self.send_body(404, b'{"error": "Not found"}', 'application/json')
+            return
+
+        delegate = route(self.command, self.path, self.request_version, self.headers,
+                         self.rfile, self.wfile, self.client_address, self.access_log)
+        self.close_connection = delegate.handle_request() or self.server.draining
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.dispatch('do_GET')
+
+    def do_POST(self):
+        self.dispatch('do_POST')
+
+    def do_OPTIONS(self):
+        self.dispatch('do_OPTIONS')
+
+
+class ApiServer(ThreadingHTTPServer):
+    # Let in-flight requests finish on shutdown
+    daemon_threads = False
+    block_on_close = True
+    request_queue_size = 128
+    draining = False
+
+
+def warm_up():
+    """Load the backend each route serves and run one prediction through it, so it all happens before fork.
+
+    That is the pipeline or the params engine, whichever *_MODEL_BACKEND
+    selects, and with INSURANCE_QUOTE_TABLE the quote table: the workers
+    share it instead of each building its own on the first request. The
+    empty record is off the table's grid, so the model path runs as well.
+    """
+    model, _ = registry.get(diabetes.MODEL_NAME)
+    diabetes.predict_batch(model, [{}])
+
+    model, version = registry.get(insurance.MODEL_NAME)
+    insurance.quote_batch(model, [{}], insurance.quote_table(model, version))
+
+
+def listen(host, port):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(ApiServer.request_queue_size)
+    return sock
+
+
+def serve(sock):
+    """Serve on an already listening socket until SIGTERM/SIGINT, then drain"""
+    server = ApiServer(sock.getsockname()[:2], ApiRequestHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever, which runs on this thread
+        server.draining = True
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if profiling.profiler is not None and hasattr(signal, 'SIGUSR2'):
+        # kill -USR2 opens a profiling window without a restart
+        signal.signal(signal.SIGUSR2, profiling.profiler.open_window)
+
+    server.serve_forever()
+    # Joins the connection threads: in-flight requests complete, idle keep-alives time out
+    server.server_close()
+
+
+def spawn_worker(sock):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            serve(sock)
+        except Exception as e:
+            print(f"Worker {os.getpid()} failed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            # os._exit skips atexit, where these are otherwise written out
+            for store in (diabetes.store, insurance.store):
+                if store is not None:
+                    store.flush()
+            if profiling.profiler is not None:
+                profiling.profiler.dump()
+            os._exit(code)
+    return pid
+
+
+def run_master(sock, workers, drain_timeout):
+    """Fork the workers, replace any that die, and forward SIGTERM/SIGINT (and SIGUSR2) to them"""
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    children = set(spawn_worker(sock) for _ in range(workers))
+
+    def forward(signum, frame):
+        for pid in children:
+            os.kill(pid, signum)
+
+    if profiling.profiler is not None and hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2, forward)
+
+    print(f"Serving {sorted(ROUTES)} on {sock.getsockname()[:2]} with {workers} workers "
+          f"(pids {sorted(children)})", file=sys.stderr)
+
+    while not stopping.is_set():
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid in children:
+            children.discard(pid)
+            print(f"Worker {pid} exited with status {status}, restarting", file=sys.stderr)
+            children.add(spawn_worker(sock))
+        stopping.wait(0.5)
+
+    print(f"Draining {len(children)} workers", file=sys.stderr)
+    for pid in children:
+        os.kill(pid, signal.SIGTERM)
+
+    deadline = time.monotonic() + drain_timeout
+    while children and time.monotonic() < deadline:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+        if pid:
+            children.discard(pid)
+        else:
+            time.sleep(0.1)
+
+    for pid in children:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-hosted server for the api/ prediction handlers")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '8000')))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('API_WORKERS', os.cpu_count() or 1)),
+                        help="pre-forked worker processes; 0 serves from this process")
+    parser.add_argument('--drain-timeout', type=float, default=30.0,
+                        help="seconds to wait for in-flight requests on shutdown")
+    parser.add_argument('--no-access-log', action='store_true')
+    args = parser.parse_args()
+
+    ApiRequestHandler.access_log = not args.no_access_log
+
+    # Everything the workers need is loaded here and shared copy-on-write after fork
+    warm_up()
+    sock = listen(args.host, args.port)
+
+    if args.workers <= 0 or not hasattr(os, 'fork'):
+        print(f"Serving {sorted(ROUTES)} on {sock.getsockname()[:2]}", file=sys.stderr)
+        serve(sock)
+        return
+
+    # Keep the collector from touching (and so copying) the inherited heap
+    gc.freeze()
+    run_master(sock, args.workers, args.drain_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import concurrent.futures
+import http.client
+import io
+import json
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from urllib.parse import urlsplit
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from serve_api import ROUTES, warm_up
+
+# serve_api puts api/ on the path
+import stage_metrics
+
+# Idle keep-alive connections are closed after this many seconds
+KEEPALIVE_TIMEOUT = 5
+MAX_HEADERS = 100
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+
+def run_handler(route_path, method, path, version, header_bytes, body, enqueued, queue_timeout):
+    """Run an api/ handler on in-memory buffers; returns (raw HTTP response, close) or None if it waited too long.
+
+    Executes in the pool, so it must stay a picklable module-level function.
+    """
+    if queue_timeout and time.monotonic() - enqueued > queue_timeout:
+        return None
+
+    handler = ROUTES[route_path](method, path, version, http.client.parse_headers(io.BytesIO(header_bytes)),
+                                 io.BytesIO(body), io.BytesIO(), access_log=False)
+    close = handler.handle_request()
+    return handler.wfile.getvalue(), close
+
+
+def json_response(status, payload, retry_after=None):
+    body = json.dumps(payload).encode()
+    lines = [
+        f"HTTP/1.1 {status} {http.client.responses.get(status, '')}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        "Access-Control-Allow-Origin: *"
+    ]
+    if retry_after is not None:
+        lines.append(f"Retry-After: {retry_after}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+
+async def send(writer, response):
+    """Write a response and wait until it is flushed, so closing the connection afterwards cannot cut it short"""
+    writer.write(response)
+    await writer.drain()
+
+
+class Admission:
+    """Bounds the work queued on the executor.
+
+    Over `max_pending` queued or running predictions a request gets 429 at
+    once; one that still waited longer than `queue_timeout` for a pool slot is
+    shed with 503. Both carry a Retry-After estimated from the recent
+    per-request service time.
+    """
+
+    def __init__(self, workers, max_pending, queue_timeout):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.pending = 0
+        self.draining = False
+
+        self.service_time = 0.01
+        self.completed = 0
+        self.rejected = 0
+        self.shed = 0
+
+    def retry_after(self):
+        """Seconds until the current backlog should have cleared"""
+        return max(1, math.ceil(self.pending / self.workers * self.service_time))
+
+    def observe(self, seconds):
+        self.completed += 1
+        self.service_time = 0.9 * self.service_time + 0.1 * seconds
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "maxPending": self.max_pending,
+            "queueTimeoutSeconds": self.queue_timeout,
+            "completed": self.completed,
+            "rejected429": self.rejected,
+            "shed503": self.shed,
+            "serviceTimeMs": round(self.service_time * 1000, 3),
+            "draining": self.draining
+        }
+
+
+class AsyncApiServer:
+    def __init__(self, executor, admission, access_log=True):
+        self.executor = executor
+        self.admission = admission
+        self.access_log = access_log
+
+        # Connections waiting for their next keep-alive request, closed on drain
+        self.idle = set()
+
+    async def respond(self, method, path, version, header_bytes, body):
+        """Returns (raw HTTP response, close)"""
+        route_path = urlsplit(path).path.rstrip('/')
+        if route_path == '/server-status' and method == 'GET':
+            return json_response(200, self.admission.stats()), False
+        if route_path == '/metrics' and method == 'GET':
+            # With the process executor each child keeps its own histograms; this is the loop's process
+            body = stage_metrics.render().encode()
+            head = (f"HTTP/1.1 200 OK\r\nContent-Type: {stage_metrics.PROMETHEUS_CONTENT_TYPE}\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n")
+            return head.encode() + body, False
+        if route_path not in ROUTES:
+            return json_response(404, {"error": "Not found"}), False
+        if method not in ('GET', 'POST', 'OPTIONS'):
+            return json_response(405, {"error": f"Method {method} not allowed"}), False
+
+        # Status and CORS preflight are cheap enough to answer on the loop
+        if method != 'POST':
+            return run_handler(route_path, method, path, version, header_bytes, body, 0, 0)
+
+        admission = self.admission
+        if admission.draining:
+            return json_response(503, {"error": "Server is shutting down"}, retry_after=1), True
+        if admission.pending >= admission.max_pending:
+            admission.rejected += 1
+            return json_response(429, {"error": "Too many requests queued"}, admission.retry_after()), False
+
+        admission.pending += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, run_handler, route_path, method, path, version,
+                header_bytes, body, started, admission.queue_timeout)
+        finally:
+            admission.pending -= 1
+
+        if result is None:
+            admission.shed += 1
+            return json_response(503, {"error": "Request waited too long for a worker"}, admission.retry_after()), False
+
+        admission.observe(time.monotonic() - started)
+        return result
+
+    async def handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        try:
+            while True:
+                self.idle.add(writer)
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                finally:
+                    self.idle.discard(writer)
+                if not request_line.strip():
+                    break
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    await send(writer, json_response(400, {"error": "Bad request line"}))
+                    break
+                method, path, version = parts
+
+                header_lines = []
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    header_lines.append(line)
+                    if len(header_lines) > MAX_HEADERS:
+                        break
+                if len(header_lines) > MAX_HEADERS:
+                    await send(writer, json_response(431, {"error": "Too many headers"}))
+                    break
+
+                header_bytes = b''.join(header_lines) + b'\r\n'
+                headers = http.client.parse_headers(io.BytesIO(header_bytes))
+                try:
+                    length = int(headers.get('Content-Length', 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    await send(writer, json_response(400 if length < 0 else 413, {"error": "Invalid Content-Length"}))
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                start = time.perf_counter()
+                response, close = await self.respond(method, path, version, header_bytes, body)
+                await send(writer, response)
+
+                if self.access_log:
+                    status = response[9:12].decode('latin-1')
+                    print(f"{peer[0] if peer else '-'} \"{method} {path} {version}\" {status} "
+                          f"{(time.perf_counter() - start) * 1000:.1f}ms", file=sys.stderr)
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('Connection', '').lower() != 'close'
+                if close or not keep_alive or self.admission.draining:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+def make_executor(kind, workers):
+    if kind == 'process':
+        # Forked after warm_up(), so the children inherit the loaded models
+        context = multiprocessing.get_context('fork') if hasattr(os, 'fork') else None
+        return concurrent.futures.ProcessPoolExecutor(workers, mp_context=context)
+    return concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix='inference')
+
+
+async def serve(args):
+    executor = make_executor(args.executor, args.workers)
+    admission = Admission(args.workers, args.max_pending, args.queue_timeout)
+    app = AsyncApiServer(executor, admission, access_log=not args.no_access_log)
+
+    server = await asyncio.start_server(app.handle_connection, args.host, args.port, backlog=args.backlog)
+    print(f"Serving {sorted(ROUTES)} on {server.sockets[0].getsockname()[:2]} "
+          f"({args.executor} pool of {args.workers}, max {args.max_pending} pending)", file=sys.stderr)
+
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, stopped.set)
+        except NotImplementedError:
+            pass
+
+    try:
+        await stopped.wait()
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+    # Stop accepting, let queued predictions finish, then release the pool
+    admission.draining = True
+    server.close()
+    await server.wait_closed()
+    deadline = time.monotonic() + args.drain_timeout
+    while admission.pending and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    for writer in list(app.idle):
+        writer.close()
+    await asyncio.sleep(0)
+    executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio server for the api/ prediction handlers with bounded inference pool")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '8000')))
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="inference pool size")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="queued + running predictions before answering 429 (default 8 per worker)")
+    parser.add_argument('--queue-timeout', type=float, default=2.0,
+                        help="seconds a prediction may wait for a worker before it is shed with 503; 0 disables")
+    parser.add_argument('--backlog', type=int, default=1024)
+    parser.add_argument('--drain-timeout', type=float, default=30.0)
+    parser.add_argument('--no-access-log', action='store_true')
+    args = parser.parse_args()
+
+    args.workers = max(1, args.workers)
+    if args.max_pending is None:
+        args.max_pending = 8 * args.workers
+
+    warm_up()
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import argparse
+import collections
+import json
+import os
+import sys
+
+# Set in each pool process by init_pool
+pool_model = None
+pool_score = None
+
+
+def input_format(path, fmt):
+    if fmt:
+        return fmt
+    if path and os.path.splitext(path)[1].lower() in ('.ndjson', '.jsonl', '.json'):
+        return 'ndjson'
+    return 'csv'
+
+
+def read_chunks(source, fmt, chunk_rows):
+    """DataFrames of at most chunk_rows rows; only one chunk is held in memory at a time"""
+    import pandas as pd
+
+    if fmt == 'csv':
+        # Text columns stay strings; each scorer converts the numeric ones itself
+        return pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+    return ndjson_chunks(source, chunk_rows)
+
+
+def ndjson_chunks(source, chunk_rows):
+    import pandas as pd
+
+    records = []
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            record = {"_error": f"line {number}: invalid JSON: {e}"}
+        records.append(record if isinstance(record, dict) else {"_error": f"line {number}: not a JSON object"})
+        if len(records) == chunk_rows:
+            yield pd.DataFrame.from_records(records)
+            records = []
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+def score(model, score_frame, chunk, fmt, first, columns=None):
+    """(output text, rows, errors) for one chunk: the input columns followed by the result columns.
+
+    Formatting happens here rather than in the writer, so with --jobs it runs
+    in the pool too. With `columns` the input columns are written in that
+    order, blank where the chunk lacks one and without any it adds, so CSV
+    rows line up with the header of the first chunk.
+    """
+    import pandas as pd
+
+    results = score_frame(model, chunk)
+    if '_error' in chunk:
+        # Lines that were not JSON objects keep their parse error
+        bad = chunk['_error'].notna()
+        results.loc[bad, 'error'] = chunk.loc[bad, '_error']
+        chunk = chunk.drop(columns='_error')
+    if columns is not None:
+        chunk = chunk.reindex(columns=columns)
+    chunk = pd.concat([chunk, results], axis=1)
+
+    if fmt == 'csv':
+        text = chunk.to_csv(header=first, index=False)
+    else:
+        text = chunk.to_json(orient='records', lines=True)
+        if not text.endswith('\n'):
+            text += '\n'
+    return text, len(chunk), int(results['error'].notna().sum())
+
+
+def init_pool(load_model, model_path, score_frame):
+    global pool_model, pool_score
+    pool_model = load_model(model_path)
+    pool_score = score_frame
+
+
+def score_in_pool(chunk, fmt, first, columns):
+    return score(pool_model, pool_score, chunk, fmt, first, columns)
+
+
+def run_stream(argv, load_model, score_frame):
+    """Entry point for `<script> --stream <model_path> [options]`: bulk scoring of CSV/NDJSON.
+
+    Reads fixed-size chunks, scores each with one vectorized call and writes
+    it before reading further, so memory stays bounded by the chunk size
+    (times the number of chunks in flight with --jobs). Output rows keep the
+    input order.
+    """
+    parser = argparse.ArgumentParser(prog=f"{os.path.basename(argv[0])} --stream",
+                                     description="Score a CSV or NDJSON file in chunks")
+    parser.add_argument('model_path')
+    parser.add_argument('--input', default='-', help="file to score (default: stdin)")
+    parser.add_argument('--output', default='-', help="file to write (default: stdout)")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help="input format (default: from the extension, else csv)")
+    parser.add_argument('--output-format', choices=['csv', 'ndjson'], help="default: same as the input")
+    parser.add_argument('--chunk-rows', type=int, default=50000)
+    parser.add_argument('--jobs', type=int, default=1, help="processes scoring chunks in parallel")
+    args = parser.parse_args(argv[2:])
+
+    fmt = input_format(None if args.input == '-' else args.input, args.format)
+    out_fmt = args.output_format or fmt
+    source = sys.stdin if args.input == '-' else open(args.input, newline='' if fmt == 'csv' else None)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='' if out_fmt == 'csv' else None)
+
+    rows = 0
+    errors = 0
+    try:
+        chunks = read_chunks(source, fmt, args.chunk_rows)
+        # NDJSON chunks have the keys their records happen to have; CSV output keeps the first chunk's header
+        chunks, columns = first_columns(chunks) if out_fmt == 'csv' else (chunks, None)
+        if args.jobs > 1:
+            scored = score_parallel(chunks, args.jobs, load_model, args.model_path, score_frame, out_fmt, columns)
+        else:
+            model = load_model(args.model_path)
+            scored = (score(model, score_frame, chunk, out_fmt, i == 0, columns) for i, chunk in enumerate(chunks))
+
+        for text, chunk_rows, chunk_errors in scored:
+            out.write(text)
+            out.flush()
+            rows += chunk_rows
+            errors += chunk_errors
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop without a traceback at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    print(json.dumps({"event": "done", "rows": rows, "errors": errors}), file=sys.stderr)
+
+
+def first_columns(chunks):
+    """(the same chunks, input columns of the first one without the parse-error column)"""
+    import itertools
+
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return iter(()), None
+    return itertools.chain([first], chunks), [column for column in first.columns if column != '_error']
+
+
+def score_parallel(chunks, jobs, load_model, model_path, score_frame, fmt, columns=None):
+    """Score chunks in a process pool, yielding them in input order.
+
+    At most 2 * jobs chunks are read ahead, so a slow writer or a fast reader
+    cannot make memory grow with the input.
+    """
+    import multiprocessing
+
+    with multiprocessing.Pool(jobs, initializer=init_pool, initargs=(load_model, model_path, score_frame)) as pool:
+        in_flight = collections.deque()
+        for i, chunk in enumerate(chunks):
+            in_flight.append(pool.apply_async(score_in_pool, (chunk, fmt, i == 0, columns)))
+            if len(in_flight) >= 2 * jobs:
+                yield in_flight.popleft().get()
+        while in_flight:
+            yield in_flight.popleft().get()
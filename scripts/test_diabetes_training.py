@@ -0,0 +1,93 @@
+import sys
+import os
+import json
+import subprocess
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+sys.path.append(os.path.join(BASE_DIR, 'diabete'))
+
+from model_registry import load_diabetes_pipeline
+from train_diabetes_model import time_to_best
+
+SCRIPT = os.path.join(BASE_DIR, 'diabete', 'train_diabetes_model.py')
+
+def run_training(search):
+    """Run the training script in parallel mode from an unrelated directory; returns the summary and model"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = os.path.join(tmp, 'models')
+        os.mkdir(output_dir)
+        result = subprocess.run(
+            [sys.executable, SCRIPT, '--search', search, '--jobs', '2',
+             '--output', os.path.join(output_dir, 'diabetes.pkl')],
+            cwd=tmp, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+
+        # Nothing but the model and its summary, both next to --output
+        assert os.listdir(tmp) == ['models']
+        assert sorted(os.listdir(output_dir)) == ['diabetes.pkl', 'diabetes_search.json']
+        with open(os.path.join(output_dir, 'diabetes_search.json')) as f:
+            summary = json.load(f)
+        with open(os.path.join(output_dir, 'diabetes.pkl'), 'rb') as f:
+            model = load_diabetes_pipeline(f.read())
+    return summary, model
+
+def check_summary(summary, model, search, candidates):
+    assert summary['search'] == search
+    assert summary['candidates'] == candidates
+    assert 0 < summary['timeToBestSeconds'] <= summary['fitSeconds']
+    assert 0.5 < summary['bestScore'] <= 1.0
+    for name, value in summary['bestParams'].items():
+        assert model.get_params()[name] == value
+    assert model.memory is None
+    print(f"{search}: best {summary['bestScore']:.4f} after {summary['timeToBestSeconds']}s "
+          f"of {summary['searchSeconds']}s")
+
+def test_grid_search_in_parallel_workers():
+    """The exhaustive search runs with several worker processes and the disk transformer cache"""
+    print("=== DIABETES TRAINING (GRID) ===")
+    summary, model = run_training('grid')
+    check_summary(summary, model, 'grid', 6)
+
+def test_halving_search_in_parallel_workers():
+    """Successive halving runs with several worker processes and reports its time to best score"""
+    print("=== DIABETES TRAINING (HALVING) ===")
+    summary, model = run_training('halving')
+    check_summary(summary, model, 'halving', 110)
+    assert summary['bestParams']['classifier__penalty'] == 'elasticnet'
+
+def test_time_to_best_is_the_first_round_led_by_the_winner():
+    """Rounds where another candidate leads, or nothing could be scored, do not count"""
+    params = [{'C': 1}, {'C': 2}, {'C': 3}, {'C': 2}, {'C': 3}, {'C': 3}]
+    search = SimpleNamespace(
+        cv_results_={
+            'params': params,
+            'iter': np.array([0, 0, 0, 1, 1, 2]),
+            'mean_test_score': np.array([0.9, 0.7, 0.8, np.nan, np.nan, 0.95]),
+            'mean_fit_time': np.array([0.1, 0.1, 0.1, 0.2, 0.2, 0.5]),
+            'mean_score_time': np.array([0.1, 0.1, 0.1, 0.05, 0.05, 0.25]),
+        },
+        best_index_=5,
+        n_splits_=2)
+    # Per round: 3 * 0.2 * 2, 2 * 0.25 * 2 and 0.75 * 2 seconds
+    assert abs(time_to_best(search) - 3.7) < 1e-9
+
+    # Leading the first round already counts
+    search.cv_results_['mean_test_score'] = np.array([0.7, 0.8, 0.9, 0.8, 0.9, 0.95])
+    assert abs(time_to_best(search) - 1.2) < 1e-9
+
+    # A single exhaustive round has no 'iter' column
+    grid = SimpleNamespace(
+        cv_results_={'params': params[:3], 'mean_test_score': np.array([0.9, 0.7, 0.8]),
+                     'mean_fit_time': np.array([1.0, 2.0, 3.0]), 'mean_score_time': np.zeros(3)},
+        best_index_=0, n_splits_=5)
+    assert abs(time_to_best(grid) - 30.0) < 1e-9
+
+if __name__ == "__main__":
+    test_time_to_best_is_the_first_round_led_by_the_winner()
+    test_grid_search_in_parallel_workers()
+    test_halving_search_in_parallel_workers()
@@ -0,0 +1,99 @@
+import sys
+import os
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from diabetes_transformers import DiabetesPreprocessor, FeatureEngineer
+from insurance_transformers import CustomLabelEncoder, FeatureSelector
+
+# The NumPy engines live next to the API handlers
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+from diabetes_engine import DiabetesEngine
+from insurance_engine import InsuranceEngine
+from insurance_quote_table import InsuranceQuoteTable
+from model_registry import expose_to_main
+
+# The pickles reference __main__, which is not this module under pytest
+expose_to_main(DiabetesPreprocessor, FeatureEngineer, CustomLabelEncoder, FeatureSelector)
+
+import joblib
+import pandas as pd
+import numpy as np
+
+def test_diabetes_engine_parity():
+    """The params-based engine must reproduce the pickled pipeline on diabetes.csv"""
+    print("=== DIABETES ENGINE PARITY ===")
+
+    model = joblib.load(os.path.join(BASE_DIR, 'diabetes_model.pkl'))
+    engine = DiabetesEngine.from_file(os.path.join(BASE_DIR, 'diabetes_model_params.json'))
+
+    X = pd.read_csv(os.path.join(BASE_DIR, 'diabete', 'diabetes.csv')).drop(columns=['outcome'])
+
+    expected = model.predict_proba(X)
+    actual = engine.predict_proba(X.to_numpy(dtype=np.float64))
+
+    max_diff = np.abs(expected - actual).max()
+    print(f"Rows: {len(X)}, max |proba diff|: {max_diff:.3e}")
+
+    assert max_diff < 1e-12
+    assert (model.predict(X) == engine.predict(X)).all()
+
+def test_insurance_engine_parity():
+    """The closed-form scorer must reproduce the pickled pipeline on all of insurance.csv"""
+    print("\n=== INSURANCE ENGINE PARITY ===")
+
+    model = joblib.load(os.path.join(BASE_DIR, 'insurance_cost_model.pkl'))
+    engine = InsuranceEngine.from_file(os.path.join(BASE_DIR, 'insurance_model_params.json'))
+
+    X = pd.read_csv(os.path.join(BASE_DIR, 'costos-medicos', 'insurance.csv'))[engine.input_features]
+
+    expected = model.predict(X)
+    vectorized = engine.predict(X)
+    scalar = np.array([engine.quote(row.age, row.bmi, row.children, row.smoker) for row in X.itertuples(index=False)])
+
+    print(f"Rows: {len(X)}")
+    print(f"Vectorized max |diff|: {np.abs(expected - vectorized).max():.3e}")
+    print(f"Scalar max |diff|: {np.abs(expected - scalar).max():.3e}")
+
+    # Costs are in the tens of thousands; only float summation order may differ
+    assert np.allclose(expected, vectorized, rtol=1e-12, atol=1e-8)
+    assert np.allclose(expected, scalar, rtol=1e-12, atol=1e-8)
+    assert (np.round(expected, 2) == np.round(vectorized, 2)).all()
+
+def test_insurance_quote_table_parity():
+    """Table lookups must reproduce the pickled pipeline over the whole (age, children, smoker) grid"""
+    print("\n=== INSURANCE QUOTE TABLE PARITY ===")
+
+    model = joblib.load(os.path.join(BASE_DIR, 'insurance_cost_model.pkl'))
+    table = InsuranceQuoteTable.from_pipeline(model)
+
+    ages, children, smokers, bmis = np.meshgrid(np.arange(18, 65), np.arange(6), [0, 1], np.linspace(15, 55, 9), indexing='ij')
+    X = pd.DataFrame({
+        'age': ages.ravel(),
+        'bmi': bmis.ravel(),
+        'children': children.ravel(),
+        'smoker': np.array(table.smoker_labels)[smokers.ravel()]
+    })
+
+    expected = model.predict(X)
+    vectorized = table.quote_many(X['age'], X['bmi'], X['children'], smokers.ravel())
+    scalar = np.array([table.quote(row.age, row.bmi, row.children, row.smoker) for row in X.itertuples(index=False)])
+
+    print(f"Grid rows: {len(X)}, max |diff|: {np.abs(expected - vectorized).max():.3e}")
+
+    assert np.allclose(expected, vectorized, rtol=1e-12, atol=1e-8)
+    assert np.allclose(expected, scalar, rtol=1e-12, atol=1e-8)
+    assert (np.round(expected, 2) == np.round(vectorized, 2)).all()
+
+    # Off the grid the caller has to fall back to the model
+    assert table.quote(30.5, 25.0, 1, 'no') is None
+    assert table.quote(70, 25.0, 1, 'no') is None
+    assert np.isnan(table.quote_many([30], [25.0], [6], [0])).all()
+
+if __name__ == "__main__":
+    test_diabetes_engine_parity()
+    test_insurance_engine_parity()
+    test_insurance_quote_table_parity()
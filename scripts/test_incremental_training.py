@@ -0,0 +1,131 @@
+import sys
+import os
+import io
+import tempfile
+import warnings
+import contextlib
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+sys.path.append(os.path.join(BASE_DIR, 'diabete'))
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+
+import diabetes
+from diabetes_transformers import DiabetesPreprocessor
+from model_registry import load_diabetes_pipeline
+from streaming_stats import ImputationStatistics, QuantileSketch, RunningMoments
+from train_diabetes_incremental import BinnedAUC, split_masks, train_diabetes_incremental
+
+def test_incremental_training_matches_in_memory_statistics():
+    """Chunked training gives the in-memory medians and means and an artifact the API scores"""
+    print("=== INCREMENTAL TRAINING ===")
+
+    csv_path = os.path.join(BASE_DIR, 'diabete', 'diabetes.csv')
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline = train_diabetes_incremental([csv_path], model_path, chunk_rows=100, epochs=3)
+        with open(model_path, 'rb') as f:
+            served = load_diabetes_pipeline(f.read())
+
+    parts = list(split_masks([csv_path], None, 100, 0.2, 42))
+    train = pd.concat([X[~held_out] for X, _, held_out in parts])
+    test = pd.concat([X[held_out] for X, _, held_out in parts])
+    y_test = np.concatenate([y[held_out] for _, y, held_out in parts])
+
+    preprocessor = pipeline.named_steps['preprocessor']
+    for col, median in preprocessor.medians_.items():
+        assert median == train[col].replace(0, np.nan).median()
+    for col, mean in preprocessor.means_.items():
+        assert abs(mean - train[col].replace(0, np.nan).mean()) < 1e-9
+
+    # The API's array path over the unpickled artifact matches the pipeline
+    proba = pipeline.predict_proba(test)[:, 1]
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        served_proba = diabetes.pipeline_proba(served, test.to_numpy(dtype=np.float64))[:, 1]
+    # Importing api/diabetes.py leaves the process-wide filters alone
+    assert not any(message is not None and 'feature names' in message.pattern
+                   for _, message, *_ in warnings.filters)
+    assert np.abs(served_proba - proba).max() < 1e-12
+
+    auc = BinnedAUC()
+    auc.update(proba, y_test)
+    assert abs(auc.auc() - roc_auc_score(y_test, proba)) < 1e-3
+    assert auc.auc() > 0.8
+
+    print(f"Holdout AUC {auc.auc():.4f} on {len(y_test)} rows")
+
+def test_incremental_statistics_in_parallel():
+    """Statistics computed per file in a process pool and merged match the serial pass"""
+    print("\n=== INCREMENTAL TRAINING, PARALLEL STATISTICS ===")
+
+    data = pd.read_csv(os.path.join(BASE_DIR, 'diabete', 'diabetes.csv'))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, start in enumerate(range(0, len(data), 300)):
+            paths.append(os.path.join(tmp, f'part-{i}.csv'))
+            data.iloc[start:start + 300].to_csv(paths[-1], index=False)
+
+        fitted = []
+        for jobs in (1, 2):
+            with contextlib.redirect_stdout(io.StringIO()):
+                fitted.append(train_diabetes_incremental(paths, os.path.join(tmp, f'model-{jobs}.pkl'),
+                                                         chunk_rows=100, epochs=1, jobs=jobs))
+
+    serial, parallel = (pipeline.named_steps['preprocessor'] for pipeline in fitted)
+    assert parallel.medians_ == serial.medians_
+    for col, mean in parallel.means_.items():
+        assert abs(mean - serial.means_[col]) < 1e-9
+    assert type(parallel) is DiabetesPreprocessor
+
+    print(f"{len(paths)} files, medians {parallel.medians_}")
+
+def test_streaming_statistics():
+    """Chunked, merged statistics match fit() on small data; past exact_limit the sketch stays within its rank error"""
+    print("\n=== STREAMING IMPUTATION STATISTICS ===")
+
+    X = pd.read_csv(os.path.join(BASE_DIR, 'diabete', 'diabetes.csv')).drop(columns=['outcome'])
+    preprocessor = DiabetesPreprocessor().fit(X)
+
+    # Two shards of chunks, merged: same result as the whole frame
+    halves = [ImputationStatistics(), ImputationStatistics()]
+    for start in range(0, len(X), 100):
+        halves[start // 100 % 2].partial_fit(X.iloc[start:start + 100])
+    merged = halves[0].merge(halves[1]).fitted()
+    assert merged.medians_ == preprocessor.medians_
+    for col, mean in merged.means_.items():
+        assert abs(mean - preprocessor.means_[col]) < 1e-9
+    assert np.array_equal(merged.transform_array(X.to_numpy(dtype=np.float64)),
+                          preprocessor.transform_array(X.to_numpy(dtype=np.float64)))
+
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=400000)
+    shards = [QuantileSketch(rank_error=0.005, exact_limit=1000, seed=i) for i in range(4)]
+    moments = [RunningMoments() for _ in range(4)]
+    for i, chunk in enumerate(np.array_split(values, 40)):
+        shards[i % 4].update(chunk)
+        moments[i % 4].update(chunk)
+    for sketch, running in zip(shards[1:], moments[1:]):
+        shards[0].merge(sketch)
+        moments[0].merge(running)
+
+    assert not shards[0].exact and shards[0].count == len(values)
+    assert sum(len(a) for arrays in shards[0].levels for a in arrays) < 10000
+    rank = np.searchsorted(np.sort(values), shards[0].quantile(0.5)) / len(values)
+    assert abs(rank - 0.5) <= 0.005
+    assert abs(moments[0].value() - values.mean()) < 1e-9
+    assert abs(moments[0].variance() - values.var(ddof=1)) < 1e-9
+
+    print(f"Sketched median rank {rank:.4f} over {len(values)} values")
+
+if __name__ == "__main__":
+    test_incremental_training_matches_in_memory_statistics()
+    test_incremental_statistics_in_parallel()
+    test_streaming_statistics()
@@ -0,0 +1,105 @@
+import sys
+import os
+import json
+import tempfile
+import warnings
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+sys.path.append(os.path.join(BASE_DIR, 'costos-medicos'))
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+import insurance
+from extract_model_params import extract_insurance_model
+from insurance_engine import InsuranceEngine
+from insurance_quote_table import InsuranceQuoteTable
+from model_registry import load_insurance_pipeline
+from train_model_incremental import (FEATURES, SufficientStatistics, build_pipeline, design_rows,
+                                     polynomial_features, read_statistics)
+
+def test_sufficient_statistics_match_linear_regression():
+    """Added, merged and removed statistics solve to the same model as LinearRegression on those rows"""
+    print("=== INSURANCE SUFFICIENT STATISTICS ===")
+
+    csv_path = os.path.join(BASE_DIR, 'costos-medicos', 'insurance.csv')
+    df = pd.read_csv(csv_path)
+    poly = polynomial_features()
+
+    def reference(rows):
+        Z = design_rows(rows, poly)
+        return LinearRegression().fit(Z[:, :-1], Z[:, -1]).predict(design_rows(df, poly)[:, :-1])
+
+    def predictions(stats):
+        coef, intercept, _, _ = stats.solve()
+        return design_rows(df, poly)[:, :-1] @ coef + intercept
+
+    full = read_statistics([csv_path], chunk_rows=100)
+    assert full.count == len(df)
+    assert np.abs(predictions(full) - reference(df)).max() < 1e-6
+
+    # Two shards summed, then the first removed again
+    first = SufficientStatistics.from_rows(design_rows(df.iloc[:500], poly))
+    second = SufficientStatistics.from_rows(design_rows(df.iloc[500:], poly))
+    merged = SufficientStatistics(len(full.mean)).add(first).add(second)
+    assert np.allclose(merged.comoment, full.comoment, rtol=1e-10)
+    assert np.abs(predictions(merged) - reference(df)).max() < 1e-6
+    merged.subtract(first)
+    assert merged.count == len(df) - 500
+    assert np.abs(predictions(merged) - reference(df.iloc[500:])).max() < 1e-6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_path = os.path.join(tmp, 'stats.npz')
+        full.save(stats_path)
+        loaded = SufficientStatistics.load(stats_path)
+        assert loaded.count == full.count and np.array_equal(loaded.comoment, full.comoment)
+
+        # The saved pipeline unpickles in the API like insurance_cost_model.pkl
+        model_path = os.path.join(tmp, 'model.pkl')
+        joblib.dump(build_pipeline(loaded), model_path)
+        with open(model_path, 'rb') as f:
+            served = load_insurance_pipeline(f.read())
+    assert np.abs(served.predict(df[FEATURES]) - reference(df)).max() < 1e-6
+
+    print(f"{full.count} rows, R² {full.solve()[2]:.4f}")
+
+def test_incremental_artifact_serves_like_the_batch_model():
+    """The solved pipeline loads through every serving path: handler batch and DataFrame, quote table, params engine"""
+    print("\n=== INSURANCE INCREMENTAL ARTIFACT ===")
+
+    csv_path = os.path.join(BASE_DIR, 'costos-medicos', 'insurance.csv')
+    df = pd.read_csv(csv_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        joblib.dump(build_pipeline(read_statistics([csv_path])), model_path)
+        with open(model_path, 'rb') as f:
+            model = load_insurance_pipeline(f.read())
+        params = extract_insurance_model(model_path)
+
+    assert list(model.named_steps['poly_features'].feature_names_in_) == FEATURES
+    assert params['input_features'] == FEATURES and params['feature_names'][0] == 'age'
+
+    records = df[FEATURES].head(200).to_dict('records')
+    with warnings.catch_warnings():
+        # Takes precedence over the training module's blanket ignore
+        warnings.filterwarnings('error', message='.*feature names')
+        expected = model.predict(df[FEATURES].head(200))
+
+    batch = [result['predictedCost'] for result in insurance.quote_batch(model, records)]
+    table = InsuranceQuoteTable.from_pipeline(model)
+    tabled = [result['predictedCost'] for result in insurance.quote_batch(model, records, table)]
+    engine = InsuranceEngine.from_json(json.dumps(params))
+    engined = [result['predictedCost'] for result in insurance.quote_batch(engine, records)]
+
+    assert batch == tabled == engined == [round(cost, 2) for cost in expected.tolist()]
+    print(f"{len(records)} quotes identical across the serving paths")
+
+if __name__ == "__main__":
+    test_sufficient_statistics_match_linear_regression()
+    test_incremental_artifact_serves_like_the_batch_model()
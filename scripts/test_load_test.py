@@ -0,0 +1,104 @@
+import sys
+import os
+import json
+import random
+import subprocess
+import tempfile
+import threading
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from load_test import Client, corrected_latencies, generated_payloads, percentile, replayed_payloads
+from serve_api import ApiRequestHandler, ApiServer
+
+# serve_api puts api/ on the path
+import diabetes
+import insurance
+from model_registry import registry
+from prediction_store import PredictionStore
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def test_coordinated_omission_correction():
+    """A 1s stall at 10ms pacing adds the ~99 requests that were never sent"""
+    print("=== LOAD TEST STATISTICS ===")
+
+    latencies = [0.01] * 99 + [1.0]
+    corrected = sorted(corrected_latencies(latencies, 0.01))
+    assert len(corrected) == 199
+    assert percentile(sorted(latencies), 99) == 0.01
+    assert percentile(corrected, 99) > 0.9
+    assert percentile(corrected, 75) > 0.4
+
+    payloads = generated_payloads('insurance', 5, random.Random(1))
+    assert all(path == '/api/insurance' and b'"smoker"' in body for path, body in payloads)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+        f.write('{"glucose": 120}\n\n{"service": "insurance", "inputs": {"age": 30}}\n')
+    try:
+        replayed = replayed_payloads(f.name, 'diabetes')
+    finally:
+        os.unlink(f.name)
+    assert [path for path, _ in replayed] == ['/api/diabetes', '/api/insurance']
+    assert replayed[1][1] == b'{"age": 30}'
+
+    print("Stalls show up in the corrected percentiles")
+
+def test_replay_of_exported_predictions():
+    """Rows written by export_predictions.py replay as single requests that succeed; row errors count as failures"""
+    print("\n=== LOAD TEST REPLAY ===")
+
+    records = {
+        'diabetes': [{'glucose': 150, 'bmi': 31.5, 'age': 50}, {'pregnancies': 2, 'glucose': 90, 'age': 30}],
+        'insurance': [{'age': 40, 'bmi': 30.5, 'children': 1, 'smoker': 'yes'}, {'age': 25, 'bmi': 22.0}]
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, 'predictions.db')
+        store = PredictionStore(store_path)
+        for module, score in ((diabetes, diabetes.predict_cached), (insurance, insurance.quote_cached)):
+            store_before, module.store = module.store, store
+            try:
+                model, version = registry.get(module.MODEL_NAME)
+                score(model, version, records[module.__name__])
+            finally:
+                module.store = store_before
+        store.flush()
+
+        export_path = os.path.join(tmp, 'export.ndjson')
+        subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'export_predictions.py'), store_path,
+                        '--output', export_path], check=True, capture_output=True)
+        payloads = replayed_payloads(export_path, 'diabetes')
+
+        # Exports of older stores held positional lists
+        legacy_path = os.path.join(tmp, 'legacy.ndjson')
+        with open(legacy_path, 'w') as f:
+            f.write(json.dumps({'service': 'insurance', 'inputs': [40.0, 30.5, 1.0, 'yes']}) + '\n')
+        legacy = replayed_payloads(legacy_path, 'diabetes')
+
+    assert sorted(path for path, _ in payloads) == ['/api/diabetes'] * 2 + ['/api/insurance'] * 2
+    assert all(isinstance(json.loads(body), dict) for _, body in payloads)
+    assert json.loads(legacy[0][1]) == {'age': 40.0, 'bmi': 30.5, 'children': 1.0, 'smoker': 'yes'}
+
+    server = ApiServer(('127.0.0.1', 0), ApiRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    access_log, ApiRequestHandler.access_log = ApiRequestHandler.access_log, False
+    client = Client('127.0.0.1', server.server_address[1], 10)
+    try:
+        outcomes = [client.post(path, body) for path, body in payloads + legacy]
+        # A 200 batch with a failed row is a failure
+        batch = client.post('/api/insurance', json.dumps([{'age': 40}, {'age': -1}]).encode())
+    finally:
+        client.close()
+        ApiRequestHandler.access_log = access_log
+        server.shutdown()
+        server.server_close()
+
+    assert outcomes == [(200, False)] * len(outcomes)
+    assert batch == (200, True)
+
+    print(f"Replayed {len(outcomes)} exported rows")
+
+if __name__ == "__main__":
+    test_coordinated_omission_correction()
+    test_replay_of_exported_predictions()
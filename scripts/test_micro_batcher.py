@@ -0,0 +1,53 @@
+import sys
+import os
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+from micro_batcher import MicroBatcher
+
+def test_micro_batcher_coalesces_and_fans_out():
+    """Concurrent submits share vectorized calls and each caller gets its own result"""
+    print("=== MICRO-BATCHER ===")
+
+    calls = []
+
+    def predict_many(items):
+        calls.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(predict_many, window_ms=20, max_rows=8)
+    results = {}
+
+    def client(i):
+        results[i] = batcher.submit(i, timeout=10)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = batcher.stats()
+    print(f"Calls: {len(calls)}, batch sizes: {stats['batchSizes']}")
+
+    assert results == {i: i * 2 for i in range(40)}
+    assert sum(calls) == 40 and max(calls) <= 8
+    assert len(calls) < 40
+    assert stats['rows'] == 40 and stats['maxBatchSize'] == max(calls)
+
+def test_micro_batcher_propagates_errors():
+    def predict_many(items):
+        raise RuntimeError("model unavailable")
+
+    batcher = MicroBatcher(predict_many, window_ms=1)
+    try:
+        batcher.submit(1, timeout=10)
+        assert False, "error swallowed"
+    except RuntimeError as e:
+        assert str(e) == "model unavailable"
+
+if __name__ == "__main__":
+    test_micro_batcher_coalesces_and_fans_out()
+    test_micro_batcher_propagates_errors()
@@ -0,0 +1,70 @@
+import sys
+import os
+import hashlib
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+from model_registry import ModelRegistry
+
+def test_registry_reloads_only_changed_files():
+    """mtime/size changes trigger a content check; only new content is loaded again"""
+    print("=== MODEL REGISTRY ===")
+
+    loads = []
+
+    def loader(data):
+        loads.append(data)
+        return data.decode()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.bin')
+        with open(path, 'wb') as f:
+            f.write(b'model-a')
+
+        registry = ModelRegistry()
+        registry.register('test', path, loader=loader)
+        versions = []
+        registry.on_reload('test', versions.append)
+
+        model, version = registry.get('test')
+        assert model == 'model-a' and version == hashlib.sha256(b'model-a').hexdigest()[:12]
+        assert registry.get('test') == (model, version)
+        assert len(loads) == 1
+
+        # Touched but identical content: same model, no reload
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+        assert registry.get('test') == (model, version)
+        assert len(loads) == 1
+
+        # Same size, new content and mtime: reloaded, listeners told the new version
+        with open(path, 'wb') as f:
+            f.write(b'model-b')
+        os.utime(path, (st.st_atime, st.st_mtime + 20))
+        model, version = registry.get('test')
+        assert model == 'model-b' and version == hashlib.sha256(b'model-b').hexdigest()[:12]
+        assert versions == [version]
+
+        # New size, even with the old mtime
+        with open(path, 'wb') as f:
+            f.write(b'model-c!')
+        os.utime(path, (st.st_atime, st.st_mtime + 20))
+        assert registry.get('test')[0] == 'model-c!'
+
+        stats = registry.stats('test')
+        assert len(loads) == 3 and stats['reloads'] == 2 and stats['misses'] == 3
+        assert stats['version'] == registry.get('test')[1]
+
+        os.remove(path)
+        try:
+            registry.get('test')
+            assert False, "missing file not reported"
+        except FileNotFoundError:
+            pass
+
+    print(f"{len(loads)} loads, {stats['hits']} hits, versions {versions}")
+
+if __name__ == "__main__":
+    test_registry_reloads_only_changed_files()
@@ -0,0 +1,103 @@
+import sys
+import os
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+import prediction_cache
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache, cached_scores
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+def test_cache_expiry_and_eviction():
+    """Entries expire after their TTL and the least recently used one is evicted first"""
+    print("=== PREDICTION CACHE ===")
+
+    clock = FakeClock()
+    real_time = prediction_cache.time
+    prediction_cache.time = clock
+    try:
+        cache = PredictionCache(max_entries=2, ttl=10.0)
+        cache.put('a', {'value': 1})
+        clock.now += 9.9
+        assert cache.get('a') == {'value': 1}
+        clock.now += 0.1
+        assert cache.get('a') is None
+        assert cache.stats()['expirations'] == 1 and cache.stats()['entries'] == 0
+
+        # A read refreshes recency, not the TTL
+        cache.put('a', {'value': 1})
+        cache.put('b', {'value': 2})
+        assert cache.get('a') == {'value': 1}
+        cache.put('c', {'value': 3})
+        assert cache.get('b') is None
+        assert cache.get('a') == {'value': 1} and cache.get('c') == {'value': 3}
+        clock.now += 10.0
+        assert cache.get('a') is None and cache.get('c') is None
+
+        # Writing an existing key replaces it and restarts its TTL without evicting
+        cache.put('d', {'value': 4})
+        clock.now += 5.0
+        cache.put('d', {'value': 5})
+        clock.now += 6.0
+        assert cache.get('d') == {'value': 5}
+    finally:
+        prediction_cache.time = real_time
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['expirations'] == 3
+    assert stats['hits'] == 5 and stats['misses'] == 4
+    print(f"Stats: {stats}")
+
+def test_cache_invalidated_on_model_reload():
+    """A reload listener empties the cache, and results are keyed on the model version"""
+    print("\n=== PREDICTION CACHE, MODEL RELOAD ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.bin')
+        with open(path, 'wb') as f:
+            f.write(b'2')
+
+        registry = ModelRegistry()
+        registry.register('test', path, loader=lambda data: int(data))
+        cache = PredictionCache(100)
+        registry.on_reload('test', cache.invalidate)
+
+        scored = []
+
+        def predict(records):
+            model, version = registry.get('test')
+
+            def score(misses):
+                scored.extend(misses)
+                return [{"value": record["x"] * model} for record in misses]
+
+            canonical = lambda record: ((record["x"],), record)
+            return [result["value"] for result in cached_scores(records, canonical, score, version, cache)]
+
+        assert predict([{"x": 1}, {"x": 2}, {"x": 1}]) == [2, 4, 2]
+        assert predict([{"x": 2}]) == [4]
+        assert len(scored) == 2 and cache.stats()['entries'] == 2
+
+        st = os.stat(path)
+        with open(path, 'wb') as f:
+            f.write(b'3')
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+
+        assert predict([{"x": 2}]) == [6]
+        stats = cache.stats()
+        assert stats['invalidations'] == 1 and stats['entries'] == 1
+        assert len(scored) == 3
+
+    print(f"Stats: {stats}")
+
+if __name__ == "__main__":
+    test_cache_expiry_and_eviction()
+    test_cache_invalidated_on_model_reload()
@@ -0,0 +1,84 @@
+import sys
+import os
+import io
+import json
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+from prediction_cache import PredictionCache, cached_scores
+from prediction_store import PredictionStore
+
+def canonical(record):
+    if not isinstance(record, dict) or record.get('x', 0) < 0:
+        raise ValueError("'x' must be a non-negative number")
+    values = (round(float(record['x']), 4),)
+    return values, {'x': values[0]}
+
+def test_repeat_scores_skip_inference():
+    """Cache, then store, then model; a fresh process only needs the store"""
+    print("=== PREDICTION CACHE + STORE ===")
+
+    scored = []
+
+    def score(records):
+        scored.extend(records)
+        return [{"index": i, "y": record['x'] * 2} if isinstance(record, dict) and record.get('x', 0) >= 0
+                else {"index": i, "error": "bad input"} for i, record in enumerate(records)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'predictions.db')
+        records = [{'x': 1}, {'x': 2.00001}, {'x': 1}, {'x': -1}]
+
+        store = PredictionStore(path)
+        first = cached_scores(records, canonical, score, 'v1', PredictionCache(10), store, 'test')
+        store.flush()
+        assert [r.get('y') for r in first] == [2, 4, 2, None]
+        assert [r['index'] for r in first] == [0, 1, 2, 3]
+        assert len(scored) == 3  # the repeated {'x': 1} is scored once
+
+        # New cache and store objects, as in another worker process
+        scored.clear()
+        store = PredictionStore(path)
+        second = cached_scores(records, canonical, score, 'v1', PredictionCache(10), store, 'test')
+        store.flush()
+        assert second == first
+        assert scored == [{'x': -1}]  # only the invalid record reaches score()
+
+        # A new model version does not reuse old results
+        cached_scores(records[:1], canonical, score, 'v2', None, store, 'test')
+        store.flush()
+        assert scored[-1] == {'x': 1.0}
+
+        out = io.StringIO()
+        assert store.export(out, service='test', version='v1') == 2
+        exported = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert {row['result']['y'] for row in exported} == {2, 4}
+        # Inputs are stored as the named canonical record
+        assert sorted(row['inputs']['x'] for row in exported) == [1.0, 2.0]
+
+        audit = io.StringIO()
+        store.export(audit, include_served=True)
+        sources = [json.loads(line)['source'] for line in audit.getvalue().splitlines()]
+        assert sources.count('model') == 4 and sources.count('store') == 3
+
+    print("Repeat scores served from the store without calling the model")
+
+def test_failed_write_does_not_stop_the_writer():
+    """A batch that fails with any exception is dropped; flush() returns and later batches are written"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PredictionStore(os.path.join(tmp, 'predictions.db'), flush_interval=0.01)
+        # json.dumps raises TypeError on a set, which is not an sqlite3.Error
+        store.record('test', 'v1', [('a', {'x': 1}, {'y': {1, 2}})], [('a', 'model')])
+        store.flush()
+        assert store.writer.is_alive()
+
+        store.record('test', 'v1', [('b', {'x': 2}, {'y': 4})], [('b', 'model')])
+        store.flush()
+        assert store.lookup('test', 'v1', ['a', 'b']) == {'b': {'y': 4}}
+        assert store.stats()['written'] == 1
+
+if __name__ == "__main__":
+    test_repeat_scores_skip_inference()
+    test_failed_write_does_not_stop_the_writer()
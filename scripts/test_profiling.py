@@ -0,0 +1,48 @@
+import sys
+import os
+import atexit
+import glob
+import time
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+from profiling import Profiler
+
+def busy_request():
+    # Long enough for a starved sampler thread (a loaded single core) to still take a few samples
+    end = time.perf_counter() + 0.2
+    while time.perf_counter() < end:
+        pass
+    return 'ok'
+
+def test_sampled_requests_are_aggregated():
+    """1-in-N selection, and collapsed stacks / pstats written per service"""
+    print("=== PROFILING HOOK ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = Profiler('sample', 3, 0, tmp, 0.001)
+        atexit.unregister(profiler.dump)
+        assert [profiler.sampled() for _ in range(6)] == [True, False, False, True, False, False]
+
+        for _ in range(2):
+            assert profiler.run('test', busy_request) == 'ok'
+        profiler.dump()
+
+        with open(os.path.join(tmp, f'test-{os.getpid()}.collapsed')) as f:
+            lines = f.read().splitlines()
+        assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) > 10
+        assert all(';busy_request (test_profiling.py:' in line for line in lines)
+        assert profiler.report()['profiledRequests'] == {'test': 2}
+
+        profiler = Profiler('cprofile', 1, 0, tmp, 0.001)
+        atexit.unregister(profiler.dump)
+        profiler.run('test', busy_request)
+        profiler.dump()
+        assert glob.glob(os.path.join(tmp, 'test-*.prof'))
+
+    print("Profiles aggregated across requests")
+
+if __name__ == "__main__":
+    test_sampled_requests_are_aggregated()
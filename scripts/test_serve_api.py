@@ -0,0 +1,147 @@
+import sys
+import os
+import json
+import queue
+import re
+import signal
+import socket
+import subprocess
+import threading
+import time
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(BASE_DIR, 'scripts', 'serve_api.py')
+
+PATIENT = json.dumps({'glucose': 150, 'bmi': 31.5, 'age': 50}).encode()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class Master:
+    """serve_api.py with pre-forked workers in a subprocess, its stderr lines collected in a queue"""
+
+    def __init__(self, workers):
+        self.port = free_port()
+        self.process = subprocess.Popen(
+            [sys.executable, SCRIPT, '--host', '127.0.0.1', '--port', str(self.port),
+             '--workers', str(workers), '--drain-timeout', '10', '--no-access-log'],
+            stderr=subprocess.PIPE, text=True)
+        self.lines = queue.Queue()
+        threading.Thread(target=self.collect, daemon=True).start()
+
+    def collect(self):
+        for line in self.process.stderr:
+            self.lines.put(line)
+
+    def wait_for(self, pattern, timeout=60):
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self.lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            match = re.search(pattern, line)
+            if match:
+                return match
+
+    def close(self):
+        # SIGTERM, so the master stops its workers too; SIGKILL would leave them running
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+def predict(port):
+    request = urllib.request.Request(f'http://127.0.0.1:{port}/api/diabetes', data=PATIENT,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status, json.loads(response.read())
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+def test_dead_worker_is_replaced():
+    """A worker that dies is forked again and the port keeps answering"""
+    print("=== PRE-FORK SERVER, WORKER RESTART ===")
+
+    master = Master(workers=2)
+    try:
+        pids = [int(pid) for pid in master.wait_for(r'with 2 workers \(pids \[(\d+), (\d+)\]\)').groups()]
+        status, body = predict(master.port)
+        assert status == 200 and 0 <= body['probabilityDiabetes'] <= 1
+
+        os.kill(pids[0], signal.SIGKILL)
+        master.wait_for(rf'Worker {pids[0]} exited with status {signal.SIGKILL}, restarting')
+        for _ in range(10):
+            assert predict(master.port) == (status, body)
+        assert alive(pids[1])
+    finally:
+        master.close()
+
+    print(f"Worker {pids[0]} replaced")
+
+def test_shutdown_drains_in_flight_requests():
+    """On SIGTERM a request that has started is answered and its keep-alive connection closed before the workers exit"""
+    print("\n=== PRE-FORK SERVER, DRAIN ===")
+
+    master = Master(workers=2)
+    try:
+        pids = [int(pid) for pid in master.wait_for(r'with 2 workers \(pids \[(\d+), (\d+)\]\)').groups()]
+        predict(master.port)
+
+        # Headers and half of the body: the worker is now reading this request
+        conn = socket.create_connection(('127.0.0.1', master.port), timeout=10)
+        conn.sendall(b'POST /api/diabetes HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                     b'Content-Length: %d\r\n\r\n' % len(PATIENT) + PATIENT[:10])
+        time.sleep(0.5)
+
+        master.process.send_signal(signal.SIGTERM)
+        master.wait_for(r'Draining 2 workers')
+        time.sleep(0.5)
+        assert master.process.poll() is None
+
+        conn.sendall(PATIENT[10:])
+        # Read to EOF: the worker closes the keep-alive connection after this response
+        response = b''
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+        conn.close()
+
+        head, body = response.split(b'\r\n\r\n', 1)
+        assert head.startswith(b'HTTP/1.1 200')
+        assert 0 <= json.loads(body)['probabilityDiabetes'] <= 1
+
+        assert master.process.wait(timeout=10) == 0
+        assert not any(alive(pid) for pid in pids)
+    finally:
+        master.close()
+
+    print("In-flight request answered during the drain")
+
+def test_warm_up_covers_the_configured_backends():
+    """With the params engines and the quote table selected, warm_up() loads and builds them before fork"""
+    env = dict(os.environ, DIABETES_MODEL_BACKEND='params', INSURANCE_MODEL_BACKEND='params', INSURANCE_QUOTE_TABLE='1')
+    code = ("import json, serve_api, insurance; serve_api.warm_up(); "
+            "print(json.dumps({'loaded': sorted(n for n, e in serve_api.registry.stats().items() if e['loaded']), "
+            "'tables': len(insurance.quote_tables)}))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(SCRIPT), env=env,
+                            capture_output=True, text=True, check=True).stdout
+    warmed = json.loads(output.splitlines()[-1])
+
+    assert warmed == {'loaded': ['diabetes_params', 'insurance_params'], 'tables': 1}
+    print(f"Warmed before fork: {warmed}")
+
+if __name__ == "__main__":
+    test_dead_worker_is_replaced()
+    test_shutdown_drains_in_flight_requests()
+    test_warm_up_covers_the_configured_backends()
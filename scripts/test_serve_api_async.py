@@ -0,0 +1,137 @@
+import sys
+import os
+import asyncio
+import concurrent.futures
+import json
+import threading
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from serve_api_async import Admission, AsyncApiServer
+
+PATIENT = json.dumps({'glucose': 150, 'bmi': 31.5, 'age': 50}).encode()
+
+async def exchange(reader, writer, method, path, body=b'', headers=''):
+    """Send one request on an open connection; returns (status, headers dict, body)"""
+    if 'Content-Length' not in headers:
+        headers += f"Content-Length: {len(body)}\r\n"
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n".encode() + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, value = line.decode().split(':', 1)
+        response_headers[name.lower()] = value.strip()
+    content = await reader.readexactly(int(response_headers.get('content-length', 0)))
+    return status, response_headers, content
+
+async def with_server(app, scenario):
+    server = await asyncio.start_server(app.handle_connection, '127.0.0.1', 0)
+    try:
+        return await scenario(server.sockets[0].getsockname()[1])
+    finally:
+        server.close()
+        await server.wait_closed()
+
+def test_keep_alive_routing():
+    """Several requests share one connection; unknown routes and bad lengths are answered without the pool"""
+    print("=== ASYNC SERVER ===")
+
+    executor = concurrent.futures.ThreadPoolExecutor(2)
+    admission = Admission(2, 16, 2.0)
+    app = AsyncApiServer(executor, admission, access_log=False)
+
+    async def scenario(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        first = await exchange(reader, writer, 'POST', '/api/diabetes', PATIENT)
+        second = await exchange(reader, writer, 'POST', '/api/diabetes/', PATIENT)
+        missing = await exchange(reader, writer, 'GET', '/api/nothing')
+        preflight = await exchange(reader, writer, 'OPTIONS', '/api/insurance')
+        status = await exchange(reader, writer, 'GET', '/server-status')
+        writer.close()
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        bad_length = await exchange(reader, writer, 'POST', '/api/diabetes', headers='Content-Length: -1\r\n')
+        closed = await reader.read()
+        writer.close()
+
+        # The error response is flushed before the connection closes
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        too_large = await exchange(reader, writer, 'POST', '/api/diabetes', headers=f'Content-Length: {2 ** 40}\r\n')
+        too_large_closed = await reader.read()
+        writer.close()
+        return first, second, missing, preflight, status, bad_length, closed, (too_large, too_large_closed)
+
+    try:
+        first, second, missing, preflight, status, bad_length, closed, (too_large, too_large_closed) = \
+            asyncio.run(with_server(app, scenario))
+    finally:
+        executor.shutdown()
+
+    assert first[0] == second[0] == 200 and first[2] == second[2]
+    assert 0 <= json.loads(first[2])['probabilityDiabetes'] <= 1
+    assert missing[0] == 404
+    assert preflight[0] == 200
+    assert status[0] == 200 and json.loads(status[2])['completed'] == 2
+    assert bad_length[0] == 400 and closed == b''
+    assert too_large[0] == 413 and json.loads(too_large[2]) == {"error": "Invalid Content-Length"}
+    assert too_large_closed == b''
+
+    print(f"Keep-alive: {json.loads(status[2])}")
+
+def test_admission_rejects_sheds_and_drains():
+    """Past max_pending a request gets 429; one queued past queue_timeout gets 503; draining answers 503 and closes"""
+    print("\n=== ASYNC SERVER, ADMISSION ===")
+
+    executor = concurrent.futures.ThreadPoolExecutor(1)
+    admission = Admission(1, 1, 0.2)
+    app = AsyncApiServer(executor, admission, access_log=False)
+
+    # Holds the only pool thread, so the first prediction waits in the queue
+    release = threading.Event()
+    executor.submit(release.wait)
+
+    async def scenario(port):
+        queued_conn = await asyncio.open_connection('127.0.0.1', port)
+        queued = asyncio.create_task(exchange(*queued_conn, 'POST', '/api/diabetes', PATIENT))
+        while not admission.pending:
+            await asyncio.sleep(0.01)
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        rejected = await exchange(reader, writer, 'POST', '/api/diabetes', PATIENT)
+
+        await asyncio.sleep(0.3)
+        release.set()
+        shed = await queued
+        queued_conn[1].close()
+
+        served = await exchange(reader, writer, 'POST', '/api/diabetes', PATIENT)
+        admission.draining = True
+        draining = await exchange(reader, writer, 'POST', '/api/diabetes', PATIENT)
+        closed = await reader.read()
+        writer.close()
+        return rejected, shed, served, draining, closed
+
+    try:
+        rejected, shed, served, draining, closed = asyncio.run(with_server(app, scenario))
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert rejected[0] == 429 and int(rejected[1]['retry-after']) >= 1
+    assert shed[0] == 503 and 'retry-after' in shed[1]
+    assert served[0] == 200
+    assert draining[0] == 503 and closed == b''
+
+    stats = admission.stats()
+    assert stats['rejected429'] == 1 and stats['shed503'] == 1 and stats['completed'] == 1 and stats['pending'] == 0
+    print(f"Admission: {stats}")
+
+if __name__ == "__main__":
+    test_keep_alive_routing()
+    test_admission_rejects_sheds_and_drains()
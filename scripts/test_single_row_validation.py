@@ -0,0 +1,81 @@
+import sys
+import os
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+import diabetes
+import insurance
+from micro_batcher import MicroBatcher
+from prediction_cache import PredictionCache
+
+def post(port, payload):
+    request = urllib.request.Request(f'http://127.0.0.1:{port}/', data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def post_batch(port, payloads):
+    request = urllib.request.Request(f'http://127.0.0.1:{port}/', data=json.dumps(payloads).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return response.status, json.loads(response.read())
+
+def responses(module, predict_many, payloads):
+    """Status and body of each payload with the optional features off, with a cache and with a batcher"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), module.handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    seen = {}
+    try:
+        for name, cache, batcher in (('plain', None, None),
+                                     ('cache', PredictionCache(100), None),
+                                     ('batcher', None, MicroBatcher(predict_many, window_ms=1))):
+            module.cache, module.batcher = cache, batcher
+            seen[name] = [post(port, payload) for payload in payloads]
+            seen[name + ' batch'] = post_batch(port, payloads)
+    finally:
+        module.cache, module.batcher = None, None
+        server.shutdown()
+        server.server_close()
+    return seen
+
+def test_single_rows_validated_alike():
+    """The same row gets the same status whichever optional path scores it, and the same error inside a batch"""
+    print("=== SINGLE-ROW VALIDATION ===")
+
+    checks = [
+        (diabetes, diabetes.predict_records, 'probabilityDiabetes',
+         [{'glucose': 150, 'bmi': 31.5, 'age': 50}, {'glucose': -150}, {'age': 'old'}, {'glucose': [150]},
+          {'age': 50.5}, {'pregnancies': 2.5}, 5]),
+        (insurance, insurance.quote_records, 'predictedCost',
+         [{'age': 40, 'bmi': 30.5, 'children': 1, 'smoker': 'yes'}, {'age': -40}, {'smoker': 'maybe'},
+          {'smoker': ['yes']}, {'smoker': {'yes': 1}}, {'age': 40.5, 'smoker': 'yes'}, {'children': 0.5}, 'x']),
+    ]
+    for module, predict_many, key, payloads in checks:
+        seen = responses(module, predict_many, payloads)
+        errors = [body['error'] for _, body in seen['plain'][1:]]
+        for name, results in seen.items():
+            if name.endswith(' batch'):
+                # A batch holding the same rows: 200, with the single-row errors per row
+                status, body = results
+                assert status == 200 and body['errorCount'] == len(payloads) - 1, (module.__name__, name, body)
+                assert body['results'][0][key] == seen['plain'][0][1][key]
+                assert [result['error'] for result in body['results'][1:]] == errors
+                continue
+            assert [status for status, _ in results] == [200] + [400] * (len(payloads) - 1), (module.__name__, name, results)
+            assert results[0][1][key] == seen['plain'][0][1][key]
+            assert [body['error'] for _, body in results[1:]] == errors
+        print(f"{module.__name__}: {[body['error'] for _, body in seen['plain'][1:]]}")
+
+if __name__ == "__main__":
+    test_single_rows_validated_alike()
@@ -0,0 +1,62 @@
+import sys
+import os
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+import stage_metrics
+
+def test_stage_histograms_across_threads():
+    """Per-thread shards are summed on read, including threads that have exited"""
+    print("=== STAGE METRICS ===")
+
+    enabled, server_timing = stage_metrics.ENABLED, stage_metrics.SERVER_TIMING
+    stage_metrics.ENABLED = stage_metrics.SERVER_TIMING = True
+    try:
+        def work():
+            for _ in range(100):
+                stage_metrics.observe('test', 'fast', 0.0002)
+            stage_metrics.observe('test', 'slow', 30.0)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stage_metrics.begin_request()
+        with stage_metrics.stage('test', 'fast'):
+            pass
+        header = stage_metrics.end_request('test')
+        assert header.startswith('fast;dur=') and ', total;dur=' in header
+
+        text = stage_metrics.render(['test'])
+        lines = dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+        assert lines['prediction_stage_seconds_count{service="test",stage="fast"}'] == '401'
+        assert lines['prediction_stage_seconds_bucket{service="test",stage="fast",le="0.00025"}'] == '401'
+        assert lines['prediction_stage_seconds_bucket{service="test",stage="slow",le="5.0"}'] == '0'
+        assert lines['prediction_stage_seconds_bucket{service="test",stage="slow",le="+Inf"}'] == '4'
+        assert float(lines['prediction_stage_seconds_sum{service="test",stage="slow"}']) == 120.0
+        assert 'stage="total"' in text
+    finally:
+        stage_metrics.ENABLED, stage_metrics.SERVER_TIMING = enabled, server_timing
+
+    print("Histograms merged from 5 threads")
+
+def test_exited_threads_do_not_accumulate_shards():
+    """A thread per request must not grow the shard list while nothing reads the metrics"""
+    before = stage_metrics.snapshot().get(('test', 'short'), [0] * (len(stage_metrics.BUCKETS) + 2))
+
+    for _ in range(50):
+        thread = threading.Thread(target=stage_metrics.observe, args=('test', 'short', 0.001))
+        thread.start()
+        thread.join()
+    assert len(stage_metrics.shards) <= 2
+
+    counts = stage_metrics.snapshot()[('test', 'short')]
+    assert sum(counts[:-1]) - sum(before[:-1]) == 50
+
+if __name__ == "__main__":
+    test_stage_histograms_across_threads()
+    test_exited_threads_do_not_accumulate_shards()
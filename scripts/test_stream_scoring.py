@@ -0,0 +1,88 @@
+import sys
+import os
+import io
+import json
+import tempfile
+import contextlib
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from diabetes_transformers import DiabetesPreprocessor, FeatureEngineer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+from model_registry import expose_to_main
+
+# The pickles reference __main__, which is not this module under pytest
+expose_to_main(DiabetesPreprocessor, FeatureEngineer)
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import predict_diabetes
+from stream_scoring import run_stream
+
+def test_stream_scoring_matches_pipeline():
+    """Chunked bulk scoring, serial and in a pool, keeps row order and matches predict_proba"""
+    print("=== STREAMING BULK SCORING ===")
+
+    csv_path = os.path.join(BASE_DIR, 'diabete', 'diabetes.csv')
+    model_path = os.path.join(BASE_DIR, 'diabetes_model.pkl')
+    expected = joblib.load(model_path).predict_proba(pd.read_csv(csv_path).drop(columns=['outcome']))[:, 1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for jobs in ('1', '2'):
+            out_path = os.path.join(tmp, f'scored-{jobs}.csv')
+            with contextlib.redirect_stderr(io.StringIO()):
+                run_stream(['predict_diabetes.py', '--stream', model_path, '--input', csv_path,
+                            '--output', out_path, '--chunk-rows', '100', '--jobs', jobs],
+                           predict_diabetes.load_model, predict_diabetes.score_frame)
+
+            scored = pd.read_csv(out_path)
+            assert len(scored) == len(expected)
+            assert scored['error'].isna().all()
+            assert np.abs(scored['probabilityDiabetes'].to_numpy() - expected).max() < 1e-12
+
+    print(f"{len(expected)} rows scored in order")
+
+def test_ndjson_chunks_with_different_keys():
+    """A chunk missing a column fails its rows only; CSV output keeps the first chunk's header"""
+    print("=== STREAMING NDJSON WITH DIFFERENT KEYS ===")
+
+    model_path = os.path.join(BASE_DIR, 'diabetes_model.pkl')
+    rows = pd.read_csv(os.path.join(BASE_DIR, 'diabete', 'diabetes.csv')).drop(columns=['outcome']).head(4)
+    records = [{key: row[column] for column, key in predict_diabetes.FEATURES} for row in rows.to_dict('records')]
+    records[0]['id'] = 'a'
+    records[1]['id'] = 'b'
+    # The second chunk has no glucose at all, and a key the first chunk did not have
+    for record in records[2:]:
+        del record['glucose']
+        record['note'] = 'late'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        in_path = os.path.join(tmp, 'rows.ndjson')
+        with open(in_path, 'w') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+
+        for jobs in ('1', '2'):
+            out_path = os.path.join(tmp, f'scored-{jobs}.csv')
+            with contextlib.redirect_stderr(io.StringIO()):
+                run_stream(['predict_diabetes.py', '--stream', model_path, '--input', in_path, '--output', out_path,
+                            '--output-format', 'csv', '--chunk-rows', '2', '--jobs', jobs],
+                           predict_diabetes.load_model, predict_diabetes.score_frame)
+
+            scored = pd.read_csv(out_path)
+            assert list(scored.columns) == list(records[0]) + ['prediction', 'probabilityDiabetes', 'error']
+            assert list(scored['id'].iloc[:2]) == ['a', 'b'] and scored['id'].iloc[2:].isna().all()
+            assert scored['error'].iloc[:2].isna().all() and scored['probabilityDiabetes'].iloc[:2].notna().all()
+            assert list(scored['error'].iloc[2:]) == ["Input has no 'Glucose' or 'glucose' column"] * 2
+            assert scored['glucose'].iloc[2:].isna().all()
+
+    print("Rows without a column got an error; later chunks kept the first header")
+
+if __name__ == "__main__":
+    test_stream_scoring_matches_pipeline()
+    test_ndjson_chunks_with_different_keys()
@@ -0,0 +1,113 @@
+import sys
+import os
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from diabetes_transformers import DiabetesPreprocessor, FeatureEngineer
+from insurance_transformers import CustomLabelEncoder, FeatureSelector
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'api'))
+
+from model_registry import expose_to_main
+
+# The pickles reference __main__, which is not this module under pytest
+expose_to_main(DiabetesPreprocessor, FeatureEngineer, CustomLabelEncoder, FeatureSelector)
+
+import joblib
+import pandas as pd
+import numpy as np
+
+def test_preprocessor_array_parity():
+    """transform_array must match the pandas transform exactly on diabetes.csv"""
+    print("=== DIABETES PREPROCESSOR ARRAY PATH ===")
+
+    model = joblib.load(os.path.join(BASE_DIR, 'diabetes_model.pkl'))
+    preprocessor = model.named_steps['preprocessor']
+
+    X = pd.read_csv(os.path.join(BASE_DIR, 'diabete', 'diabetes.csv')).drop(columns=['outcome'])
+    expected = preprocessor.transform(X).to_numpy(dtype=np.float64)
+
+    values = X.to_numpy(dtype=np.float64)
+    copied = preprocessor.transform_array(values)
+    assert np.array_equal(expected, copied)
+    assert not np.shares_memory(values, copied)
+
+    # In place on a caller-owned buffer
+    in_place = preprocessor.transform_array(values, copy=False)
+    assert in_place is values
+    assert np.array_equal(expected, values)
+
+    # Any column order, with missing values already present
+    columns = list(X.columns)[::-1]
+    shuffled = X[columns].copy()
+    shuffled.iloc[::7, 3] = np.nan
+    expected = preprocessor.transform(shuffled).to_numpy(dtype=np.float64)
+    actual = preprocessor.transform_array(shuffled.to_numpy(dtype=np.float64), columns=columns)
+    assert np.array_equal(expected, actual, equal_nan=True)
+
+    print(f"Rows: {len(X)}, identical output")
+
+def test_feature_engineer_array_parity():
+    """The preallocated interaction column must match the pandas one"""
+    print("\n=== FEATURE ENGINEER ARRAY PATH ===")
+
+    X = pd.read_csv(os.path.join(BASE_DIR, 'diabete', 'diabetes.csv')).drop(columns=['outcome'])
+    engineer = FeatureEngineer().fit(X)
+
+    expected = engineer.transform(X).to_numpy(dtype=np.float64)
+    actual = engineer.transform_array(X.to_numpy(dtype=np.float64), list(X.columns))
+    assert actual.shape == (len(X), X.shape[1] + 1)
+    assert np.array_equal(expected, actual)
+
+    print(f"Rows: {len(X)}, identical output")
+
+def test_preprocessor_fit_matches_pandas():
+    """fit() reads one column at a time and gives the same medians and means as the whole-frame pandas fit"""
+    print("\n=== DIABETES PREPROCESSOR FIT ===")
+
+    X = pd.read_csv(os.path.join(BASE_DIR, 'diabete', 'diabetes.csv')).drop(columns=['outcome'])
+    preprocessor = DiabetesPreprocessor().fit(X)
+    for col, median in preprocessor.medians_.items():
+        assert median == X[col].replace(0, np.nan).median()
+    for col, mean in preprocessor.means_.items():
+        assert mean == X[col].replace(0, np.nan).mean()
+    assert sorted(preprocessor.medians_) == sorted(preprocessor.median_cols)
+    assert sorted(preprocessor.means_) == sorted(preprocessor.mean_cols)
+
+    # Refitting drops the transform_array plan of the previous statistics
+    preprocessor.transform_array(X.to_numpy(dtype=np.float64))
+    refit = preprocessor.fit(X.iloc[:100])
+    expected = refit.transform(X).to_numpy(dtype=np.float64)
+    assert np.array_equal(expected, refit.transform_array(X.to_numpy(dtype=np.float64)))
+
+    print(f"Medians {preprocessor.medians_}")
+
+def test_label_encoder_array_parity():
+    """Lookup-table encoding must match LabelEncoder and reject unseen labels the same way"""
+    print("\n=== LABEL ENCODER ARRAY PATH ===")
+
+    model = joblib.load(os.path.join(BASE_DIR, 'insurance_cost_model.pkl'))
+    encoder = model.named_steps['encoder']
+
+    columns = ['age', 'bmi', 'children', 'smoker']
+    X = pd.read_csv(os.path.join(BASE_DIR, 'costos-medicos', 'insurance.csv'))[columns]
+
+    expected = encoder.transform(X).to_numpy(dtype=np.float64)
+    actual = encoder.transform_array(X.to_numpy(), columns)
+    assert np.array_equal(expected, actual)
+
+    try:
+        encoder.transform_array(np.array([[30, 25.0, 0, 'maybe']], dtype=object), columns)
+        assert False, "unseen label accepted"
+    except ValueError as e:
+        assert 'unseen' in str(e)
+
+    print(f"Rows: {len(X)}, identical output")
+
+if __name__ == "__main__":
+    test_preprocessor_array_parity()
+    test_feature_engineer_array_parity()
+    test_preprocessor_fit_matches_pandas()
+    test_label_encoder_array_parity()
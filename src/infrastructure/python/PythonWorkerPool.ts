@@ -0,0 +1,278 @@
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+
+const DEFAULT_POOL_SIZE = parseInt(process.env.PYTHON_WORKERS || '2', 10);
+const REQUEST_TIMEOUT_MS = parseInt(process.env.PYTHON_WORKER_TIMEOUT_MS || '10000', 10);
+// Loading the model is not part of any request; a worker that never gets ready is killed after this
+const START_TIMEOUT_MS = parseInt(process.env.PYTHON_WORKER_START_TIMEOUT_MS || '60000', 10);
+const PYTHON_BIN = process.env.PYTHON_BIN || 'python';
+
+// One NDJSON line to `scripts/predict_*.py --worker`; input is the script's comma-separated row
+export interface WorkerRequest {
+  id: string;
+  input: string;
+}
+
+export interface WorkerReady {
+  event: 'ready';
+  pid: number;
+}
+
+export interface WorkerResponse<T> {
+  id: string | null;
+  result?: T;
+  error?: string;
+}
+
+export type WorkerMessage<T> = WorkerReady | WorkerResponse<T>;
+
+// Results of predict() in scripts/predict_diabetes.py and scripts/predict_insurance.py
+export interface DiabetesWorkerResult {
+  prediction: number;
+  probabilities: [number, number];
+}
+
+export interface InsuranceWorkerResult {
+  predicted_cost: number;
+}
+
+interface PendingRequest<T> {
+  resolve: (result: T) => void;
+  reject: (error: Error) => void;
+  timer: ReturnType<typeof setTimeout> | null;
+}
+
+/**
+ * One long-lived `scripts/predict_*.py --worker` process.
+ * Requests and responses are NDJSON lines matched by correlation id.
+ */
+class PythonWorker<T> {
+  alive = true;
+  private ready = false;
+  private nextId = 0;
+  private pending = new Map<string, PendingRequest<T>>();
+  private buffer = '';
+  private process: ChildProcessWithoutNullStreams;
+  private startTimer: ReturnType<typeof setTimeout>;
+
+  constructor(
+    scriptPath: string,
+    modelPath: string,
+    onExit: (worker: PythonWorker<T>) => void,
+    private onTimeout: (worker: PythonWorker<T>) => void
+  ) {
+    this.process = spawn(PYTHON_BIN, [scriptPath, '--worker', modelPath]);
+
+    this.startTimer = setTimeout(() => {
+      this.kill(new Error(`Python worker ${this.process.pid} did not start within ${START_TIMEOUT_MS}ms`));
+      this.onTimeout(this);
+    }, START_TIMEOUT_MS);
+
+    this.process.stdout.on('data', (data: Buffer) => this.onData(data));
+
+    this.process.stderr.on('data', (data: Buffer) => {
+      console.error(`Python worker ${this.process.pid} stderr:`, data.toString());
+    });
+
+    this.process.on('error', (error: Error) => this.onClose(error));
+    this.process.stdin.on('error', (error: Error) => this.onClose(error));
+
+    this.process.on('close', (code: number | null) => {
+      this.onClose(new Error(`Python worker exited with code ${code}`));
+      onExit(this);
+    });
+  }
+
+  get load(): number {
+    return this.pending.size;
+  }
+
+  private onData(data: Buffer): void {
+    this.buffer += data.toString();
+
+    let newline;
+    while ((newline = this.buffer.indexOf('\n')) >= 0) {
+      const line = this.buffer.slice(0, newline).trim();
+      this.buffer = this.buffer.slice(newline + 1);
+      if (line) {
+        this.onMessage(line);
+      }
+    }
+  }
+
+  private onMessage(line: string): void {
+    let message: WorkerMessage<T>;
+    try {
+      message = JSON.parse(line);
+    } catch (parseError) {
+      console.error('Python worker sent invalid JSON:', line);
+      return;
+    }
+
+    if ('event' in message) {
+      if (message.event === 'ready') {
+        this.onReady();
+      }
+      return;
+    }
+
+    if (message.id === null) {
+      return;
+    }
+    const request = this.pending.get(message.id);
+    if (!request) {
+      return;
+    }
+
+    this.pending.delete(message.id);
+    this.clearTimer(request);
+
+    if (message.error) {
+      request.reject(new Error(message.error));
+    } else {
+      request.resolve(message.result as T);
+    }
+  }
+
+  private onReady(): void {
+    this.ready = true;
+    clearTimeout(this.startTimer);
+    // Requests sent while the model was loading start their timeout now
+    this.pending.forEach((request, id) => this.startTimeout(id, request));
+  }
+
+  private onClose(error: Error): void {
+    this.alive = false;
+    clearTimeout(this.startTimer);
+    this.pending.forEach((request) => {
+      this.clearTimer(request);
+      request.reject(error);
+    });
+    this.pending.clear();
+  }
+
+  private startTimeout(id: string, request: PendingRequest<T>): void {
+    request.timer = setTimeout(() => {
+      this.pending.delete(id);
+      request.reject(new Error(`Python worker timed out after ${REQUEST_TIMEOUT_MS}ms`));
+      // Requests are answered in order, so a stuck worker never answers the rest either
+      this.kill(new Error(`Python worker ${this.process.pid} killed after a request timed out`));
+      this.onTimeout(this);
+    }, REQUEST_TIMEOUT_MS);
+  }
+
+  private clearTimer(request: PendingRequest<T>): void {
+    if (request.timer !== null) {
+      clearTimeout(request.timer);
+    }
+  }
+
+  request(input: string): Promise<T> {
+    const id = `${this.process.pid}-${this.nextId++}`;
+
+    return new Promise<T>((resolve, reject) => {
+      const request: PendingRequest<T> = { resolve, reject, timer: null };
+      this.pending.set(id, request);
+      // Before the ready event the line waits in the pipe and the timeout has not started
+      if (this.ready) {
+        this.startTimeout(id, request);
+      }
+      const message: WorkerRequest = { id, input };
+      this.process.stdin.write(JSON.stringify(message) + '\n');
+    });
+  }
+
+  kill(error: Error): void {
+    if (!this.alive) {
+      return;
+    }
+    this.onClose(error);
+    this.process.kill('SIGKILL');
+  }
+
+  close(): void {
+    this.process.stdin.end();
+  }
+}
+
+/**
+ * Keeps up to `size` warm Python workers and routes each request to the least busy one.
+ * Dead workers are dropped and replaced on the next request; a worker that times out
+ * is killed and replaced right away.
+ */
+export class PythonWorkerPool<T = unknown> {
+  private size: number;
+  private workers: PythonWorker<T>[] = [];
+  private closed = false;
+
+  constructor(private scriptPath: string, private modelPath: string, size: number = DEFAULT_POOL_SIZE) {
+    this.size = Math.max(1, size);
+  }
+
+  private spawnWorker(): PythonWorker<T> {
+    const worker = new PythonWorker<T>(
+      this.scriptPath,
+      this.modelPath,
+      (exited) => {
+        this.workers = this.workers.filter((w) => w !== exited);
+      },
+      (stuck) => {
+        this.workers = this.workers.filter((w) => w !== stuck);
+        if (!this.closed && this.workers.length < this.size) {
+          this.spawnWorker();
+        }
+      }
+    );
+    this.workers.push(worker);
+    return worker;
+  }
+
+  private pickWorker(): PythonWorker<T> {
+    this.workers = this.workers.filter((worker) => worker.alive);
+
+    let best: PythonWorker<T> | null = null;
+    for (const worker of this.workers) {
+      if (!best || worker.load < best.load) {
+        best = worker;
+      }
+    }
+
+    // Grow the pool lazily while every existing worker is busy
+    if (!best || (best.load > 0 && this.workers.length < this.size)) {
+      return this.spawnWorker();
+    }
+
+    return best;
+  }
+
+  predict(input: string): Promise<T> {
+    return this.pickWorker().request(input);
+  }
+
+  close(): void {
+    this.closed = true;
+    for (const worker of this.workers) {
+      worker.close();
+    }
+    this.workers = [];
+  }
+}
+
+declare global {
+  // eslint-disable-next-line no-var
+  var __pythonWorkerPools: Record<string, PythonWorkerPool<any>> | undefined;
+}
+
+/**
+ * Process-wide pools, kept on globalThis so Next.js hot reloads reuse the same workers.
+ */
+export function getWorkerPool<T = unknown>(name: string, scriptPath: string, modelPath: string): PythonWorkerPool<T> {
+  if (!globalThis.__pythonWorkerPools) {
+    globalThis.__pythonWorkerPools = {};
+  }
+
+  const pools = globalThis.__pythonWorkerPools;
+  if (!pools[name]) {
+    pools[name] = new PythonWorkerPool<T>(scriptPath, modelPath);
+  }
+  return pools[name] as PythonWorkerPool<T>;
+}